@@ -0,0 +1,6 @@
+# -*- coding: utf-8 -*-
+"""
+统一缓存管理模块
+
+提供统一的缓存接口和管理策略
+"""
@@ -0,0 +1,848 @@
+# -*- coding: utf-8 -*-
+"""
+统一缓存管理器
+
+提供统一的缓存接口和管理策略
+"""
+
+import bisect
+import json
+import logging
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Optional, Dict, List, Set, Tuple
+from pathlib import Path
+
+from .cache_metrics import CacheMetrics
+from .cache_strategies import (
+    CacheStrategy, MemoryCacheStrategy, FileCacheStrategy, HybridCacheStrategy,
+    ShardedFileCacheStrategy, SqliteCacheStrategy
+)
+
+logger = logging.getLogger(__name__)
+
+# stale-while-revalidate 条目的包装键：新鲜期截止时间与值一起写入存储，重启后仍然有效
+_FRESH_UNTIL_KEY = '__cache_fresh_until__'
+
+
+def _wrap_fresh(value: Any, fresh_until: float) -> Dict[str, Any]:
+    """把值和新鲜期截止时间包装成一个条目"""
+    return {_FRESH_UNTIL_KEY: fresh_until, 'value': value}
+
+
+def _unwrap_fresh(stored: Any) -> Tuple[Any, Optional[float]]:
+    """拆出 (值, 新鲜期截止时间)，未包装的条目截止时间为 None"""
+    if isinstance(stored, dict) and _FRESH_UNTIL_KEY in stored and len(stored) == 2 and 'value' in stored:
+        return stored['value'], stored[_FRESH_UNTIL_KEY]
+    return stored, None
+
+
+class _InFlightCall:
+    """进行中的加载调用（同一键的并发请求共享其结果）"""
+    
+    def __init__(self):
+        self._event = threading.Event()
+        self.value: Any = None
+        self.error: Optional[BaseException] = None
+    
+    def resolve(self, value: Any):
+        """设置加载结果并唤醒等待者"""
+        self.value = value
+        self._event.set()
+    
+    def fail(self, error: BaseException):
+        """设置加载异常并唤醒等待者"""
+        self.error = error
+        self._event.set()
+    
+    def wait(self) -> Any:
+        """等待加载完成，失败时重新抛出加载异常"""
+        self._event.wait()
+        if self.error is not None:
+            raise self.error
+        return self.value
+
+
+class _KeyIndex:
+    """
+    单个策略的键索引
+    
+    标签 -> 键 的反向索引用于按标签失效，有序键列表用于按前缀失效。
+    索引保存在当前进程内：本进程写入的键在写入时登记，策略自行淘汰/过期的键
+    经 removal_listener 移除；持久化策略（标签与条目一起保存）在首次按标签/前缀
+    失效时从持久层补全重启前写入的键，内存策略的索引只覆盖本进程
+    """
+    
+    def __init__(self):
+        self.tag_to_keys: Dict[str, Set[str]] = defaultdict(set)
+        self.key_to_tags: Dict[str, Set[str]] = {}
+        self.sorted_keys: List[str] = []
+    
+    def add(self, key: str, tags: Optional[List[str]] = None):
+        """登记键及其标签（重复登记时以最新标签为准）"""
+        if key in self.key_to_tags:
+            self._unlink_tags(key)
+        else:
+            bisect.insort(self.sorted_keys, key)
+        
+        new_tags = set(tags or [])
+        self.key_to_tags[key] = new_tags
+        for tag in new_tags:
+            self.tag_to_keys[tag].add(key)
+    
+    def discard(self, key: str):
+        """移除键"""
+        if key not in self.key_to_tags:
+            return
+        
+        self._unlink_tags(key)
+        del self.key_to_tags[key]
+        index = bisect.bisect_left(self.sorted_keys, key)
+        if index < len(self.sorted_keys) and self.sorted_keys[index] == key:
+            del self.sorted_keys[index]
+    
+    def keys_with_tag(self, tag: str) -> List[str]:
+        """获取带有指定标签的键"""
+        return list(self.tag_to_keys.get(tag, ()))
+    
+    def keys_with_prefix(self, prefix: str) -> List[str]:
+        """获取以指定前缀开头的键（二分定位起点）"""
+        keys = []
+        index = bisect.bisect_left(self.sorted_keys, prefix)
+        while index < len(self.sorted_keys) and self.sorted_keys[index].startswith(prefix):
+            keys.append(self.sorted_keys[index])
+            index += 1
+        return keys
+    
+    def clear(self):
+        """清空索引"""
+        self.tag_to_keys.clear()
+        self.key_to_tags.clear()
+        self.sorted_keys.clear()
+    
+    def _unlink_tags(self, key: str):
+        """解除键与旧标签的关联"""
+        for tag in self.key_to_tags.get(key, ()):
+            keys = self.tag_to_keys.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self.tag_to_keys[tag]
+
+
+class UnifiedCacheManager:
+    """统一缓存管理器"""
+    
+    def __init__(self, config_file: Optional[Path] = None):
+        """
+        初始化统一缓存管理器
+        
+        Args:
+            config_file: 配置文件路径（可选）
+        """
+        self.config_file = config_file or Path("capabilities/cache/cache_config.json")
+        self.config = self._load_config()
+        self._strategies: Dict[str, CacheStrategy] = {}
+        self._statistics: Dict[str, Dict[str, int]] = {}
+        
+        # single-flight：(策略名, 键) -> 进行中的加载
+        self._inflight: Dict[Tuple[str, str], _InFlightCall] = {}
+        self._inflight_lock = threading.Lock()
+        # stale-while-revalidate 的后台刷新线程池（关闭后不再提交新任务）
+        self._refresh_executor: Optional[ThreadPoolExecutor] = None
+        self._closed = False
+        self._metrics = CacheMetrics()
+        # 标签/前缀失效用的键索引：策略名 -> 索引
+        self._key_indexes: Dict[str, _KeyIndex] = defaultdict(_KeyIndex)
+        self._index_lock = threading.Lock()
+        # 已从持久层补全索引的策略
+        self._loaded_indexes: Set[str] = set()
+        
+        # 初始化策略
+        self._init_strategies()
+    
+    def _load_config(self) -> Dict[str, Any]:
+        """加载缓存配置"""
+        if self.config_file.exists():
+            try:
+                with open(self.config_file, 'r', encoding='utf-8') as f:
+                    return json.load(f)
+            except Exception as e:
+                logger.warning(f"加载缓存配置失败: {e}，使用默认配置")
+        
+        # 默认配置
+        return {
+            "cache_strategies": {
+                "bitable": {
+                    "type": "file",
+                    "ttl": 3600,
+                    "location": "work/bitable_cache/"
+                },
+                "spreadsheet": {
+                    "type": "file",
+                    "ttl": 3600,
+                    "location": "work/spreadsheet_cache/"
+                },
+                "fault_guide": {
+                    "type": "file",
+                    "ttl": 86400,
+                    "location": "work/fault_diagnosis_cache/guides/"
+                },
+                "default": {
+                    "type": "memory",
+                    "ttl": 3600,
+                    "max_entries": 1000,
+                    "max_bytes": 104857600,
+                    "eviction_policy": "lru",
+                    "sweep_interval": 300
+                }
+            }
+        }
+    
+    def _init_strategies(self):
+        """初始化缓存策略"""
+        strategies_config = self.config.get("cache_strategies", {})
+        
+        for strategy_name, strategy_config in strategies_config.items():
+            strategy_type = strategy_config.get("type", "memory")
+            ttl = strategy_config.get("ttl", 3600)
+            memory_options = self._get_memory_options(strategy_config)
+            
+            if strategy_type == "memory":
+                strategy = MemoryCacheStrategy(**memory_options)
+            elif strategy_type == "file":
+                location = strategy_config.get("location", "work/cache/")
+                cache_dir = Path(location)
+                strategy = FileCacheStrategy(cache_dir)
+            elif strategy_type == "sharded_file":
+                location = strategy_config.get("location", "work/cache/")
+                cache_dir = Path(location)
+                strategy = ShardedFileCacheStrategy(
+                    cache_dir,
+                    serializer=strategy_config.get("serializer", "pickle"),
+                    compression=strategy_config.get("compression"),
+                    shard_depth=strategy_config.get("shard_depth", 2)
+                )
+            elif strategy_type == "sqlite":
+                location = strategy_config.get("location", "work/cache/cache.db")
+                strategy = SqliteCacheStrategy(Path(location))
+            elif strategy_type == "hybrid":
+                location = strategy_config.get("location", "work/cache/")
+                cache_dir = Path(location)
+                strategy = HybridCacheStrategy(
+                    cache_dir,
+                    write_behind=strategy_config.get("write_behind", True),
+                    flush_interval=strategy_config.get("flush_interval", 1.0),
+                    flush_batch_size=strategy_config.get("flush_batch_size", 100),
+                    promote_after=strategy_config.get("promote_after", 1),
+                    **memory_options
+                )
+            else:
+                logger.warning(f"未知的缓存策略类型: {strategy_type}，使用内存缓存")
+                strategy = MemoryCacheStrategy()
+            
+            strategy.removal_listener = self._make_removal_listener(strategy_name)
+            self._strategies[strategy_name] = strategy
+            self._statistics[strategy_name] = {
+                'hits': 0,
+                'misses': 0,
+                'sets': 0,
+                'deletes': 0,
+                'coalesced': 0,
+                'stale_hits': 0,
+                'background_refreshes': 0,
+                'invalidations': 0
+            }
+    
+    @staticmethod
+    def _get_memory_options(strategy_config: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        提取内存层容量配置
+        
+        Args:
+            strategy_config: 单个策略的配置
+            
+        Returns:
+            传给 MemoryCacheStrategy 的参数字典
+        """
+        option_keys = ("max_entries", "max_bytes", "eviction_policy", "sweep_interval")
+        return {k: strategy_config[k] for k in option_keys if k in strategy_config}
+    
+    def _make_removal_listener(self, strategy_name: str):
+        """创建策略的移除回调（淘汰/过期的键移出索引）"""
+        def on_removed(key: str):
+            self._discard_indexed(strategy_name, key)
+        return on_removed
+    
+    def _discard_indexed(self, strategy_name: str, key: str):
+        """将键移出索引"""
+        with self._index_lock:
+            index = self._key_indexes.get(strategy_name)
+            if index is not None:
+                index.discard(key)
+    
+    def _ensure_index_loaded(self, strategy_name: str, strategy: CacheStrategy):
+        """首次需要时从持久层补全索引（不持久化的策略直接标记为已补全）"""
+        if strategy_name in self._loaded_indexes:
+            return
+        
+        entries = strategy.iter_tagged_keys()
+        entries = list(entries) if entries is not None else []
+        with self._index_lock:
+            if strategy_name in self._loaded_indexes:
+                return
+            index = self._key_indexes[strategy_name]
+            for key, tags in entries:
+                # 本进程已登记的键以内存中的标签为准
+                if key not in index.key_to_tags:
+                    index.add(key, tags)
+            self._loaded_indexes.add(strategy_name)
+    
+    def _get_strategy_config(self, strategy_name: str) -> Dict[str, Any]:
+        """获取单个策略的配置"""
+        return self.config.get("cache_strategies", {}).get(strategy_name, {})
+    
+    def _resolve_strategy_name(self, strategy_name: str) -> str:
+        """
+        解析策略名称（不存在的策略回退到默认策略，统计和索引也记在默认策略下）
+        
+        Args:
+            strategy_name: 策略名称
+            
+        Returns:
+            实际使用的策略名称
+        """
+        if strategy_name not in self._strategies:
+            logger.warning(f"缓存策略 {strategy_name} 不存在，使用默认策略")
+            return "default"
+        return strategy_name
+    
+    def get_strategy_names(self) -> List[str]:
+        """
+        获取已配置的策略名称
+        
+        Returns:
+            策略名称列表
+        """
+        return list(self._strategies)
+    
+    def get_strategy(self, strategy_name: str = "default") -> CacheStrategy:
+        """
+        获取缓存策略
+        
+        Args:
+            strategy_name: 策略名称
+            
+        Returns:
+            缓存策略实例（策略不存在时为默认策略）
+        """
+        return self._strategies[self._resolve_strategy_name(strategy_name)]
+    
+    def get(
+        self,
+        key: str,
+        strategy_name: str = "default"
+    ) -> Optional[Any]:
+        """
+        获取缓存值
+        
+        Args:
+            key: 缓存键
+            strategy_name: 策略名称
+            
+        Returns:
+            缓存值，如果不存在或已过期则返回None
+        """
+        value, _ = self._get_entry(key, self._resolve_strategy_name(strategy_name))
+        return value
+    
+    def _get_entry(self, key: str, strategy_name: str) -> Tuple[Any, Optional[float]]:
+        """读取缓存条目并更新统计，返回 (值, 新鲜期截止时间)"""
+        strategy = self._strategies[strategy_name]
+        started = time.perf_counter()
+        value, fresh_until = _unwrap_fresh(strategy.get(key))
+        self._metrics.observe(strategy_name, 'get', time.perf_counter() - started)
+        
+        # 更新统计
+        if value is not None:
+            self._statistics[strategy_name]['hits'] += 1
+        else:
+            self._statistics[strategy_name]['misses'] += 1
+            # 未命中的键（已过期或被外部删除）不再保留在索引中
+            self._discard_indexed(strategy_name, key)
+        
+        return value, fresh_until
+    
+    def set(
+        self,
+        key: str,
+        value: Any,
+        ttl: Optional[int] = None,
+        strategy_name: str = "default",
+        tags: Optional[List[str]] = None
+    ):
+        """
+        设置缓存值
+        
+        Args:
+            key: 缓存键
+            value: 缓存值
+            ttl: 生存时间（秒），如果为None则使用策略默认值
+            strategy_name: 策略名称
+            tags: 标签列表（如 app_token、table_id），用于 invalidate_tag()
+        """
+        strategy_name = self._resolve_strategy_name(strategy_name)
+        strategy = self._strategies[strategy_name]
+        
+        # 如果没有指定TTL，使用策略配置中的默认值
+        if ttl is None:
+            ttl = self._get_strategy_config(strategy_name).get("ttl", 3600)
+        
+        # 先登记索引，写入时被策略拒绝/淘汰的键会经移除回调撤销
+        with self._index_lock:
+            self._key_indexes[strategy_name].add(key, tags)
+        
+        started = time.perf_counter()
+        try:
+            strategy.set(key, value, ttl, tags)
+        except BaseException:
+            self._discard_indexed(strategy_name, key)
+            raise
+        self._metrics.observe(strategy_name, 'set', time.perf_counter() - started)
+        
+        # 更新统计
+        self._statistics[strategy_name]['sets'] += 1
+    
+    def get_many(
+        self,
+        keys: List[str],
+        strategy_name: str = "default"
+    ) -> Dict[str, Any]:
+        """
+        批量获取缓存值
+        
+        Args:
+            keys: 缓存键列表
+            strategy_name: 策略名称
+            
+        Returns:
+            命中的 键 -> 值 字典
+        """
+        strategy_name = self._resolve_strategy_name(strategy_name)
+        strategy = self._strategies[strategy_name]
+        started = time.perf_counter()
+        result = {
+            key: _unwrap_fresh(value)[0] for key, value in strategy.get_many(keys).items()
+        }
+        self._metrics.observe(strategy_name, 'get', time.perf_counter() - started)
+        
+        # 更新统计
+        self._statistics[strategy_name]['hits'] += len(result)
+        self._statistics[strategy_name]['misses'] += len(keys) - len(result)
+        for key in keys:
+            if key not in result:
+                self._discard_indexed(strategy_name, key)
+        
+        return result
+    
+    def set_many(
+        self,
+        items: Dict[str, Any],
+        ttl: Optional[int] = None,
+        strategy_name: str = "default",
+        tags: Optional[List[str]] = None
+    ):
+        """
+        批量设置缓存值
+        
+        Args:
+            items: 键 -> 值 字典
+            ttl: 生存时间（秒），如果为None则使用策略默认值
+            strategy_name: 策略名称
+            tags: 所有键共用的标签列表
+        """
+        strategy_name = self._resolve_strategy_name(strategy_name)
+        strategy = self._strategies[strategy_name]
+        
+        if ttl is None:
+            ttl = self._get_strategy_config(strategy_name).get("ttl", 3600)
+        
+        with self._index_lock:
+            index = self._key_indexes[strategy_name]
+            for key in items:
+                index.add(key, tags)
+        
+        started = time.perf_counter()
+        try:
+            strategy.set_many(items, ttl, tags)
+        except BaseException:
+            for key in items:
+                self._discard_indexed(strategy_name, key)
+            raise
+        self._metrics.observe(strategy_name, 'set', time.perf_counter() - started)
+        
+        # 更新统计
+        self._statistics[strategy_name]['sets'] += len(items)
+    
+    def delete(self, key: str, strategy_name: str = "default"):
+        """
+        删除缓存值
+        
+        Args:
+            key: 缓存键
+            strategy_name: 策略名称
+        """
+        strategy_name = self._resolve_strategy_name(strategy_name)
+        strategy = self._strategies[strategy_name]
+        strategy.delete(key)
+        with self._index_lock:
+            self._key_indexes[strategy_name].discard(key)
+        
+        # 更新统计
+        self._statistics[strategy_name]['deletes'] += 1
+    
+    def clear(self, strategy_name: Optional[str] = None):
+        """
+        清空缓存
+        
+        Args:
+            strategy_name: 策略名称，如果为None则清空所有策略
+        """
+        if strategy_name:
+            strategy_name = self._resolve_strategy_name(strategy_name)
+            strategy = self._strategies[strategy_name]
+            strategy.clear()
+            with self._index_lock:
+                self._key_indexes.pop(strategy_name, None)
+                self._loaded_indexes.add(strategy_name)
+        else:
+            for strategy in self._strategies.values():
+                strategy.clear()
+            with self._index_lock:
+                self._key_indexes.clear()
+                self._loaded_indexes.update(self._strategies)
+    
+    def invalidate_tag(self, tag: str, strategy_name: Optional[str] = None) -> int:
+        """
+        按标签失效缓存
+        
+        Args:
+            tag: 标签
+            strategy_name: 策略名称，如果为None则处理所有策略
+            
+        Returns:
+            失效的键数量
+        """
+        return self._invalidate(
+            lambda index: index.keys_with_tag(tag), strategy_name
+        )
+    
+    def invalidate_prefix(self, prefix: str, strategy_name: Optional[str] = None) -> int:
+        """
+        按键前缀失效缓存
+        
+        Args:
+            prefix: 键前缀
+            strategy_name: 策略名称，如果为None则处理所有策略
+            
+        Returns:
+            失效的键数量
+        """
+        return self._invalidate(
+            lambda index: index.keys_with_prefix(prefix), strategy_name
+        )
+    
+    def _invalidate(self, select_keys, strategy_name: Optional[str]) -> int:
+        """
+        删除索引选出的键
+        
+        Args:
+            select_keys: 从 _KeyIndex 选出待删除键的函数
+            strategy_name: 策略名称，如果为None则处理所有策略
+            
+        Returns:
+            失效的键数量
+        """
+        strategy_names = [strategy_name] if strategy_name else list(self._strategies)
+        total = 0
+        
+        for name in strategy_names:
+            name = self._resolve_strategy_name(name)
+            strategy = self._strategies[name]
+            self._ensure_index_loaded(name, strategy)
+            with self._index_lock:
+                index = self._key_indexes.get(name)
+                keys = select_keys(index) if index else []
+                for key in keys:
+                    index.discard(key)
+            
+            for key in keys:
+                strategy.delete(key)
+            
+            self._statistics[name]['invalidations'] += len(keys)
+            total += len(keys)
+        
+        return total
+    
+    def exists(self, key: str, strategy_name: str = "default") -> bool:
+        """
+        检查缓存是否存在
+        
+        Args:
+            key: 缓存键
+            strategy_name: 策略名称
+            
+        Returns:
+            缓存是否存在且未过期
+        """
+        strategy_name = self._resolve_strategy_name(strategy_name)
+        strategy = self._strategies[strategy_name]
+        return strategy.exists(key)
+    
+    def get_statistics(self, strategy_name: Optional[str] = None) -> Dict[str, Any]:
+        """
+        获取缓存统计信息
+        
+        Args:
+            strategy_name: 策略名称，如果为None则返回所有策略的统计
+            
+        Returns:
+            统计信息字典
+        """
+        if strategy_name:
+            return self._build_statistics(strategy_name)
+        
+        return {name: self._build_statistics(name) for name in self._statistics}
+    
+    def _build_statistics(self, strategy_name: str) -> Dict[str, Any]:
+        """
+        汇总单个策略的统计信息
+        
+        Args:
+            strategy_name: 策略名称
+            
+        Returns:
+            统计信息字典（含命中率、存储占用、读写字节数和耗时摘要）
+        """
+        stats = self._statistics.get(strategy_name, {})
+        total = stats.get('hits', 0) + stats.get('misses', 0)
+        hit_rate = stats.get('hits', 0) / total if total > 0 else 0
+        strategy = self._strategies.get(strategy_name)
+        
+        return {
+            **stats,
+            'hit_rate': hit_rate,
+            'total_requests': total,
+            'memory_usage': strategy.get_usage() if strategy else {},
+            'io': strategy.get_io_statistics() if strategy else {},
+            'latency': self._metrics.get_latency_summary(strategy_name)
+        }
+    
+    def export_metrics(self, output_file: Optional[Path] = None) -> str:
+        """
+        导出 Prometheus 文本格式指标
+        
+        Args:
+            output_file: 输出文件路径（可选），未指定时使用配置中的 metrics_file；
+                都没有则只返回文本
+            
+        Returns:
+            Prometheus 文本格式的指标
+        """
+        text = self._metrics.render_prometheus(self.get_statistics())
+        
+        output_file = output_file or self.config.get("metrics_file")
+        if output_file:
+            output_path = Path(output_file)
+            output_path.parent.mkdir(parents=True, exist_ok=True)
+            # 先写临时文件再替换，避免采集端读到半个文件
+            tmp_path = output_path.with_name(output_path.name + '.tmp')
+            tmp_path.write_text(text, encoding='utf-8')
+            tmp_path.replace(output_path)
+        
+        return text
+    
+    def flush(self, strategy_name: Optional[str] = None):
+        """
+        将缓冲中的写入同步到持久层
+        
+        Args:
+            strategy_name: 策略名称，如果为None则处理所有策略
+        """
+        if strategy_name:
+            self.get_strategy(strategy_name).flush()
+        else:
+            for strategy in self._strategies.values():
+                strategy.flush()
+    
+    def close(self):
+        """关闭所有策略（停止后台线程并写完缓冲数据）"""
+        with self._inflight_lock:
+            self._closed = True
+            executor, self._refresh_executor = self._refresh_executor, None
+        if executor:
+            executor.shutdown(wait=True)
+        
+        for strategy in self._strategies.values():
+            strategy.close()
+    
+    def refresh(
+        self,
+        key: str,
+        refresh_func,
+        ttl: Optional[int] = None,
+        strategy_name: str = "default",
+        single_flight: Optional[bool] = None,
+        stale_while_revalidate: Optional[int] = None,
+        tags: Optional[List[str]] = None
+    ) -> Any:
+        """
+        刷新缓存（如果不存在或已过期则调用刷新函数）
+        
+        single-flight 模式下，同一键的并发未命中只会触发一次刷新函数，
+        其余调用方等待并共享该结果。开启 stale-while-revalidate 后，
+        值过了新鲜期仍会在宽限期内直接返回，同时在后台异步刷新。
+        
+        Args:
+            key: 缓存键
+            refresh_func: 刷新函数（无参数，返回缓存值）
+            ttl: 生存时间（秒）
+            strategy_name: 策略名称
+            single_flight: 是否合并并发加载，None则使用策略配置（默认开启）
+            stale_while_revalidate: 过期后仍可返回旧值的宽限期（秒），
+                None则使用策略配置（默认0，即关闭）
+            tags: 写入时附带的标签列表
+            
+        Returns:
+            缓存值
+        """
+        strategy_name = self._resolve_strategy_name(strategy_name)
+        strategy_config = self._get_strategy_config(strategy_name)
+        if single_flight is None:
+            single_flight = strategy_config.get("single_flight", True)
+        if stale_while_revalidate is None:
+            stale_while_revalidate = strategy_config.get("stale_while_revalidate", 0)
+        if ttl is None:
+            ttl = strategy_config.get("ttl", 3600)
+        
+        value, fresh_until = self._get_entry(key, strategy_name)
+        
+        if value is not None:
+            if stale_while_revalidate and fresh_until and time.time() > fresh_until:
+                # 已过新鲜期：先返回旧值，后台刷新
+                self._statistics[strategy_name]['stale_hits'] += 1
+                self._revalidate_in_background(
+                    key, refresh_func, ttl, strategy_name, stale_while_revalidate, tags
+                )
+            return value
+        
+        # 缓存不存在或已过期，调用刷新函数
+        if not single_flight:
+            return self._load_and_set(
+                key, refresh_func, ttl, strategy_name, stale_while_revalidate, tags
+            )
+        
+        return self._load_single_flight(
+            key, refresh_func, ttl, strategy_name, stale_while_revalidate, tags
+        )
+    
+    def _load_and_set(
+        self,
+        key: str,
+        refresh_func,
+        ttl: int,
+        strategy_name: str,
+        stale_while_revalidate: int,
+        tags: Optional[List[str]] = None
+    ) -> Any:
+        """调用刷新函数并写入缓存（宽限期内值仍保留在存储中）"""
+        started = time.perf_counter()
+        value = refresh_func()
+        self._metrics.observe(strategy_name, 'load', time.perf_counter() - started)
+        if stale_while_revalidate:
+            stored = _wrap_fresh(value, time.time() + ttl)
+        else:
+            stored = value
+        self.set(key, stored, ttl + stale_while_revalidate, strategy_name, tags)
+        return value
+    
+    def _load_single_flight(
+        self,
+        key: str,
+        refresh_func,
+        ttl: int,
+        strategy_name: str,
+        stale_while_revalidate: int,
+        tags: Optional[List[str]] = None
+    ) -> Any:
+        """合并同一键的并发加载，只有首个调用方执行刷新函数"""
+        flight_key = (strategy_name, key)
+        
+        with self._inflight_lock:
+            call = self._inflight.get(flight_key)
+            is_leader = call is None
+            if is_leader:
+                call = _InFlightCall()
+                self._inflight[flight_key] = call
+        
+        if not is_leader:
+            self._statistics[strategy_name]['coalesced'] += 1
+            return call.wait()
+        
+        try:
+            # 等锁期间可能已有其他加载完成并写入
+            value, _ = _unwrap_fresh(self.get_strategy(strategy_name).get(key))
+            if value is None:
+                value = self._load_and_set(
+                    key, refresh_func, ttl, strategy_name, stale_while_revalidate, tags
+                )
+            call.resolve(value)
+            return value
+        except BaseException as e:
+            call.fail(e)
+            raise
+        finally:
+            with self._inflight_lock:
+                self._inflight.pop(flight_key, None)
+    
+    def _revalidate_in_background(
+        self,
+        key: str,
+        refresh_func,
+        ttl: int,
+        strategy_name: str,
+        stale_while_revalidate: int,
+        tags: Optional[List[str]] = None
+    ):
+        """在后台线程中刷新过了新鲜期的值（同一键同时只刷新一次，关闭后不再刷新）"""
+        flight_key = (strategy_name, key)
+        call = _InFlightCall()
+        
+        def _run():
+            try:
+                value = self._load_and_set(
+                    key, refresh_func, ttl, strategy_name, stale_while_revalidate, tags
+                )
+                self._statistics[strategy_name]['background_refreshes'] += 1
+                call.resolve(value)
+            except Exception as e:
+                logger.warning(f"后台刷新缓存失败 {strategy_name}/{key}: {e}")
+                call.fail(e)
+            finally:
+                with self._inflight_lock:
+                    self._inflight.pop(flight_key, None)
+        
+        # 在锁内检查关闭状态并提交，避免与 close() 竞争
+        with self._inflight_lock:
+            if self._closed or flight_key in self._inflight:
+                return
+            if self._refresh_executor is None:
+                max_workers = self.config.get("refresh_workers", 4)
+                self._refresh_executor = ThreadPoolExecutor(
+                    max_workers=max_workers,
+                    thread_name_prefix='cache-refresh'
+                )
+            self._inflight[flight_key] = call
+            self._refresh_executor.submit(_run)
@@ -0,0 +1,182 @@
+# -*- coding: utf-8 -*-
+"""
+缓存指标
+
+记录缓存操作耗时直方图，并导出为 Prometheus 文本格式
+"""
+
+import bisect
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+
+# 默认直方图桶上界（秒），覆盖内存命中到远程加载的量级
+DEFAULT_BUCKETS = (
+    0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0, 30.0
+)
+
+
+class LatencyHistogram:
+    """累积耗时直方图（线程安全）"""
+    
+    def __init__(self, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        """
+        初始化直方图
+        
+        Args:
+            buckets: 桶上界列表（秒，升序），+Inf 桶自动追加
+        """
+        self.buckets = tuple(buckets)
+        self._counts = [0] * (len(self.buckets) + 1)
+        self._sum = 0.0
+        self._count = 0
+        self._max = 0.0
+        self._lock = threading.Lock()
+    
+    def observe(self, seconds: float):
+        """记录一次耗时"""
+        index = bisect.bisect_left(self.buckets, seconds)
+        with self._lock:
+            self._counts[index] += 1
+            self._sum += seconds
+            self._count += 1
+            if seconds > self._max:
+                self._max = seconds
+    
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        获取直方图快照
+        
+        Returns:
+            包含累积桶计数、总耗时、次数、最大值的字典
+        """
+        with self._lock:
+            counts = list(self._counts)
+            total, count, maximum = self._sum, self._count, self._max
+        
+        cumulative = []
+        running = 0
+        for bound, bucket_count in zip(list(self.buckets) + [float('inf')], counts):
+            running += bucket_count
+            cumulative.append((bound, running))
+        
+        return {
+            'buckets': cumulative,
+            'sum': total,
+            'count': count,
+            'max': maximum,
+            'avg': total / count if count > 0 else 0
+        }
+
+
+class CacheMetrics:
+    """按策略、按操作类型记录的缓存耗时指标"""
+    
+    OPERATIONS = ('get', 'set', 'load')
+    
+    def __init__(self, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        """
+        初始化缓存指标
+        
+        Args:
+            buckets: 直方图桶上界（秒）
+        """
+        self.buckets = buckets
+        self._histograms: Dict[Tuple[str, str], LatencyHistogram] = {}
+        self._lock = threading.Lock()
+    
+    def observe(self, strategy_name: str, operation: str, seconds: float):
+        """
+        记录一次操作耗时
+        
+        Args:
+            strategy_name: 策略名称
+            operation: 操作类型（get / set / load）
+            seconds: 耗时（秒）
+        """
+        key = (strategy_name, operation)
+        histogram = self._histograms.get(key)
+        if histogram is None:
+            with self._lock:
+                histogram = self._histograms.setdefault(key, LatencyHistogram(self.buckets))
+        histogram.observe(seconds)
+    
+    def get_latency_summary(self, strategy_name: str) -> Dict[str, Dict[str, float]]:
+        """
+        获取单个策略各操作的耗时摘要
+        
+        Args:
+            strategy_name: 策略名称
+            
+        Returns:
+            操作类型 -> {count, avg, max, sum}
+        """
+        summary = {}
+        for (name, operation), histogram in list(self._histograms.items()):
+            if name != strategy_name:
+                continue
+            snap = histogram.snapshot()
+            summary[operation] = {
+                'count': snap['count'],
+                'avg': snap['avg'],
+                'max': snap['max'],
+                'sum': snap['sum']
+            }
+        return summary
+    
+    def render_prometheus(
+        self,
+        statistics: Dict[str, Dict[str, Any]],
+        prefix: str = 'unified_cache'
+    ) -> str:
+        """
+        渲染为 Prometheus 文本格式
+        
+        Args:
+            statistics: UnifiedCacheManager.get_statistics() 的返回值
+            prefix: 指标名前缀
+            
+        Returns:
+            Prometheus 文本格式的指标
+        """
+        lines: List[str] = []
+        
+        name = f'{prefix}_operation_duration_seconds'
+        lines.append(f'# HELP {name} Cache operation latency by strategy and operation.')
+        lines.append(f'# TYPE {name} histogram')
+        for (strategy_name, operation), histogram in sorted(self._histograms.items()):
+            snap = histogram.snapshot()
+            labels = f'strategy="{_escape(strategy_name)}",operation="{operation}"'
+            for bound, count in snap['buckets']:
+                le = '+Inf' if bound == float('inf') else repr(bound)
+                lines.append(f'{name}_bucket{{{labels},le="{le}"}} {count}')
+            lines.append(f'{name}_sum{{{labels}}} {snap["sum"]}')
+            lines.append(f'{name}_count{{{labels}}} {snap["count"]}')
+        
+        counters = [
+            ('hits', 'requests_total', 'result="hit"', 'Cache lookups by result.'),
+            ('misses', 'requests_total', 'result="miss"', None),
+            ('sets', 'sets_total', None, 'Cache writes.'),
+            ('deletes', 'deletes_total', None, 'Cache deletes.'),
+            ('bytes_read', 'bytes_read_total', None, 'Bytes read from cache storage.'),
+            ('bytes_written', 'bytes_written_total', None, 'Bytes written to cache storage.'),
+            ('evictions', 'evictions_total', None, 'Entries evicted by capacity limits.'),
+        ]
+        for stat_key, metric, extra_label, help_text in counters:
+            metric_name = f'{prefix}_{metric}'
+            if help_text:
+                lines.append(f'# HELP {metric_name} {help_text}')
+                lines.append(f'# TYPE {metric_name} counter')
+            for strategy_name, stats in sorted(statistics.items()):
+                value = stats.get(stat_key, stats.get('io', {}).get(stat_key, 0))
+                labels = f'strategy="{_escape(strategy_name)}"'
+                if extra_label:
+                    labels = f'{labels},{extra_label}'
+                lines.append(f'{metric_name}{{{labels}}} {value}')
+        
+        return '\n'.join(lines) + '\n'
+
+
+def _escape(value: Optional[str]) -> str:
+    """转义 Prometheus 标签值"""
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
@@ -0,0 +1,1267 @@
+# -*- coding: utf-8 -*-
+"""
+缓存策略实现
+
+支持多种缓存策略：内存缓存、文件缓存、分片二进制文件缓存、SQLite缓存、TTL管理
+"""
+
+import atexit
+import hashlib
+import json
+import logging
+import os
+import pickle
+import shutil
+import sqlite3
+import struct
+import sys
+import tempfile
+import time
+import threading
+import zlib
+from abc import ABC, abstractmethod
+from collections import OrderedDict, defaultdict
+from typing import Any, Callable, Iterator, Optional, Dict, List, Tuple
+from pathlib import Path
+
+try:
+    import msgpack
+    HAS_MSGPACK = True
+except ImportError:
+    HAS_MSGPACK = False
+
+try:
+    import zstandard
+    HAS_ZSTD = True
+except ImportError:
+    HAS_ZSTD = False
+
+logger = logging.getLogger(__name__)
+
+
+class CacheStrategy(ABC):
+    """缓存策略基类"""
+    
+    # 存储层读写字节数（由子类在读写时累加）
+    bytes_read = 0
+    bytes_written = 0
+    # 策略自行移除条目（容量淘汰、过期清理）时的回调，参数为键；由 UnifiedCacheManager 设置
+    removal_listener: Optional[Callable[[str], None]] = None
+    
+    @abstractmethod
+    def get(self, key: str) -> Optional[Any]:
+        """获取缓存值"""
+        pass
+    
+    @abstractmethod
+    def set(self, key: str, value: Any, ttl: Optional[int] = None, tags: Optional[List[str]] = None):
+        """设置缓存值（持久化策略将标签与条目一起保存）"""
+        pass
+    
+    @abstractmethod
+    def delete(self, key: str):
+        """删除缓存值"""
+        pass
+    
+    @abstractmethod
+    def clear(self):
+        """清空所有缓存"""
+        pass
+    
+    @abstractmethod
+    def exists(self, key: str) -> bool:
+        """检查缓存是否存在"""
+        pass
+    
+    def get_entry(self, key: str) -> Optional[Tuple[Any, Optional[float]]]:
+        """
+        获取缓存值及其过期时间
+        
+        Args:
+            key: 缓存键
+            
+        Returns:
+            (值, 过期时间戳) 元组，不存在时返回None；
+            默认实现不提供过期时间（为None）
+        """
+        value = self.get(key)
+        if value is None:
+            return None
+        return value, None
+    
+    def get_many(self, keys: List[str]) -> Dict[str, Any]:
+        """
+        批量获取缓存值
+        
+        Args:
+            keys: 缓存键列表
+            
+        Returns:
+            命中的 键 -> 值 字典（未命中的键不包含在内）
+        """
+        result = {}
+        for key in keys:
+            value = self.get(key)
+            if value is not None:
+                result[key] = value
+        return result
+    
+    def set_many(self, items: Dict[str, Any], ttl: Optional[int] = None, tags: Optional[List[str]] = None):
+        """
+        批量设置缓存值
+        
+        Args:
+            items: 键 -> 值 字典
+            ttl: 生存时间（秒）
+            tags: 所有键共用的标签列表
+        """
+        for key, value in items.items():
+            self.set(key, value, ttl, tags)
+    
+    def iter_tagged_keys(self) -> Optional[Iterator[Tuple[str, List[str]]]]:
+        """
+        遍历持久层中未过期的键及其标签（进程重启后用于重建键索引）
+        
+        Returns:
+            (键, 标签列表) 迭代器；不持久化的策略返回None
+        """
+        return None
+    
+    def _notify_removed(self, key: str):
+        """通知条目已被策略自行移除"""
+        listener = self.removal_listener
+        if listener is None:
+            return
+        try:
+            listener(key)
+        except Exception as e:
+            logger.warning(f"缓存移除回调失败 {key}: {e}")
+    
+    def get_usage(self) -> Dict[str, Any]:
+        """
+        获取存储占用情况
+        
+        Returns:
+            占用统计字典，子类可按需重写
+        """
+        return {}
+    
+    def get_io_statistics(self) -> Dict[str, int]:
+        """
+        获取读写统计
+        
+        Returns:
+            包含 bytes_read、bytes_written、evictions 的字典
+        """
+        return {
+            'bytes_read': self.bytes_read,
+            'bytes_written': self.bytes_written,
+            'evictions': 0
+        }
+    
+    def flush(self):
+        """将尚未落盘的写入同步到持久层（无缓冲的策略无需处理）"""
+        pass
+    
+    def close(self):
+        """释放策略持有的资源（后台线程等）"""
+        pass
+
+
+def _estimate_size(value: Any) -> int:
+    """
+    估算对象占用的内存字节数（递归统计容器内元素）
+    
+    Args:
+        value: 待估算的对象
+        
+    Returns:
+        估算的字节数
+    """
+    seen = set()
+    stack = [value]
+    total = 0
+    
+    while stack:
+        obj = stack.pop()
+        if id(obj) in seen:
+            continue
+        seen.add(id(obj))
+        total += sys.getsizeof(obj)
+        
+        if isinstance(obj, dict):
+            stack.extend(obj.keys())
+            stack.extend(obj.values())
+        elif isinstance(obj, (list, tuple, set, frozenset)):
+            stack.extend(obj)
+    
+    return total
+
+
+class MemoryCacheStrategy(CacheStrategy):
+    """
+    内存缓存策略
+    
+    支持按条目数和字节数限制容量，超限时按 LRU 或 LFU 淘汰；
+    可选启动后台线程定期清理过期条目
+    """
+    
+    EVICTION_POLICIES = ('lru', 'lfu')
+    
+    def __init__(
+        self,
+        max_entries: Optional[int] = None,
+        max_bytes: Optional[int] = None,
+        eviction_policy: str = 'lru',
+        sweep_interval: Optional[float] = None
+    ):
+        """
+        初始化内存缓存
+        
+        Args:
+            max_entries: 最大条目数（None表示不限制）
+            max_bytes: 最大占用字节数（None表示不限制）
+            eviction_policy: 淘汰策略，lru 或 lfu
+            sweep_interval: 后台过期清理间隔（秒，None表示不启动清理线程）
+        """
+        if eviction_policy not in self.EVICTION_POLICIES:
+            raise ValueError(f"不支持的淘汰策略: {eviction_policy}")
+        
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.eviction_policy = eviction_policy
+        
+        self._cache: 'OrderedDict[str, Dict[str, Any]]' = OrderedDict()
+        self._lock = threading.RLock()
+        self._total_bytes = 0
+        self._evictions = 0
+        self._expirations = 0
+        
+        # LFU：访问频次 -> 该频次下的键（同频次时按最久未访问顺序淘汰）
+        self._freq_buckets: Dict[int, OrderedDict] = defaultdict(OrderedDict)
+        self._min_freq = 0
+        
+        self._sweeper: Optional[threading.Thread] = None
+        self._sweeper_stop = threading.Event()
+        if sweep_interval:
+            self.start_sweeper(sweep_interval)
+    
+    def get(self, key: str) -> Optional[Any]:
+        """获取缓存值"""
+        with self._lock:
+            entry = self._cache.get(key)
+            if entry is None:
+                return None
+            
+            # 检查TTL
+            if self._is_expired(entry):
+                self._remove(key)
+                self._expirations += 1
+                self._notify_removed(key)
+                return None
+            
+            self._touch(key, entry)
+            self.bytes_read += entry['size']
+            return entry['value']
+    
+    def set(self, key: str, value: Any, ttl: Optional[int] = None, tags: Optional[List[str]] = None):
+        """设置缓存值（内存缓存不保存标签）"""
+        size = _estimate_size(value)
+        
+        with self._lock:
+            if key in self._cache:
+                self._remove(key)
+            
+            # 单个值超过字节上限时不缓存
+            if self.max_bytes and size > self.max_bytes:
+                self._notify_removed(key)
+                return
+            
+            self._make_room(size)
+            
+            entry = {'value': value, 'size': size, 'freq': 1}
+            if ttl:
+                entry['expires_at'] = time.time() + ttl
+            
+            self._cache[key] = entry
+            self._total_bytes += size
+            self.bytes_written += size
+            if self.eviction_policy == 'lfu':
+                self._freq_buckets[1][key] = None
+                self._min_freq = 1
+    
+    def delete(self, key: str):
+        """删除缓存值"""
+        with self._lock:
+            if key in self._cache:
+                self._remove(key)
+    
+    def clear(self):
+        """清空所有缓存"""
+        with self._lock:
+            self._cache.clear()
+            self._freq_buckets.clear()
+            self._min_freq = 0
+            self._total_bytes = 0
+    
+    def exists(self, key: str) -> bool:
+        """检查缓存是否存在"""
+        with self._lock:
+            entry = self._cache.get(key)
+            if entry is None:
+                return False
+            
+            # 检查TTL
+            if self._is_expired(entry):
+                self._remove(key)
+                self._expirations += 1
+                self._notify_removed(key)
+                return False
+            
+            return True
+    
+    def sweep_expired(self) -> int:
+        """
+        清理所有过期条目
+        
+        Returns:
+            清理的条目数
+        """
+        now = time.time()
+        with self._lock:
+            expired_keys = [
+                key for key, entry in self._cache.items()
+                if self._is_expired(entry, now)
+            ]
+            for key in expired_keys:
+                self._remove(key)
+                self._notify_removed(key)
+            self._expirations += len(expired_keys)
+        
+        return len(expired_keys)
+    
+    def start_sweeper(self, interval: float):
+        """
+        启动后台过期清理线程
+        
+        Args:
+            interval: 清理间隔（秒）
+        """
+        if self._sweeper and self._sweeper.is_alive():
+            return
+        
+        self._sweeper_stop.clear()
+        
+        def _run():
+            while not self._sweeper_stop.wait(interval):
+                self.sweep_expired()
+        
+        self._sweeper = threading.Thread(
+            target=_run, name='memory-cache-sweeper', daemon=True
+        )
+        self._sweeper.start()
+    
+    def stop_sweeper(self):
+        """停止后台过期清理线程"""
+        self._sweeper_stop.set()
+        if self._sweeper:
+            self._sweeper.join(timeout=1)
+            self._sweeper = None
+    
+    def close(self):
+        """释放资源"""
+        self.stop_sweeper()
+    
+    def get_io_statistics(self) -> Dict[str, int]:
+        """获取读写统计"""
+        return {
+            'bytes_read': self.bytes_read,
+            'bytes_written': self.bytes_written,
+            'evictions': self._evictions
+        }
+    
+    def get_usage(self) -> Dict[str, Any]:
+        """获取内存占用情况"""
+        with self._lock:
+            return {
+                'entries': len(self._cache),
+                'bytes': self._total_bytes,
+                'max_entries': self.max_entries,
+                'max_bytes': self.max_bytes,
+                'eviction_policy': self.eviction_policy,
+                'evictions': self._evictions,
+                'expirations': self._expirations
+            }
+    
+    @staticmethod
+    def _is_expired(entry: Dict[str, Any], now: Optional[float] = None) -> bool:
+        """检查条目是否过期"""
+        if 'expires_at' not in entry:
+            return False
+        return (now or time.time()) > entry['expires_at']
+    
+    def _touch(self, key: str, entry: Dict[str, Any]):
+        """记录一次访问（更新LRU顺序或LFU频次）"""
+        if self.eviction_policy == 'lru':
+            self._cache.move_to_end(key)
+            return
+        
+        freq = entry['freq']
+        bucket = self._freq_buckets[freq]
+        del bucket[key]
+        if not bucket:
+            del self._freq_buckets[freq]
+            if self._min_freq == freq:
+                self._min_freq = freq + 1
+        
+        entry['freq'] = freq + 1
+        self._freq_buckets[freq + 1][key] = None
+    
+    def _remove(self, key: str):
+        """移除条目并更新容量统计"""
+        entry = self._cache.pop(key)
+        self._total_bytes -= entry['size']
+        
+        if self.eviction_policy == 'lfu':
+            freq = entry['freq']
+            bucket = self._freq_buckets[freq]
+            del bucket[key]
+            if not bucket:
+                del self._freq_buckets[freq]
+                if self._min_freq == freq:
+                    self._min_freq = min(self._freq_buckets) if self._freq_buckets else 0
+    
+    def _make_room(self, incoming_size: int):
+        """按淘汰策略腾出空间以容纳新条目"""
+        while self._cache and (
+            (self.max_entries and len(self._cache) >= self.max_entries) or
+            (self.max_bytes and self._total_bytes + incoming_size > self.max_bytes)
+        ):
+            if self.eviction_policy == 'lru':
+                victim = next(iter(self._cache))
+            else:
+                victim = next(iter(self._freq_buckets[self._min_freq]))
+            self._remove(victim)
+            self._evictions += 1
+            self._notify_removed(victim)
+
+
+class FileCacheStrategy(CacheStrategy):
+    """文件缓存策略"""
+    
+    def __init__(self, cache_dir: Path):
+        """
+        初始化文件缓存
+        
+        Args:
+            cache_dir: 缓存目录路径
+        """
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+    
+    def _get_cache_path(self, key: str) -> Path:
+        """获取缓存文件路径"""
+        # 使用key的hash作为文件名，避免特殊字符问题
+        import hashlib
+        key_hash = hashlib.md5(key.encode('utf-8')).hexdigest()
+        return self.cache_dir / f"{key_hash}.json"
+    
+    def get(self, key: str) -> Optional[Any]:
+        """获取缓存值"""
+        entry = self.get_entry(key)
+        return entry[0] if entry else None
+    
+    def get_entry(self, key: str) -> Optional[Tuple[Any, Optional[float]]]:
+        """获取缓存值及其过期时间"""
+        cache_path = self._get_cache_path(key)
+        
+        if not cache_path.exists():
+            return None
+        
+        try:
+            with open(cache_path, 'r', encoding='utf-8') as f:
+                entry = json.load(f)
+                self.bytes_read += os.fstat(f.fileno()).st_size
+            
+            # 检查TTL
+            if 'expires_at' in entry:
+                if time.time() > entry['expires_at']:
+                    cache_path.unlink()
+                    self._notify_removed(key)
+                    return None
+            
+            value = entry.get('value')
+            if value is None:
+                return None
+            return value, entry.get('expires_at')
+        except Exception:
+            return None
+    
+    def set(self, key: str, value: Any, ttl: Optional[int] = None, tags: Optional[List[str]] = None):
+        """设置缓存值"""
+        cache_path = self._get_cache_path(key)
+        
+        entry = {
+            'key': key,
+            'value': value,
+            'cached_at': time.time()
+        }
+        
+        if ttl:
+            entry['expires_at'] = time.time() + ttl
+        if tags:
+            entry['tags'] = list(tags)
+        
+        try:
+            with open(cache_path, 'w', encoding='utf-8') as f:
+                json.dump(entry, f, ensure_ascii=False, indent=2)
+                self.bytes_written += f.tell()
+        except Exception as e:
+            raise RuntimeError(f"写入缓存失败: {e}")
+    
+    def delete(self, key: str):
+        """删除缓存值"""
+        cache_path = self._get_cache_path(key)
+        if cache_path.exists():
+            cache_path.unlink()
+    
+    def clear(self):
+        """清空所有缓存"""
+        for cache_file in self.cache_dir.glob("*.json"):
+            try:
+                cache_file.unlink()
+            except Exception:
+                pass
+    
+    def exists(self, key: str) -> bool:
+        """检查缓存是否存在"""
+        cache_path = self._get_cache_path(key)
+        
+        if not cache_path.exists():
+            return False
+        
+        try:
+            with open(cache_path, 'r', encoding='utf-8') as f:
+                entry = json.load(f)
+            
+            # 检查TTL
+            if 'expires_at' in entry:
+                if time.time() > entry['expires_at']:
+                    cache_path.unlink()
+                    self._notify_removed(key)
+                    return False
+            
+            return True
+        except Exception:
+            return False
+    
+    def iter_tagged_keys(self) -> Optional[Iterator[Tuple[str, List[str]]]]:
+        """遍历缓存文件中未过期的键及其标签"""
+        now = time.time()
+        for cache_file in self.cache_dir.glob("*.json"):
+            try:
+                with open(cache_file, 'r', encoding='utf-8') as f:
+                    entry = json.load(f)
+            except Exception:
+                continue
+            if 'key' not in entry or ('expires_at' in entry and now > entry['expires_at']):
+                continue
+            yield entry['key'], entry.get('tags', [])
+
+
+class ShardedFileCacheStrategy(CacheStrategy):
+    """
+    分片二进制文件缓存策略
+    
+    键按哈希分散到多级子目录，值以 pickle/msgpack 紧凑序列化（可选 zlib/zstd 压缩）。
+    文件格式：魔数 + 文件头长度 + JSON文件头（键、过期时间、编码方式）+ 负载，
+    exists() 只读文件头；写入经临时文件 + 重命名，保证读者不会看到半写的文件
+    """
+    
+    MAGIC = b'UCF1'
+    SERIALIZERS = ('pickle', 'msgpack')
+    COMPRESSIONS = (None, 'zlib', 'zstd')
+    _PREFIX = struct.Struct('>4sI')
+    
+    def __init__(
+        self,
+        cache_dir: Path,
+        serializer: str = 'pickle',
+        compression: Optional[str] = None,
+        shard_depth: int = 2
+    ):
+        """
+        初始化分片文件缓存
+        
+        Args:
+            cache_dir: 缓存目录路径
+            serializer: 序列化方式，pickle 或 msgpack
+            compression: 压缩方式，None、zlib 或 zstd
+            shard_depth: 分片目录层数（每层取哈希的2个字符）
+        """
+        if serializer not in self.SERIALIZERS:
+            raise ValueError(f"不支持的序列化方式: {serializer}")
+        if compression not in self.COMPRESSIONS:
+            raise ValueError(f"不支持的压缩方式: {compression}")
+        
+        if serializer == 'msgpack' and not HAS_MSGPACK:
+            logger.warning("msgpack未安装，改用pickle序列化")
+            serializer = 'pickle'
+        if compression == 'zstd' and not HAS_ZSTD:
+            logger.warning("zstandard未安装，改用zlib压缩")
+            compression = 'zlib'
+        
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.serializer = serializer
+        self.compression = compression
+        self.shard_depth = shard_depth
+    
+    def _get_cache_path(self, key: str) -> Path:
+        """获取缓存文件路径（按哈希前缀分片）"""
+        key_hash = hashlib.md5(key.encode('utf-8')).hexdigest()
+        shard_parts = [key_hash[i * 2:i * 2 + 2] for i in range(self.shard_depth)]
+        return self.cache_dir.joinpath(*shard_parts, f"{key_hash}.bin")
+    
+    def _read_header(self, f) -> Optional[Dict[str, Any]]:
+        """从文件开头读取元数据头，格式不符时返回None"""
+        prefix = f.read(self._PREFIX.size)
+        if len(prefix) != self._PREFIX.size:
+            return None
+        
+        magic, header_len = self._PREFIX.unpack(prefix)
+        if magic != self.MAGIC:
+            return None
+        
+        return json.loads(f.read(header_len).decode('utf-8'))
+    
+    def _encode(self, value: Any) -> bytes:
+        """序列化并压缩值"""
+        if self.serializer == 'msgpack':
+            payload = msgpack.packb(value, use_bin_type=True)
+        else:
+            payload = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        
+        if self.compression == 'zstd':
+            payload = zstandard.ZstdCompressor().compress(payload)
+        elif self.compression == 'zlib':
+            payload = zlib.compress(payload)
+        
+        return payload
+    
+    @staticmethod
+    def _decode(payload: bytes, header: Dict[str, Any]) -> Any:
+        """按文件头记录的方式解压并反序列化"""
+        compression = header.get('compression')
+        if compression == 'zstd':
+            payload = zstandard.ZstdDecompressor().decompress(payload)
+        elif compression == 'zlib':
+            payload = zlib.decompress(payload)
+        
+        if header.get('serializer') == 'msgpack':
+            return msgpack.unpackb(payload, raw=False)
+        return pickle.loads(payload)
+    
+    @staticmethod
+    def _is_expired(header: Dict[str, Any]) -> bool:
+        """检查文件头中的过期时间"""
+        return 'expires_at' in header and time.time() > header['expires_at']
+    
+    def _unlink(self, cache_path: Path):
+        """删除缓存文件（忽略已被其他进程删除的情况）"""
+        try:
+            cache_path.unlink()
+        except FileNotFoundError:
+            pass
+    
+    def get(self, key: str) -> Optional[Any]:
+        """获取缓存值"""
+        cache_path = self._get_cache_path(key)
+        
+        try:
+            with open(cache_path, 'rb') as f:
+                header = self._read_header(f)
+                if header is None or self._is_expired(header):
+                    payload = None
+                else:
+                    payload = f.read()
+                    self.bytes_read += f.tell()
+        except FileNotFoundError:
+            return None
+        except Exception:
+            return None
+        
+        if payload is None:
+            if header is not None:
+                self._unlink(cache_path)
+                self._notify_removed(key)
+            return None
+        
+        try:
+            return self._decode(payload, header)
+        except Exception:
+            return None
+    
+    def set(self, key: str, value: Any, ttl: Optional[int] = None, tags: Optional[List[str]] = None):
+        """设置缓存值（原子写入）"""
+        cache_path = self._get_cache_path(key)
+        now = time.time()
+        
+        header = {
+            'key': key,
+            'cached_at': now,
+            'serializer': self.serializer,
+            'compression': self.compression
+        }
+        if ttl:
+            header['expires_at'] = now + ttl
+        if tags:
+            header['tags'] = list(tags)
+        
+        try:
+            payload = self._encode(value)
+            header_bytes = json.dumps(
+                header, ensure_ascii=False, separators=(',', ':')
+            ).encode('utf-8')
+            
+            cache_path.parent.mkdir(parents=True, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=cache_path.parent, suffix='.tmp')
+            try:
+                with os.fdopen(fd, 'wb') as f:
+                    f.write(self._PREFIX.pack(self.MAGIC, len(header_bytes)))
+                    f.write(header_bytes)
+                    f.write(payload)
+                os.replace(tmp_path, cache_path)
+                self.bytes_written += self._PREFIX.size + len(header_bytes) + len(payload)
+            except BaseException:
+                try:
+                    os.unlink(tmp_path)
+                except OSError:
+                    pass
+                raise
+        except Exception as e:
+            raise RuntimeError(f"写入缓存失败: {e}")
+    
+    def delete(self, key: str):
+        """删除缓存值"""
+        self._unlink(self._get_cache_path(key))
+    
+    def clear(self):
+        """清空所有缓存（整体删除分片目录，目录中的其他内容保持不变）"""
+        for child in self.cache_dir.iterdir():
+            try:
+                if child.is_dir() and self._is_shard_dir(child):
+                    shutil.rmtree(child)
+                elif child.is_file() and child.suffix in ('.bin', '.tmp'):
+                    child.unlink()
+            except Exception:
+                pass
+    
+    def _is_shard_dir(self, path: Path) -> bool:
+        """是否为本策略创建的分片目录（2位十六进制名称）"""
+        if self.shard_depth <= 0:
+            return False
+        return len(path.name) == 2 and all(c in '0123456789abcdef' for c in path.name)
+    
+    def exists(self, key: str) -> bool:
+        """检查缓存是否存在（只读取文件头）"""
+        cache_path = self._get_cache_path(key)
+        
+        try:
+            with open(cache_path, 'rb') as f:
+                header = self._read_header(f)
+        except FileNotFoundError:
+            return False
+        except Exception:
+            return False
+        
+        if header is None:
+            return False
+        
+        if self._is_expired(header):
+            self._unlink(cache_path)
+            self._notify_removed(key)
+            return False
+        
+        return True
+    
+    def iter_tagged_keys(self) -> Optional[Iterator[Tuple[str, List[str]]]]:
+        """遍历分片文件头中未过期的键及其标签（只读文件头）"""
+        for cache_path in self.cache_dir.rglob("*.bin"):
+            try:
+                with open(cache_path, 'rb') as f:
+                    header = self._read_header(f)
+            except Exception:
+                continue
+            if header is None or 'key' not in header or self._is_expired(header):
+                continue
+            yield header['key'], header.get('tags', [])
+    
+    def get_usage(self) -> Dict[str, Any]:
+        """获取存储配置"""
+        return {
+            'serializer': self.serializer,
+            'compression': self.compression,
+            'shard_depth': self.shard_depth
+        }
+
+
+class SqliteCacheStrategy(CacheStrategy):
+    """
+    SQLite缓存策略
+    
+    所有条目存放在单个 WAL 模式数据库中，expires_at 建有索引，
+    过期清理和批量读写都在单条SQL/单个事务内完成，无需遍历目录
+    """
+    
+    # SQLite 单条语句的参数个数上限为 999
+    _BATCH_SIZE = 500
+    
+    def __init__(self, db_path: Path):
+        """
+        初始化SQLite缓存
+        
+        Args:
+            db_path: 数据库文件路径
+        """
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(
+            str(self.db_path), check_same_thread=False, isolation_level=None
+        )
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS cache_entries ("
+            "key TEXT PRIMARY KEY, "
+            "value BLOB NOT NULL, "
+            "cached_at REAL NOT NULL, "
+            "expires_at REAL)"
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_cache_entries_expires_at "
+            "ON cache_entries(expires_at)"
+        )
+        # 旧版数据库没有 tags 列（JSON 数组）
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(cache_entries)")}
+        if 'tags' not in columns:
+            self._conn.execute("ALTER TABLE cache_entries ADD COLUMN tags TEXT")
+        self.purge_expired()
+    
+    def get(self, key: str) -> Optional[Any]:
+        """获取缓存值"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value FROM cache_entries "
+                "WHERE key = ? AND (expires_at IS NULL OR expires_at > ?)",
+                (key, time.time())
+            ).fetchone()
+        
+        if row is None:
+            return None
+        
+        self.bytes_read += len(row[0])
+        try:
+            return pickle.loads(row[0])
+        except Exception:
+            return None
+    
+    def set(self, key: str, value: Any, ttl: Optional[int] = None, tags: Optional[List[str]] = None):
+        """设置缓存值"""
+        self.set_many({key: value}, ttl, tags)
+    
+    def get_many(self, keys: List[str]) -> Dict[str, Any]:
+        """批量获取缓存值（按批次执行 IN 查询）"""
+        result = {}
+        now = time.time()
+        
+        for start in range(0, len(keys), self._BATCH_SIZE):
+            batch = keys[start:start + self._BATCH_SIZE]
+            placeholders = ','.join('?' * len(batch))
+            with self._lock:
+                rows = self._conn.execute(
+                    f"SELECT key, value FROM cache_entries "
+                    f"WHERE key IN ({placeholders}) "
+                    f"AND (expires_at IS NULL OR expires_at > ?)",
+                    (*batch, now)
+                ).fetchall()
+            
+            for key, blob in rows:
+                self.bytes_read += len(blob)
+                try:
+                    result[key] = pickle.loads(blob)
+                except Exception:
+                    continue
+        
+        return result
+    
+    def set_many(self, items: Dict[str, Any], ttl: Optional[int] = None, tags: Optional[List[str]] = None):
+        """批量设置缓存值（单个事务）"""
+        now = time.time()
+        expires_at = now + ttl if ttl else None
+        tags_json = json.dumps(list(tags), ensure_ascii=False) if tags else None
+        
+        try:
+            rows = [
+                (key, pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL), now, expires_at, tags_json)
+                for key, value in items.items()
+            ]
+            with self._lock:
+                self._conn.execute("BEGIN")
+                try:
+                    self._conn.executemany(
+                        "INSERT OR REPLACE INTO cache_entries "
+                        "(key, value, cached_at, expires_at, tags) VALUES (?, ?, ?, ?, ?)",
+                        rows
+                    )
+                    self._conn.execute("COMMIT")
+                except BaseException:
+                    self._conn.execute("ROLLBACK")
+                    raise
+            self.bytes_written += sum(len(row[1]) for row in rows)
+        except Exception as e:
+            raise RuntimeError(f"写入缓存失败: {e}")
+    
+    def delete(self, key: str):
+        """删除缓存值"""
+        with self._lock:
+            self._conn.execute("DELETE FROM cache_entries WHERE key = ?", (key,))
+    
+    def clear(self):
+        """清空所有缓存"""
+        with self._lock:
+            self._conn.execute("DELETE FROM cache_entries")
+    
+    def exists(self, key: str) -> bool:
+        """检查缓存是否存在"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT 1 FROM cache_entries "
+                "WHERE key = ? AND (expires_at IS NULL OR expires_at > ?)",
+                (key, time.time())
+            ).fetchone()
+        return row is not None
+    
+    def purge_expired(self) -> int:
+        """
+        删除所有过期条目（走 expires_at 索引）
+        
+        Returns:
+            删除的条目数
+        """
+        now = time.time()
+        with self._lock:
+            # 有监听者时先取出被清理的键
+            expired_keys = []
+            if self.removal_listener is not None:
+                expired_keys = [
+                    row[0] for row in self._conn.execute(
+                        "SELECT key FROM cache_entries "
+                        "WHERE expires_at IS NOT NULL AND expires_at <= ?",
+                        (now,)
+                    )
+                ]
+            cursor = self._conn.execute(
+                "DELETE FROM cache_entries "
+                "WHERE expires_at IS NOT NULL AND expires_at <= ?",
+                (now,)
+            )
+        
+        for key in expired_keys:
+            self._notify_removed(key)
+        return cursor.rowcount
+    
+    def iter_tagged_keys(self) -> Optional[Iterator[Tuple[str, List[str]]]]:
+        """遍历未过期的键及其标签"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT key, tags FROM cache_entries "
+                "WHERE expires_at IS NULL OR expires_at > ?",
+                (time.time(),)
+            ).fetchall()
+        
+        for key, tags_json in rows:
+            try:
+                tags = json.loads(tags_json) if tags_json else []
+            except ValueError:
+                tags = []
+            yield key, tags
+    
+    def get_usage(self) -> Dict[str, Any]:
+        """获取存储占用情况"""
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM cache_entries").fetchone()[0]
+            page_count = self._conn.execute("PRAGMA page_count").fetchone()[0]
+            page_size = self._conn.execute("PRAGMA page_size").fetchone()[0]
+        
+        return {
+            'entries': entries,
+            'bytes': page_count * page_size,
+            'db_path': str(self.db_path)
+        }
+    
+    def close(self):
+        """关闭数据库连接"""
+        with self._lock:
+            self._conn.close()
+
+
+class HybridCacheStrategy(CacheStrategy):
+    """
+    混合缓存策略（内存+文件）
+    
+    L1为有界内存缓存，从L2回填时沿用L2剩余的TTL；L2写入默认走 write-behind 队列，
+    由后台线程批量落盘，set() 不再阻塞在磁盘I/O上。队列中同一键只保留最后一次操作，
+    退出时通过 flush()/close() 写完剩余数据（未关闭的实例在解释器退出时由 atexit 关闭，
+    close() 后取消注册，实例即可被回收）
+    """
+    
+    def __init__(
+        self,
+        cache_dir: Path,
+        write_behind: bool = True,
+        flush_interval: float = 1.0,
+        flush_batch_size: int = 100,
+        promote_after: int = 1,
+        **memory_options
+    ):
+        """
+        初始化混合缓存
+        
+        Args:
+            cache_dir: 缓存目录路径
+            write_behind: 是否异步批量写入文件层
+            flush_interval: 后台落盘间隔（秒）
+            flush_batch_size: 队列积压达到该数量时立即落盘
+            promote_after: L2命中多少次后提升到L1（1表示首次命中即提升）
+            memory_options: 内存层参数（max_entries、max_bytes、eviction_policy、sweep_interval）
+        """
+        self.memory_cache = MemoryCacheStrategy(**memory_options)
+        self.file_cache = FileCacheStrategy(cache_dir)
+        # 内存层淘汰不代表条目消失，只转发文件层的过期清理
+        self.file_cache.removal_listener = self._notify_removed
+        self.write_behind = write_behind
+        self.flush_interval = flush_interval
+        self.flush_batch_size = flush_batch_size
+        self.promote_after = max(1, promote_after)
+        
+        # 待落盘操作：键 -> ('set', 值, 过期时间戳, 标签) 或 ('delete', None, None, None)
+        self._pending: Dict[str, Tuple[str, Any, Optional[float], Optional[List[str]]]] = {}
+        # 正在落盘的批次（写完前读者仍可见）
+        self._flushing: Dict[str, Tuple[str, Any, Optional[float], Optional[List[str]]]] = {}
+        self._pending_lock = threading.Lock()
+        # 保证落盘按批次顺序执行，避免旧批次覆盖新批次
+        self._flush_lock = threading.Lock()
+        # L2命中计数（仅 promote_after > 1 时使用，容量有限；读线程和落盘线程共用，受 _pending_lock 保护）
+        self._l2_hits: 'OrderedDict[str, int]' = OrderedDict()
+        self._l2_hits_limit = 4096
+        
+        self._flusher: Optional[threading.Thread] = None
+        self._flush_wakeup = threading.Event()
+        self._flusher_stop = threading.Event()
+        if write_behind:
+            self._start_flusher()
+            atexit.register(self.close)
+    
+    def get(self, key: str) -> Optional[Any]:
+        """获取缓存值（优先从内存）"""
+        # 先从内存获取
+        value = self.memory_cache.get(key)
+        if value is not None:
+            return value
+        
+        # 尚未落盘的写入/删除（排队删除或已过期视为未命中，不再读文件层）
+        pending = self._get_pending(key)
+        if pending is not None:
+            return pending[0] if pending else None
+        
+        # 从文件获取
+        entry = self.file_cache.get_entry(key)
+        if entry is None:
+            return None
+        
+        value, expires_at = entry
+        if self._should_promote(key):
+            # 回填到内存，TTL与文件层保持一致
+            ttl = expires_at - time.time() if expires_at else None
+            if ttl is None or ttl > 0:
+                self.memory_cache.set(key, value, ttl)
+        return value
+    
+    def set(self, key: str, value: Any, ttl: Optional[int] = None, tags: Optional[List[str]] = None):
+        """设置缓存值（内存同步写入，文件按 write-behind 配置写入）"""
+        self.memory_cache.set(key, value, ttl)
+        
+        if not self.write_behind:
+            self.file_cache.set(key, value, ttl, tags)
+            return
+        
+        expires_at = time.time() + ttl if ttl else None
+        with self._pending_lock:
+            self._pending[key] = ('set', value, expires_at, tags)
+            backlog = len(self._pending)
+        
+        if backlog >= self.flush_batch_size:
+            self._flush_wakeup.set()
+    
+    def delete(self, key: str):
+        """删除缓存值"""
+        self.memory_cache.delete(key)
+        
+        if not self.write_behind:
+            with self._pending_lock:
+                self._l2_hits.pop(key, None)
+            self.file_cache.delete(key)
+            return
+        
+        # 删除同样入队，保证与之前排队的写入顺序一致
+        with self._pending_lock:
+            self._l2_hits.pop(key, None)
+            self._pending[key] = ('delete', None, None, None)
+    
+    def clear(self):
+        """清空所有缓存"""
+        with self._flush_lock:
+            with self._pending_lock:
+                self._pending.clear()
+                self._flushing = {}
+                self._l2_hits.clear()
+            self.memory_cache.clear()
+            self.file_cache.clear()
+    
+    def exists(self, key: str) -> bool:
+        """检查缓存是否存在"""
+        if self.memory_cache.exists(key):
+            return True
+        
+        pending = self._get_pending(key)
+        if pending is not None:
+            return bool(pending)
+        
+        return self.file_cache.exists(key)
+    
+    def flush(self):
+        """将队列中的写入/删除同步到文件层"""
+        with self._flush_lock:
+            with self._pending_lock:
+                batch = self._pending
+                self._pending = {}
+                self._flushing = batch
+            
+            try:
+                now = time.time()
+                for key, (op, value, expires_at, tags) in batch.items():
+                    try:
+                        if op == 'delete':
+                            self.file_cache.delete(key)
+                        elif expires_at is None:
+                            self.file_cache.set(key, value, tags=tags)
+                        elif expires_at > now:
+                            self.file_cache.set(key, value, expires_at - now, tags)
+                    except Exception as e:
+                        logger.error(f"缓存落盘失败 {key}: {e}")
+            finally:
+                with self._pending_lock:
+                    self._flushing = {}
+    
+    @property
+    def bytes_read(self) -> int:
+        """两层合计读取字节数"""
+        return self.memory_cache.bytes_read + self.file_cache.bytes_read
+    
+    @property
+    def bytes_written(self) -> int:
+        """两层合计写入字节数"""
+        return self.memory_cache.bytes_written + self.file_cache.bytes_written
+    
+    def get_io_statistics(self) -> Dict[str, int]:
+        """获取读写统计（淘汰数来自内存层）"""
+        return {
+            'bytes_read': self.bytes_read,
+            'bytes_written': self.bytes_written,
+            'evictions': self.memory_cache.get_io_statistics()['evictions']
+        }
+    
+    def get_usage(self) -> Dict[str, Any]:
+        """获取存储占用情况"""
+        with self._pending_lock:
+            pending = len(self._pending)
+        return {'memory': self.memory_cache.get_usage(), 'pending_writes': pending}
+    
+    def close(self):
+        """停止后台落盘线程，写完剩余数据并释放资源"""
+        if self.write_behind:
+            atexit.unregister(self.close)
+        if self._flusher:
+            self._flusher_stop.set()
+            self._flush_wakeup.set()
+            self._flusher.join(timeout=5)
+            self._flusher = None
+        
+        self.flush()
+        self.memory_cache.close()
+    
+    def _get_pending(self, key: str) -> Optional[Tuple[Any]]:
+        """
+        查询队列（含正在落盘的批次）中尚未落盘的操作
+        
+        Returns:
+            (值,) 表示待写入且未过期；() 表示已排队删除或待写入值已过期（视为未命中）；
+            None 表示没有待落盘的操作，需查询文件层
+        """
+        with self._pending_lock:
+            op = self._pending.get(key)
+            if op is None:
+                op = self._flushing.get(key)
+        
+        if op is None:
+            return None
+        
+        kind, value, expires_at, _ = op
+        if kind == 'delete' or (expires_at is not None and time.time() > expires_at):
+            return ()
+        return (value,)
+    
+    def iter_tagged_keys(self) -> Optional[Iterator[Tuple[str, List[str]]]]:
+        """遍历文件层和落盘队列中未过期的键及其标签（队列中的操作优先）"""
+        with self._pending_lock:
+            pending = {**self._flushing, **self._pending}
+        
+        for key, tags in self.file_cache.iter_tagged_keys():
+            if key not in pending:
+                yield key, tags
+        
+        now = time.time()
+        for key, (op, _, expires_at, tags) in pending.items():
+            if op == 'set' and (expires_at is None or expires_at > now):
+                yield key, list(tags or [])
+    
+    def _should_promote(self, key: str) -> bool:
+        """根据L2命中次数判断是否提升到L1"""
+        if self.promote_after <= 1:
+            return True
+        
+        with self._pending_lock:
+            hits = self._l2_hits.pop(key, 0) + 1
+            if hits >= self.promote_after:
+                return True
+            
+            self._l2_hits[key] = hits
+            if len(self._l2_hits) > self._l2_hits_limit:
+                self._l2_hits.popitem(last=False)
+        return False
+    
+    def _start_flusher(self):
+        """启动后台落盘线程"""
+        def _run():
+            while not self._flusher_stop.is_set():
+                self._flush_wakeup.wait(self.flush_interval)
+                self._flush_wakeup.clear()
+                self.flush()
+        
+        self._flusher = threading.Thread(
+            target=_run, name='hybrid-cache-flusher', daemon=True
+        )
+        self._flusher.start()
@@ -5,12 +5,16 @@
 提供所有原子能力的标准实现基类
 """
 
+import asyncio
 import logging
-from typing import Dict, Any, Optional
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, Optional, List, Callable
 from datetime import datetime
 
 from .capability_interface import (
-    ICapability, CapabilityResult, CapabilityStatus
+    ICapability, CapabilityResult, CapabilityBatchResult, CapabilityStatus,
+    run_sync_in_executor
 )
 from .capability_schema import CapabilitySchema
 
@@ -19,6 +23,23 @@ from .capability_schema import CapabilitySchema
 logger = logging.getLogger(__name__)
 
 
+def _run_coroutine_sync(coroutine_func: Callable[..., Any], *args: Any) -> Any:
+    """
+    同步运行协程函数并返回结果
+    
+    当前线程没有运行中的事件循环时直接 asyncio.run；
+    否则（如在异步代码中调用了同步的 execute()）asyncio.run 会报错，
+    改为在辅助线程的新事件循环中运行，并阻塞等待结果
+    """
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(coroutine_func(*args))
+    
+    with ThreadPoolExecutor(max_workers=1, thread_name_prefix='capability-async') as executor:
+        return executor.submit(asyncio.run, coroutine_func(*args)).result()
+
+
 class AtomicCapability(ICapability):
     """原子能力基类"""
     
@@ -49,8 +70,9 @@ class AtomicCapability(ICapability):
         self.author = author
         self._status = status
         self._dependencies: list[str] = []
-        self._input_schema: Optional[Dict[str, Any]] = None
-        self._output_schema: Optional[Dict[str, Any]] = None
+        # 经属性 setter 赋值，同时编译验证函数（_input_validator / _output_validator），每次执行直接复用
+        self._input_schema = None
+        self._output_schema = None
         
         # 执行统计
         self._execution_count = 0
@@ -82,71 +104,240 @@ class AtomicCapability(ICapability):
         
         子类可以重写此方法实现自定义验证逻辑
         """
-        if self._input_schema:
-            return CapabilitySchema.validate_against_schema(
-                input_data, self._input_schema
-            )
+        if self._input_validator:
+            return self._input_validator(input_data)
+        return True, None
+    
+    def validate_output(self, output_data: Dict[str, Any]) -> tuple:
+        """
+        根据输出Schema验证数据
+        
+        Returns:
+            (是否有效, 错误信息)
+        """
+        if self._output_validator:
+            return self._output_validator(output_data)
         return True, None
     
     def execute(self, input_data: Dict[str, Any]) -> CapabilityResult:
         """
         执行能力
         
-        子类必须实现 _execute_impl 方法
+        子类必须实现 _execute_impl 方法（或仅实现 _execute_impl_async）
         """
-        # 更新执行统计
-        self._execution_count += 1
-        self._last_execution_time = datetime.now()
-        
-        # 验证输入
-        is_valid, error_msg = self.validate(input_data)
-        if not is_valid:
-            self._error_count += 1
-            logger.error(f"[{self.capability_id}] 输入验证失败: {error_msg}")
-            return CapabilityResult(
-                success=False,
-                error=f"输入验证失败: {error_msg}",
-                metadata={'capability_id': self.capability_id}
-            )
+        execution_time, invalid_result = self._begin_execution(input_data)
+        if invalid_result:
+            return invalid_result
         
         # 执行能力
         try:
             logger.info(f"[{self.capability_id}] 开始执行: {self.name}")
             result = self._execute_impl(input_data)
+            return self._finish_execution(result, execution_time)
+        except Exception as e:
+            return self._handle_execution_error(e)
+    
+    async def execute_async(self, input_data: Dict[str, Any]) -> CapabilityResult:
+        """
+        异步执行能力
+        
+        验证、日志和统计与 execute() 一致，具体实现由 _execute_impl_async 提供
+        """
+        execution_time, invalid_result = self._begin_execution(input_data)
+        if invalid_result:
+            return invalid_result
+        
+        # 执行能力
+        try:
+            logger.info(f"[{self.capability_id}] 开始异步执行: {self.name}")
+            result = await self._execute_impl_async(input_data)
+            return self._finish_execution(result, execution_time)
+        except Exception as e:
+            return self._handle_execution_error(e)
+    
+    def execute_batch(self, inputs: List[Dict[str, Any]]) -> CapabilityBatchResult:
+        """
+        批量执行能力
+        
+        输入Schema只编译一次并用于整批数据，日志和统计按批次记录；
+        具体执行由 _execute_batch_impl 完成，子类可重写为向量化实现
+        
+        Args:
+            inputs: 输入数据字典列表
             
-            if result.success:
-                self._success_count += 1
-                logger.info(f"[{self.capability_id}] 执行成功")
+        Returns:
+            批量执行结果（与 inputs 一一对应的 CapabilityResult 列表及汇总统计）
+        """
+        started = time.perf_counter()
+        execution_time = datetime.now()
+        self._execution_count += len(inputs)
+        self._last_execution_time = execution_time
+        
+        # 验证输入
+        validator = self._get_batch_validator()
+        results: List[Optional[CapabilityResult]] = [None] * len(inputs)
+        valid_indexes = []
+        for index, input_data in enumerate(inputs):
+            is_valid, error_msg = validator(input_data)
+            if is_valid:
+                valid_indexes.append(index)
             else:
-                self._error_count += 1
-                logger.warning(f"[{self.capability_id}] 执行失败: {result.error}")
-            
-            # 添加能力元数据
+                results[index] = CapabilityResult(
+                    success=False,
+                    error=f"输入验证失败: {error_msg}",
+                    metadata={'capability_id': self.capability_id, 'batch_index': index}
+                )
+        
+        # 执行能力
+        logger.info(
+            f"[{self.capability_id}] 开始批量执行: {self.name}，"
+            f"共 {len(inputs)} 项（有效 {len(valid_indexes)} 项）"
+        )
+        valid_inputs = [inputs[index] for index in valid_indexes]
+        try:
+            batch_results = self._execute_batch_impl(valid_inputs) if valid_inputs else []
+            if len(batch_results) != len(valid_inputs):
+                raise ValueError(
+                    f"批量执行结果数量({len(batch_results)})与输入数量({len(valid_inputs)})不一致"
+                )
+        except Exception as e:
+            logger.error(f"[{self.capability_id}] 批量执行异常: {e}", exc_info=True)
+            batch_results = [
+                CapabilityResult(success=False, error=f"执行异常: {str(e)}")
+                for _ in valid_inputs
+            ]
+        
+        for index, result in zip(valid_indexes, batch_results):
             result.metadata.update({
                 'capability_id': self.capability_id,
-                'execution_time': self._last_execution_time.isoformat()
+                'execution_time': execution_time.isoformat(),
+                'batch_index': index
             })
-            
-            return result
-            
-        except Exception as e:
+            results[index] = result
+        
+        batch_result = CapabilityBatchResult(results, metadata={
+            'capability_id': self.capability_id,
+            'execution_time': execution_time.isoformat(),
+            'duration': time.perf_counter() - started
+        })
+        
+        # 更新执行统计
+        self._success_count += batch_result.success_count
+        self._error_count += batch_result.error_count
+        
+        if batch_result.error_count:
+            logger.warning(
+                f"[{self.capability_id}] 批量执行完成，失败 {batch_result.error_count}/{len(inputs)} 项"
+            )
+        else:
+            logger.info(f"[{self.capability_id}] 批量执行成功，共 {len(inputs)} 项")
+        
+        return batch_result
+    
+    def _execute_batch_impl(self, inputs: List[Dict[str, Any]]) -> List[CapabilityResult]:
+        """
+        批量执行的具体实现
+        
+        默认逐项调用 _execute_impl，单项异常只影响该项；
+        能整批处理的子类（如一次查询多个故障ID）可重写此方法，
+        须返回与 inputs 等长且顺序一致的结果列表
+        """
+        results = []
+        for input_data in inputs:
+            try:
+                results.append(self._execute_impl(input_data))
+            except Exception as e:
+                results.append(CapabilityResult(success=False, error=f"执行异常: {str(e)}"))
+        return results
+    
+    def _get_batch_validator(self) -> Callable[[Dict[str, Any]], tuple]:
+        """获取批量执行使用的验证函数（子类重写了 validate 时沿用该方法）"""
+        if type(self).validate is not AtomicCapability.validate:
+            return self.validate
+        return self._input_validator or (lambda input_data: (True, None))
+    
+    def _begin_execution(self, input_data: Dict[str, Any]) -> tuple:
+        """
+        更新执行统计并验证输入
+        
+        Returns:
+            (本次执行开始时间, 失败结果)，输入有效时失败结果为None
+        """
+        # 更新执行统计
+        execution_time = datetime.now()
+        self._execution_count += 1
+        self._last_execution_time = execution_time
+        
+        # 验证输入
+        is_valid, error_msg = self.validate(input_data)
+        if not is_valid:
             self._error_count += 1
-            error_msg = f"执行异常: {str(e)}"
-            logger.error(f"[{self.capability_id}] {error_msg}", exc_info=True)
-            return CapabilityResult(
+            logger.error(f"[{self.capability_id}] 输入验证失败: {error_msg}")
+            return execution_time, CapabilityResult(
                 success=False,
-                error=error_msg,
+                error=f"输入验证失败: {error_msg}",
                 metadata={'capability_id': self.capability_id}
             )
+        
+        return execution_time, None
+    
+    def _finish_execution(
+        self,
+        result: CapabilityResult,
+        execution_time: datetime
+    ) -> CapabilityResult:
+        """记录执行结果并补充能力元数据"""
+        if result.success:
+            self._success_count += 1
+            logger.info(f"[{self.capability_id}] 执行成功")
+        else:
+            self._error_count += 1
+            logger.warning(f"[{self.capability_id}] 执行失败: {result.error}")
+        
+        # 添加能力元数据
+        result.metadata.update({
+            'capability_id': self.capability_id,
+            'execution_time': execution_time.isoformat()
+        })
+        
+        return result
+    
+    def _handle_execution_error(self, e: Exception) -> CapabilityResult:
+        """将执行异常转换为失败结果"""
+        self._error_count += 1
+        error_msg = f"执行异常: {str(e)}"
+        logger.error(f"[{self.capability_id}] {error_msg}", exc_info=True)
+        return CapabilityResult(
+            success=False,
+            error=error_msg,
+            metadata={'capability_id': self.capability_id}
+        )
     
     def _execute_impl(self, input_data: Dict[str, Any]) -> CapabilityResult:
         """
         执行能力的具体实现
         
-        子类必须实现此方法
+        子类必须实现此方法；只实现了 _execute_impl_async 的子类，
+        同步调用时会在新的事件循环中运行异步实现
+        （当前线程已有运行中的事件循环时，改在辅助线程中运行）
         """
+        if self._has_native_async_impl():
+            return _run_coroutine_sync(self._execute_impl_async, input_data)
         raise NotImplementedError("子类必须实现 _execute_impl 方法")
     
+    async def _execute_impl_async(self, input_data: Dict[str, Any]) -> CapabilityResult:
+        """
+        异步执行的具体实现
+        
+        默认在线程池中运行同步的 _execute_impl，
+        封装 HTTP/SSH 等 I/O 的子类可重写为原生异步实现
+        """
+        return await run_sync_in_executor(self._execute_impl, input_data)
+    
+    def _has_native_async_impl(self) -> bool:
+        """子类是否重写了 _execute_impl_async"""
+        return type(self)._execute_impl_async is not AtomicCapability._execute_impl_async
+    
     def get_status(self) -> CapabilityStatus:
         """获取能力状态"""
         return self._status
@@ -164,12 +355,40 @@ class AtomicCapability(ICapability):
         if capability_id not in self._dependencies:
             self._dependencies.append(capability_id)
     
+    @property
+    def _input_schema(self) -> Optional[Dict[str, Any]]:
+        """输入数据Schema（子类直接给该属性赋值时同样会重新编译验证函数）"""
+        return self._input_schema_data
+    
+    @_input_schema.setter
+    def _input_schema(self, schema: Optional[Dict[str, Any]]):
+        self._input_schema_data = schema
+        self._input_validator: Optional[Callable[[Dict[str, Any]], tuple]] = (
+            CapabilitySchema.compile_validator(schema) if schema else None
+        )
+    
+    @property
+    def _output_schema(self) -> Optional[Dict[str, Any]]:
+        """输出数据Schema（子类直接给该属性赋值时同样会重新编译验证函数）"""
+        return self._output_schema_data
+    
+    @_output_schema.setter
+    def _output_schema(self, schema: Optional[Dict[str, Any]]):
+        self._output_schema_data = schema
+        self._output_validator: Optional[Callable[[Dict[str, Any]], tuple]] = (
+            CapabilitySchema.compile_validator(schema) if schema else None
+        )
+    
     def get_input_schema(self) -> Optional[Dict[str, Any]]:
         """获取输入数据Schema"""
         return self._input_schema
     
     def set_input_schema(self, schema: Dict[str, Any]):
-        """设置输入数据Schema"""
+        """
+        设置输入数据Schema
+        
+        同时编译验证函数；之后修改 schema 字典需重新调用本方法才会生效
+        """
         self._input_schema = schema
     
     def get_output_schema(self) -> Optional[Dict[str, Any]]:
@@ -177,7 +396,11 @@ class AtomicCapability(ICapability):
         return self._output_schema
     
     def set_output_schema(self, schema: Dict[str, Any]):
-        """设置输出数据Schema"""
+        """
+        设置输出数据Schema
+        
+        同时编译验证函数；之后修改 schema 字典需重新调用本方法才会生效
+        """
         self._output_schema = schema
     
     def get_statistics(self) -> Dict[str, Any]:
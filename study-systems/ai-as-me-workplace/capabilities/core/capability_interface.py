@@ -5,8 +5,11 @@
 定义所有原子能力必须遵循的标准接口
 """
 
+import asyncio
+import functools
 from abc import ABC, abstractmethod
-from typing import Dict, Any, Optional, List
+from concurrent.futures import Executor
+from typing import Dict, Any, Optional, List, Callable
 from enum import Enum
 
 
@@ -43,6 +46,68 @@ class CapabilityResult:
         }
 
 
+class CapabilityBatchResult:
+    """能力批量执行结果"""
+    
+    def __init__(
+        self,
+        results: List[CapabilityResult],
+        metadata: Optional[Dict[str, Any]] = None
+    ):
+        self.results = results
+        self.metadata = metadata or {}
+    
+    @property
+    def success_count(self) -> int:
+        """成功项数"""
+        return sum(1 for result in self.results if result.success)
+    
+    @property
+    def error_count(self) -> int:
+        """失败项数"""
+        return len(self.results) - self.success_count
+    
+    @property
+    def success(self) -> bool:
+        """是否全部成功"""
+        return self.error_count == 0
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """转换为字典"""
+        return {
+            'success': self.success,
+            'results': [result.to_dict() for result in self.results],
+            'statistics': {
+                'total': len(self.results),
+                'success_count': self.success_count,
+                'error_count': self.error_count
+            },
+            'metadata': self.metadata
+        }
+
+
+async def run_sync_in_executor(
+    func: Callable[..., Any],
+    *args: Any,
+    executor: Optional[Executor] = None
+) -> Any:
+    """
+    在线程池中运行同步函数
+    
+    用于把旧的同步实现接入异步调用路径，避免阻塞事件循环
+    
+    Args:
+        func: 同步函数
+        args: 位置参数
+        executor: 执行器（可选），默认使用事件循环的默认线程池
+        
+    Returns:
+        函数返回值
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(executor, functools.partial(func, *args))
+
+
 class ICapability(ABC):
     """能力接口基类"""
     
@@ -82,6 +147,20 @@ class ICapability(ABC):
         """
         pass
     
+    async def execute_async(self, input_data: Dict[str, Any]) -> CapabilityResult:
+        """
+        异步执行能力
+        
+        默认在线程池中运行同步的 execute()，原生异步的能力可重写此方法
+        
+        Args:
+            input_data: 输入数据字典
+            
+        Returns:
+            能力执行结果
+        """
+        return await run_sync_in_executor(self.execute, input_data)
+    
     def get_status(self) -> CapabilityStatus:
         """
         获取能力状态
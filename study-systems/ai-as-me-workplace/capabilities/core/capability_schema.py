@@ -5,10 +5,21 @@
 定义能力的输入输出数据格式规范
 """
 
-from typing import Dict, Any, Optional, List
+from typing import Dict, Any, Optional, List, Callable
 import json
 
 
+# Schema类型 -> (Python类型, 错误信息中的类型名)
+_TYPE_CHECKS = {
+    "string": (str, "字符串"),
+    "integer": (int, "整数"),
+    "number": ((int, float), "数字"),
+    "boolean": (bool, "布尔"),
+    "array": (list, "数组"),
+    "object": (dict, "对象"),
+}
+
+
 class CapabilitySchema:
     """能力Schema管理器"""
     
@@ -113,6 +124,55 @@ class CapabilitySchema:
         
         return True, None
     
+    @staticmethod
+    def compile_validator(schema: Dict[str, Any]) -> Callable[[Dict[str, Any]], tuple]:
+        """
+        将Schema编译为验证函数
+        
+        必需属性、属性类型和允许的属性集合只解析一次，
+        返回的函数与 validate_against_schema 的校验规则和错误信息一致
+        
+        Args:
+            schema: JSON Schema定义
+            
+        Returns:
+            验证函数，接收数据并返回 (是否有效, 错误信息)
+        """
+        if schema.get("type") != "object":
+            return lambda data: (True, None)
+        
+        required = tuple(schema.get("required", []))
+        properties = schema.get("properties", {})
+        type_checks = {
+            key: (_TYPE_CHECKS[prop_schema["type"]][0],
+                  f"属性 {key} 必须是{_TYPE_CHECKS[prop_schema['type']][1]}类型")
+            for key, prop_schema in properties.items()
+            if prop_schema.get("type") in _TYPE_CHECKS
+        }
+        allowed = None if schema.get("additionalProperties", False) else frozenset(properties)
+        
+        def validate(data: Dict[str, Any]) -> tuple:
+            if not isinstance(data, dict):
+                return False, "数据必须是对象类型"
+            
+            for prop in required:
+                if prop not in data:
+                    return False, f"缺少必需属性: {prop}"
+            
+            for key, value in data.items():
+                check = type_checks.get(key)
+                if check and not isinstance(value, check[0]):
+                    return False, check[1]
+            
+            if allowed is not None:
+                for key in data:
+                    if key not in allowed:
+                        return False, f"不允许的属性: {key}"
+            
+            return True, None
+        
+        return validate
+    
     @staticmethod
     def get_common_schemas() -> Dict[str, Dict[str, Any]]:
         """
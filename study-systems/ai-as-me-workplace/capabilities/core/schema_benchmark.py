@@ -0,0 +1,69 @@
+# -*- coding: utf-8 -*-
+"""
+Schema验证性能基准
+
+对比每次解释Schema（validate_against_schema）与预编译验证函数（compile_validator）
+的单次验证耗时
+
+用法（在 ai-as-me-workplace 目录下）：
+    python -m capabilities.core.schema_benchmark
+"""
+
+import timeit
+from typing import Dict
+
+from .capability_schema import CapabilitySchema
+
+
+def _build_schema():
+    """构造与实际能力相近的输入Schema"""
+    common = CapabilitySchema.get_common_schemas()
+    properties = dict(common)
+    properties.update({
+        "include_analysis": {"type": "boolean"},
+        "limit": {"type": "integer"},
+        "fault_ids": {"type": "array"},
+        "options": {"type": "object"},
+    })
+    return CapabilitySchema.create_input_schema(properties, required=["ticket_id", "table_name"])
+
+
+def run_benchmark(number: int = 100000) -> Dict[str, float]:
+    """
+    运行基准测试
+    
+    Args:
+        number: 每种方式的验证次数
+        
+    Returns:
+        每种方式的单次验证耗时（微秒）
+    """
+    schema = _build_schema()
+    data = {
+        "ticket_id": "6683487902",
+        "table_name": "10. 缺陷问题闭环表",
+        "force_refresh": False,
+        "include_analysis": True,
+        "limit": 50,
+        "fault_ids": ["F001", "F002"],
+        "options": {},
+    }
+    validator = CapabilitySchema.compile_validator(schema)
+    assert validator(data) == CapabilitySchema.validate_against_schema(data, schema)
+    
+    interpreted = timeit.timeit(
+        lambda: CapabilitySchema.validate_against_schema(data, schema), number=number
+    )
+    compiled = timeit.timeit(lambda: validator(data), number=number)
+    
+    return {
+        "interpreted_us": interpreted / number * 1e6,
+        "compiled_us": compiled / number * 1e6,
+    }
+
+
+if __name__ == "__main__":
+    result = run_benchmark()
+    print(f"解释执行: {result['interpreted_us']:.2f} us/次")
+    print(f"预编译:   {result['compiled_us']:.2f} us/次")
+    print(f"加速比:   {result['interpreted_us'] / result['compiled_us']:.2f}x")
@@ -7,13 +7,20 @@
 
 import logging
 from typing import Dict, Any, List, Optional
-from pathlib import Path
 
 from .capability_matcher import CapabilityMatcher
 from .capability_recommender import CapabilityRecommender
+from .vector_index import HashedVectorIndex
 
 logger = logging.getLogger(__name__)
 
+# 向量相似度在综合得分中的权重
+SEMANTIC_WEIGHT = 0.5
+# 能力元数据中作为用法文本参与向量索引的字段
+USAGE_FIELDS = ('usage', 'examples', 'use_cases', 'tags', 'keywords')
+# 每个能力保留的使用历史用例描述数（最近的不重复用例）
+MAX_USE_CASES = 20
+
 
 class CapabilityDiscovery:
     """能力发现引擎"""
@@ -33,12 +40,102 @@ class CapabilityDiscovery:
         self.registry = capability_registry
         self.matcher = CapabilityMatcher(capability_registry)
         self.recommender = CapabilityRecommender(capability_registry, usage_history)
+        
+        # 使用历史中的用例描述也作为能力的用法文本
+        self._use_cases: Dict[str, List[str]] = {}
+        for record in usage_history or []:
+            use_case = record.get('use_case')
+            if use_case:
+                for cap_id in set(record.get('capabilities', [])):
+                    self._add_use_case(cap_id, use_case)
+        
+        self.vector_index = HashedVectorIndex()
+        self.vector_index.add_many({
+            cap_id: self._build_document(cap_id, metadata)
+            for cap_id, metadata in capability_registry.items()
+        })
+    
+    def _build_document(self, capability_id: str, metadata: Dict[str, Any]) -> str:
+        """拼接能力的名称、描述、类别和用法文本（向量索引的文档）"""
+        parts = [
+            capability_id,
+            metadata.get('name', ''),
+            metadata.get('description', ''),
+            metadata.get('category', '')
+        ]
+        for field in USAGE_FIELDS:
+            value = metadata.get(field)
+            if isinstance(value, (list, tuple)):
+                parts.extend(str(item) for item in value)
+            elif value:
+                parts.append(str(value))
+        parts.extend(self._use_cases.get(capability_id, []))
+        return ' '.join(part for part in parts if part)
+    
+    def _add_use_case(self, capability_id: str, use_case: str) -> bool:
+        """
+        记录能力的用例描述（重复的只更新为最近使用，超出 MAX_USE_CASES 时丢弃最早的）
+        
+        Returns:
+            用例文本是否变化（需要重建向量索引文档）
+        """
+        use_cases = self._use_cases.setdefault(capability_id, [])
+        if use_case in use_cases:
+            use_cases.remove(use_case)
+            use_cases.append(use_case)
+            return False
+        
+        use_cases.append(use_case)
+        if len(use_cases) > MAX_USE_CASES:
+            del use_cases[0]
+        return True
+    
+    def register_capability(self, capability_id: str, metadata: Dict[str, Any]):
+        """
+        注册（或更新）能力，增量更新匹配索引
+        
+        Args:
+            capability_id: 能力ID
+            metadata: 能力元数据
+        """
+        self.matcher.add_capability(capability_id, metadata)
+        self.vector_index.add(capability_id, self._build_document(capability_id, metadata))
+        self.recommender.invalidate_dependencies()
+    
+    def unregister_capability(self, capability_id: str):
+        """
+        注销能力，增量更新匹配索引
+        
+        Args:
+            capability_id: 能力ID
+        """
+        self.matcher.remove_capability(capability_id)
+        self.vector_index.remove(capability_id)
+        self.recommender.invalidate_dependencies()
+    
+    def record_usage(self, record: Dict[str, Any], save: bool = False):
+        """
+        增量记录一次使用（更新共现存储和用例文本，用例文本变化时才重建向量索引文档）
+        
+        Args:
+            record: 使用记录（capabilities、use_case、timestamp）
+            save: 是否立即持久化共现存储
+        """
+        self.recommender.record_usage(record, save=save)
+        
+        use_case = record.get('use_case')
+        if not use_case:
+            return
+        for cap_id in set(record.get('capabilities', [])):
+            if self._add_use_case(cap_id, use_case) and cap_id in self.registry:
+                self.vector_index.add(cap_id, self._build_document(cap_id, self.registry[cap_id]))
     
     def discover(
         self,
         requirement: str,
         category: Optional[str] = None,
-        limit: int = 10
+        limit: int = 10,
+        semantic: bool = True
     ) -> List[Dict[str, Any]]:
         """
         发现能力
@@ -47,22 +144,35 @@ class CapabilityDiscovery:
             requirement: 业务需求描述
             category: 类别过滤（可选）
             limit: 返回结果数量限制
+            semantic: 是否结合向量相似度（可找到用词不同但用途相近的能力）
             
         Returns:
             能力列表，包含匹配信息
         """
         # 使用匹配器查找能力
-        matches = self.matcher.match(requirement, category, limit)
+        scores: Dict[str, float] = dict(self.matcher.match(requirement, category, limit))
+        semantic_scores: Dict[str, float] = {}
+        
+        # 向量近邻：相似度按权重计入综合得分
+        if semantic:
+            for cap_id, similarity in self.vector_index.query(requirement, limit=limit * 2):
+                if category and self.registry.get(cap_id, {}).get('category') != category:
+                    continue
+                semantic_scores[cap_id] = similarity
+                scores[cap_id] = scores.get(cap_id, 0.0) + similarity * SEMANTIC_WEIGHT
+        
+        ranked = sorted(scores.items(), key=lambda x: x[1], reverse=True)[:limit]
         
         # 构建结果
         results = []
-        for cap_id, score in matches:
+        for cap_id, score in ranked:
             metadata = self.registry.get(cap_id, {})
             results.append({
                 'capability_id': cap_id,
                 'name': metadata.get('name', ''),
                 'description': metadata.get('description', ''),
                 'match_score': score,
+                'semantic_score': semantic_scores.get(cap_id, 0.0),
                 'metadata': metadata
             })
         
@@ -140,38 +250,21 @@ class CapabilityDiscovery:
                 'error': '未找到匹配的能力'
             }
         
-        # 分析依赖关系
+        # 按依赖图展开：每个能力之前先加入其全部传递依赖（按拓扑序）
         workflow_steps = []
         used_capabilities = set()
+        dependency_graph = self.recommender.dependency_graph
         
         for cap_info in capabilities:
-            cap_id = cap_info['capability_id']
-            
-            # 检查依赖
-            dep_analysis = self.recommender.analyze_dependencies(cap_id)
-            direct_deps = dep_analysis.get('direct_dependencies', [])
-            
-            # 先添加依赖
-            for dep in direct_deps:
-                dep_id = dep['capability_id']
-                if dep_id not in used_capabilities:
+            for step_cap_id in dependency_graph.resolve(cap_info['capability_id']):
+                if step_cap_id not in used_capabilities:
                     workflow_steps.append({
-                        'capability': dep_id,
+                        'capability': step_cap_id,
                         'action': 'execute',
                         'input': {},
-                        'output': f'{dep_id}_result'
+                        'output': f'{step_cap_id}_result'
                     })
-                    used_capabilities.add(dep_id)
-            
-            # 再添加主能力
-            if cap_id not in used_capabilities:
-                workflow_steps.append({
-                    'capability': cap_id,
-                    'action': 'execute',
-                    'input': {},
-                    'output': f'{cap_id}_result'
-                })
-                used_capabilities.add(cap_id)
+                    used_capabilities.add(step_cap_id)
         
         return {
             'success': True,
@@ -5,15 +5,32 @@
 基于能力元数据自动匹配和组合能力
 """
 
+import heapq
 import logging
-from typing import Dict, Any, List, Optional, Set
+from typing import Dict, Any, List, Optional, Set, Tuple
 from difflib import SequenceMatcher
 
+from .text_index import BM25Index, tokenize
+
 logger = logging.getLogger(__name__)
 
+# 综合检索时各字段的词频权重
+FIELD_WEIGHTS = {'name': 3.0, 'capability_id': 2.0, 'category': 1.5, 'description': 1.0}
+
+# 综合匹配时参与名称相似度计算的候选数（至少为 limit 的若干倍）
+MIN_CANDIDATES = 50
+CANDIDATE_FACTOR = 5
+
 
 class CapabilityMatcher:
-    """能力匹配器"""
+    """
+    能力匹配器
+    
+    名称、描述、类别建立 BM25 倒排索引（中文按字符二元组、英文按单词分词）；
+    名称/描述相似度只对与查询有共同词项的候选能力计算，匹配耗时不随注册表规模线性增长。
+    名称另建字符二元组索引（含首尾边界），拼写错误、单个汉字等与名称没有共同词项的查询
+    也能进入名称相似度的候选集
+    """
     
     def __init__(self, capability_registry: Dict[str, Dict[str, Any]]):
         """
@@ -30,31 +47,125 @@ class CapabilityMatcher:
         self.name_index: Dict[str, List[str]] = {}  # 名称 -> 能力ID列表
         self.keyword_index: Dict[str, List[str]] = {}  # 关键词 -> 能力ID列表
         self.category_index: Dict[str, List[str]] = {}  # 类别 -> 能力ID列表
+        self.text_index = BM25Index(FIELD_WEIGHTS)  # 名称+描述+类别的倒排索引
+        self._name_terms = BM25Index()  # 仅名称的倒排索引（名称匹配的候选集）
+        self._name_grams: Dict[str, Set[str]] = {}  # 名称字符二元组 -> 能力ID集合
+        # 能力ID -> 建索引时的 (名称, 描述, 类别)；移出索引时以此为准，不依赖注册表中可能已被改动的元数据
+        self._indexed_text: Dict[str, Tuple[str, str, str]] = {}
         
         for capability_id, metadata in self.registry.items():
-            name = metadata.get('name', '')
-            description = metadata.get('description', '')
-            category = metadata.get('category', '')
-            
-            # 名称索引
-            if name:
-                name_lower = name.lower()
-                if name_lower not in self.name_index:
-                    self.name_index[name_lower] = []
-                self.name_index[name_lower].append(capability_id)
-            
-            # 关键词索引（从名称和描述中提取）
-            keywords = self._extract_keywords(name, description)
-            for keyword in keywords:
-                if keyword not in self.keyword_index:
-                    self.keyword_index[keyword] = []
-                self.keyword_index[keyword].append(capability_id)
+            self._index_capability(capability_id, metadata)
+    
+    def _index_capability(self, capability_id: str, metadata: Dict[str, Any]):
+        """将单个能力加入索引"""
+        name = metadata.get('name', '')
+        description = metadata.get('description', '')
+        category = metadata.get('category', '')
+        self._indexed_text[capability_id] = (name, description, category)
+        
+        # 名称索引
+        if name:
+            self.name_index.setdefault(name.lower(), []).append(capability_id)
+            self._name_terms.add(capability_id, {'name': name})
+            for gram in self._char_grams(name):
+                self._name_grams.setdefault(gram, set()).add(capability_id)
+        
+        # 关键词索引（从名称和描述中提取）
+        for keyword in self._extract_keywords(name, description):
+            self.keyword_index.setdefault(keyword, []).append(capability_id)
+        
+        # 倒排索引（从名称、能力ID、描述和类别中分词）
+        self.text_index.add(capability_id, {
+            'name': name,
+            'capability_id': capability_id,
+            'description': description,
+            'category': category
+        })
+        
+        # 类别索引
+        if category:
+            self.category_index.setdefault(category, []).append(capability_id)
+    
+    def _unindex_capability(self, capability_id: str):
+        """将单个能力移出索引（按建索引时记录的文本，未建索引时忽略）"""
+        indexed = self._indexed_text.pop(capability_id, None)
+        if indexed is None:
+            return
+        name, description, category = indexed
+        
+        if name:
+            self._discard(self.name_index, name.lower(), capability_id)
+            for gram in self._char_grams(name):
+                capability_ids = self._name_grams.get(gram)
+                if capability_ids is not None:
+                    capability_ids.discard(capability_id)
+                    if not capability_ids:
+                        del self._name_grams[gram]
+        for keyword in self._extract_keywords(name, description):
+            self._discard(self.keyword_index, keyword, capability_id)
+        if category:
+            self._discard(self.category_index, category, capability_id)
+        
+        self.text_index.remove(capability_id)
+        self._name_terms.remove(capability_id)
+    
+    @staticmethod
+    def _discard(index: Dict[str, List[str]], key: str, capability_id: str):
+        """从列表索引中删除能力ID（列表为空时删除键）"""
+        capability_ids = index.get(key)
+        if capability_ids and capability_id in capability_ids:
+            capability_ids.remove(capability_id)
+            if not capability_ids:
+                del index[key]
+    
+    @staticmethod
+    def _char_grams(text: str) -> Set[str]:
+        """字符二元组（小写，首尾加边界符，单字符文本也能与以该字符开头/结尾的名称重合）"""
+        padded = f"\x02{text.lower()}\x03"
+        return {padded[i:i + 2] for i in range(len(padded) - 1)}
+    
+    def _name_candidates(self, query: str) -> Dict[str, Tuple[int, int]]:
+        """
+        名称相似度的候选能力
+        
+        Args:
+            query: 查询文本
             
-            # 类别索引
-            if category:
-                if category not in self.category_index:
-                    self.category_index[category] = []
-                self.category_index[category].append(capability_id)
+        Returns:
+            能力ID -> (共同词项数, 共同字符二元组数)
+        """
+        term_overlap = self._name_terms.candidates(query)
+        gram_overlap: Dict[str, int] = {}
+        for gram in self._char_grams(query):
+            for capability_id in self._name_grams.get(gram, ()):
+                gram_overlap[capability_id] = gram_overlap.get(capability_id, 0) + 1
+        
+        return {
+            capability_id: (term_overlap.get(capability_id, 0), gram_overlap.get(capability_id, 0))
+            for capability_id in term_overlap.keys() | gram_overlap.keys()
+        }
+    
+    def add_capability(self, capability_id: str, metadata: Dict[str, Any]):
+        """
+        添加或更新能力（增量更新索引）
+        
+        Args:
+            capability_id: 能力ID
+            metadata: 能力元数据
+        """
+        self._unindex_capability(capability_id)
+        self.registry[capability_id] = metadata
+        self._index_capability(capability_id, metadata)
+    
+    def remove_capability(self, capability_id: str):
+        """
+        删除能力（增量更新索引）
+        
+        Args:
+            capability_id: 能力ID
+        """
+        self.registry.pop(capability_id, None)
+        self._unindex_capability(capability_id)
     
     def _extract_keywords(self, name: str, description: str) -> List[str]:
         """
@@ -65,33 +176,16 @@ class CapabilityMatcher:
             description: 能力描述
             
         Returns:
-            关键词列表
+            关键词列表（英文单词和中文字符二元组，去重）
         """
-        keywords = []
-        text = f"{name} {description}".lower()
-        
-        # 常见关键词
-        common_keywords = [
-            '飞书', 'feishu', '文档', 'doc', '表格', 'table', 'bitable',
-            '多维表格', 'spreadsheet', '查询', 'query', '分析', 'analyze',
-            '故障', 'fault', '问题', 'ticket', '缓存', 'cache', '数据', 'data'
-        ]
-        
-        for keyword in common_keywords:
-            if keyword in text:
-                keywords.append(keyword)
-        
-        # 提取中文词汇（简单实现）
-        import re
-        chinese_words = re.findall(r'[\u4e00-\u9fa5]{2,}', text)
-        keywords.extend(chinese_words[:5])  # 限制数量
-        
-        return list(set(keywords))
+        return list(dict.fromkeys(tokenize(f"{name} {description}")))
     
     def match_by_name(self, name: str, threshold: float = 0.6) -> List[tuple[str, float]]:
         """
         按名称匹配能力
         
+        只对名称与查询有共同词项或字符二元组的能力计算相似度
+        
         Args:
             name: 查询名称
             threshold: 相似度阈值
@@ -102,8 +196,8 @@ class CapabilityMatcher:
         name_lower = name.lower()
         matches = []
         
-        for capability_id, metadata in self.registry.items():
-            capability_name = metadata.get('name', '').lower()
+        for capability_id in self._name_candidates(name):
+            capability_name = self.registry.get(capability_id, {}).get('name', '').lower()
             
             # 计算相似度
             similarity = SequenceMatcher(None, name_lower, capability_name).ratio()
@@ -120,6 +214,8 @@ class CapabilityMatcher:
         """
         按关键词匹配能力
         
+        关键词分词后的所有词项都出现在能力的名称/描述/类别中，才算命中该关键词
+        
         Args:
             keywords: 关键词列表
             
@@ -129,12 +225,22 @@ class CapabilityMatcher:
         scores: Dict[str, int] = {}
         
         for keyword in keywords:
-            keyword_lower = keyword.lower()
+            terms = set(tokenize(keyword))
+            if not terms:
+                continue
+            
+            # 从最短的倒排表开始求交集
+            postings = sorted(
+                (self.text_index.get_postings(term) for term in terms), key=len
+            )
+            matched: Set[str] = set(postings[0])
+            for posting in postings[1:]:
+                matched.intersection_update(posting)
+                if not matched:
+                    break
             
-            # 在关键词索引中查找
-            if keyword_lower in self.keyword_index:
-                for capability_id in self.keyword_index[keyword_lower]:
-                    scores[capability_id] = scores.get(capability_id, 0) + 1
+            for capability_id in matched:
+                scores[capability_id] = scores.get(capability_id, 0) + 1
         
         # 转换为列表并排序
         matches = [(cap_id, score) for cap_id, score in scores.items()]
@@ -168,8 +274,9 @@ class CapabilityMatcher:
         description_lower = description.lower()
         matches = []
         
-        for capability_id, metadata in self.registry.items():
-            capability_desc = metadata.get('description', '').lower()
+        # 只对与查询有共同词项的能力计算相似度
+        for capability_id in self.text_index.candidates(description):
+            capability_desc = self.registry.get(capability_id, {}).get('description', '').lower()
             
             # 计算相似度
             similarity = SequenceMatcher(None, description_lower, capability_desc).ratio()
@@ -199,26 +306,29 @@ class CapabilityMatcher:
         Returns:
             (能力ID, 匹配分数) 列表
         """
-        # 提取关键词
-        keywords = self._extract_keywords(query, '')
-        
         # 综合匹配结果
         all_matches: Dict[str, float] = {}
+        candidate_count = max(MIN_CANDIDATES, limit * CANDIDATE_FACTOR)
         
-        # 1. 名称匹配（权重：0.5）
-        name_matches = self.match_by_name(query, threshold=0.5)
-        for cap_id, score in name_matches:
-            all_matches[cap_id] = all_matches.get(cap_id, 0) + score * 0.5
-        
-        # 2. 关键词匹配（权重：0.3）
-        keyword_matches = self.match_by_keywords(keywords)
-        for cap_id, score in keyword_matches:
-            all_matches[cap_id] = all_matches.get(cap_id, 0) + score * 0.3
+        # 1. BM25 检索（名称/能力ID/描述/类别，按最高分归一化，权重：0.6）
+        text_matches = self.text_index.search(query, limit=candidate_count)
+        if text_matches:
+            top_score = text_matches[0][1] or 1.0
+            for cap_id, score in text_matches:
+                all_matches[cap_id] = score / top_score * 0.6
         
-        # 3. 描述匹配（权重：0.2）
-        desc_matches = self.match_by_description(query, threshold=0.2)
-        for cap_id, score in desc_matches:
-            all_matches[cap_id] = all_matches.get(cap_id, 0) + score * 0.2
+        # 2. 名称相似度（权重：0.4），只对名称共同词项（其次共同字符二元组）最多的候选计算
+        name_candidates = self._name_candidates(query)
+        if len(name_candidates) > candidate_count:
+            name_candidates = dict(heapq.nlargest(
+                candidate_count, name_candidates.items(), key=lambda x: x[1]
+            ))
+        query_lower = query.lower()
+        for cap_id in name_candidates:
+            capability_name = self.registry.get(cap_id, {}).get('name', '').lower()
+            similarity = SequenceMatcher(None, query_lower, capability_name).ratio()
+            if similarity >= 0.5:
+                all_matches[cap_id] = all_matches.get(cap_id, 0) + similarity * 0.4
         
         # 类别过滤
         if category:
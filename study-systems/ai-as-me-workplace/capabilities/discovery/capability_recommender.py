@@ -6,9 +6,13 @@
 """
 
 import logging
-from typing import Dict, Any, List, Optional, Set
+from pathlib import Path
+from typing import Dict, Any, List, Optional
 from collections import defaultdict
 
+from .cooccurrence_store import CooccurrenceStore
+from .dependency_graph import DependencyGraph
+
 logger = logging.getLogger(__name__)
 
 
@@ -18,7 +22,10 @@ class CapabilityRecommender:
     def __init__(
         self,
         capability_registry: Dict[str, Dict[str, Any]],
-        usage_history: Optional[List[Dict[str, Any]]] = None
+        usage_history: Optional[List[Dict[str, Any]]] = None,
+        cooccurrence_file: Optional[Path] = None,
+        half_life_days: float = 30.0,
+        top_k: int = 20
     ):
         """
         初始化能力推荐器
@@ -26,26 +33,38 @@ class CapabilityRecommender:
         Args:
             capability_registry: 能力注册表
             usage_history: 使用历史记录
+            cooccurrence_file: 共现存储文件（可选，存在时直接加载，不再从使用历史重建）
+            half_life_days: 共现计数半衰期（天）
+            top_k: 每个能力预先维护的共现邻居数
         """
         self.registry = capability_registry
         self.usage_history = usage_history or []
-        self._build_cooccurrence_matrix()
+        self.cooccurrence_store = CooccurrenceStore(cooccurrence_file, half_life_days, top_k)
+        if not self.cooccurrence_store.loaded:
+            self.cooccurrence_store.record_many(self.usage_history)
+        self.dependency_graph = DependencyGraph(capability_registry)
+    
+    @property
+    def cooccurrence(self) -> Dict[tuple[str, str], float]:
+        """所有能力对的共现计数（已按时间衰减）"""
+        return self.cooccurrence_store.pairs()
     
-    def _build_cooccurrence_matrix(self):
-        """构建共现矩阵（哪些能力经常一起使用）"""
-        self.cooccurrence: Dict[tuple[str, str], int] = defaultdict(int)
+    def record_usage(self, record: Dict[str, Any], save: bool = False):
+        """
+        增量记录一次使用
         
-        # 从使用历史中提取共现关系
-        for record in self.usage_history:
-            capabilities = record.get('capabilities', [])
-            if len(capabilities) < 2:
-                continue
+        Args:
+            record: 使用记录（capabilities、use_case、timestamp）
+            save: 是否立即持久化共现存储
+        """
+        self.usage_history.append(record)
+        self.cooccurrence_store.record(record.get('capabilities', []), record.get('timestamp'))
+        if save:
+            self.cooccurrence_store.save()
             
-            # 记录每对能力的共现
-            for i, cap1 in enumerate(capabilities):
-                for cap2 in capabilities[i+1:]:
-                    pair = tuple(sorted([cap1, cap2]))
-                    self.cooccurrence[pair] += 1
+    def save(self):
+        """持久化共现存储（未配置存储文件时忽略）"""
+        self.cooccurrence_store.save()
     
     def recommend_combinations(
         self,
@@ -55,27 +74,16 @@ class CapabilityRecommender:
         """
         推荐能力组合
         
+        直接读取预先维护的 top-k 共现邻居，limit 不超过 top_k
+        
         Args:
             base_capability: 基础能力ID
             limit: 返回结果数量限制
             
         Returns:
-            (能力ID, 推荐分数) 列表
+            (能力ID, 推荐分数) 列表，分数为按时间衰减后的共现计数
         """
-        recommendations: Dict[str, float] = {}
-        
-        # 查找与基础能力共现的其他能力
-        for (cap1, cap2), count in self.cooccurrence.items():
-            if cap1 == base_capability:
-                recommendations[cap2] = count
-            elif cap2 == base_capability:
-                recommendations[cap1] = count
-        
-        # 转换为列表并排序
-        recs = [(cap_id, score) for cap_id, score in recommendations.items()]
-        recs.sort(key=lambda x: x[1], reverse=True)
-        
-        return recs[:limit]
+        return self.cooccurrence_store.top_neighbors(base_capability, limit)
     
     def recommend_by_use_case(
         self,
@@ -117,45 +125,38 @@ class CapabilityRecommender:
         
         return recs[:limit]
     
+    def invalidate_dependencies(self):
+        """注册表变化后使依赖图缓存失效"""
+        self.dependency_graph.invalidate()
+    
     def analyze_dependencies(self, capability_id: str) -> Dict[str, Any]:
         """
-        分析能力依赖关系
+        分析能力依赖关系（基于缓存的依赖图）
         
         Args:
             capability_id: 能力ID
             
         Returns:
-            依赖分析结果
+            依赖分析结果，间接依赖包含全部传递依赖
         """
-        metadata = self.registry.get(capability_id, {})
-        dependencies = metadata.get('dependencies', [])
-        
-        # 分析直接依赖
-        direct_deps = []
-        for dep_id in dependencies:
-            if dep_id in self.registry:
-                direct_deps.append({
-                    'capability_id': dep_id,
-                    'name': self.registry[dep_id].get('name', ''),
-                    'type': 'direct'
-                })
-        
-        # 分析间接依赖（依赖的依赖）
-        indirect_deps = []
-        for dep in direct_deps:
-            dep_id = dep['capability_id']
-            dep_metadata = self.registry.get(dep_id, {})
-            dep_deps = dep_metadata.get('dependencies', [])
-            
-            for indirect_dep_id in dep_deps:
-                if indirect_dep_id not in [d['capability_id'] for d in direct_deps]:
-                    if indirect_dep_id in self.registry:
-                        indirect_deps.append({
-                            'capability_id': indirect_dep_id,
-                            'name': self.registry[indirect_dep_id].get('name', ''),
-                            'type': 'indirect',
-                            'via': dep_id
-                        })
+        direct_deps = [
+            {
+                'capability_id': dep_id,
+                'name': self.registry[dep_id].get('name', ''),
+                'type': 'direct'
+            }
+            for dep_id in self.dependency_graph.get_direct_dependencies(capability_id)
+        ]
+        
+        indirect_deps = [
+            {
+                'capability_id': dep_id,
+                'name': self.registry[dep_id].get('name', ''),
+                'type': 'indirect',
+                'via': via
+            }
+            for dep_id, via in self.dependency_graph.get_indirect_dependencies(capability_id)
+        ]
         
         return {
             'capability_id': capability_id,
@@ -176,20 +177,15 @@ class CapabilityRecommender:
         """
         conflicts = []
         
-        # 检查依赖冲突
-        all_deps: Set[str] = set()
-        for cap_id in capabilities:
-            metadata = self.registry.get(cap_id, {})
-            deps = metadata.get('dependencies', [])
-            all_deps.update(deps)
-        
-        # 检查是否有能力在依赖列表中（循环依赖）
+        # 检查循环依赖（能力处于依赖图的环中）
         for cap_id in capabilities:
-            if cap_id in all_deps:
+            cycle = self.dependency_graph.get_cycle(cap_id)
+            if cycle:
                 conflicts.append({
                     'type': 'circular_dependency',
                     'capability': cap_id,
-                    'message': f"能力 {cap_id} 存在循环依赖"
+                    'cycle': list(cycle),
+                    'message': f"能力 {cap_id} 存在循环依赖: {' -> '.join(cycle)}"
                 })
         
         # 检查版本冲突（如果有版本信息）
@@ -0,0 +1,257 @@
+# -*- coding: utf-8 -*-
+"""
+能力共现存储
+
+稀疏、增量更新的能力共现计数，计数按半衰期随时间衰减，可持久化到 JSON 文件；
+每个能力的 top-k 共现邻居随更新维护，推荐时直接查表
+"""
+
+import json
+import logging
+import math
+import os
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# 缩放权重超过该值时重设基准时间（避免浮点溢出）
+_MAX_SCALE = 1e12
+
+
+def _to_epoch(timestamp: Any) -> float:
+    """
+    时间戳（ISO 字符串 / datetime / 秒数）转为 Unix 秒数
+    
+    缺失或无法解析（空字符串、非 ISO 格式等）时按当前时间计，该次使用仍计入共现
+    """
+    if timestamp is None or timestamp == '':
+        return time.time()
+    try:
+        if isinstance(timestamp, (int, float)) and not isinstance(timestamp, bool):
+            epoch = float(timestamp)
+        else:
+            if isinstance(timestamp, str):
+                timestamp = datetime.fromisoformat(timestamp)
+            epoch = timestamp.timestamp()
+    except (ValueError, TypeError, AttributeError, OverflowError, OSError):
+        logger.debug(f"无法解析的使用时间 {timestamp!r}，按当前时间计")
+        return time.time()
+    return epoch if math.isfinite(epoch) else time.time()
+
+
+class CooccurrenceStore:
+    """
+    能力共现存储（线程安全）
+    
+    衰减实现：每次共现按 2^((t - 基准时间) / 半衰期) 的缩放权重累加，
+    所有计数按同一比例衰减，因此排序不随时间变化，读取时再乘以当前衰减因子；
+    缩放权重只增不减，top-k 邻居可在每次更新时以 O(k) 代价维护
+    """
+    
+    def __init__(
+        self,
+        store_file: Optional[Path] = None,
+        half_life_days: float = 30.0,
+        top_k: int = 20
+    ):
+        """
+        初始化共现存储
+        
+        Args:
+            store_file: 持久化文件（可选，存在时加载）
+            half_life_days: 计数半衰期（天）
+            top_k: 每个能力预先维护的共现邻居数
+        """
+        self.store_file = Path(store_file) if store_file else None
+        self.half_life = half_life_days * 86400
+        self.top_k = top_k
+        self.reference_time = time.time()
+        self.loaded = False
+        
+        # 能力ID -> {共现能力ID: 缩放权重}
+        self._neighbors: Dict[str, Dict[str, float]] = {}
+        # 能力ID -> [(共现能力ID, 缩放权重)]，按权重降序，最多 top_k 个
+        self._top: Dict[str, List[Tuple[str, float]]] = {}
+        self._dirty = False
+        self._lock = threading.RLock()
+        
+        if self.store_file and self.store_file.exists():
+            self.load()
+    
+    def _scale(self, epoch: float) -> float:
+        """时间点对应的缩放权重"""
+        return 2 ** ((epoch - self.reference_time) / self.half_life)
+    
+    def _decay(self, now: Optional[float] = None) -> float:
+        """缩放权重 -> 当前计数的换算因子"""
+        return 1.0 / self._scale(time.time() if now is None else now)
+    
+    def record(self, capabilities: Iterable[str], timestamp: Any = None):
+        """
+        记录一次共同使用
+        
+        Args:
+            capabilities: 一次使用中涉及的能力ID（重复的只计一次）
+            timestamp: 使用时间（可选，默认当前时间）
+        """
+        unique = sorted(set(capabilities))
+        if len(unique) < 2:
+            return
+        
+        epoch = _to_epoch(timestamp)
+        with self._lock:
+            weight = self._scale(epoch)
+            if weight > _MAX_SCALE:
+                self._rebase(epoch)
+                weight = self._scale(epoch)
+            
+            for i, cap1 in enumerate(unique):
+                for cap2 in unique[i + 1:]:
+                    self._add(cap1, cap2, weight)
+                    self._add(cap2, cap1, weight)
+            self._dirty = True
+    
+    def record_many(self, records: Iterable[Dict[str, Any]]):
+        """
+        批量记录使用历史
+        
+        Args:
+            records: 使用记录（capabilities 字段为能力ID列表，timestamp 字段可选）
+        """
+        for record in records:
+            self.record(record.get('capabilities') or [], record.get('timestamp'))
+    
+    def _add(self, capability: str, neighbor: str, weight: float):
+        """累加单向共现权重并维护 top-k"""
+        neighbors = self._neighbors.setdefault(capability, {})
+        total = neighbors.get(neighbor, 0.0) + weight
+        neighbors[neighbor] = total
+        
+        top = self._top.setdefault(capability, [])
+        for i, (cap_id, _) in enumerate(top):
+            if cap_id == neighbor:
+                top[i] = (neighbor, total)
+                break
+        else:
+            if len(top) < self.top_k:
+                top.append((neighbor, total))
+            elif total > top[-1][1]:
+                top[-1] = (neighbor, total)
+            else:
+                return
+        top.sort(key=lambda x: x[1], reverse=True)
+    
+    def _rebase(self, new_reference: float):
+        """重设基准时间，所有缩放权重按比例缩小"""
+        factor = self._scale(new_reference)
+        for neighbors in self._neighbors.values():
+            for cap_id in neighbors:
+                neighbors[cap_id] /= factor
+        for capability, top in self._top.items():
+            self._top[capability] = [(cap_id, weight / factor) for cap_id, weight in top]
+        self.reference_time = new_reference
+    
+    def top_neighbors(self, capability_id: str, limit: Optional[int] = None) -> List[Tuple[str, float]]:
+        """
+        获取共现最多的能力（预先维护的 top-k，O(k)）
+        
+        Args:
+            capability_id: 能力ID
+            limit: 返回数量（不超过 top_k）
+        
+        Returns:
+            (能力ID, 衰减后的共现计数) 列表，按计数降序排列
+        """
+        with self._lock:
+            decay = self._decay()
+            top = self._top.get(capability_id, [])
+            return [(cap_id, weight * decay) for cap_id, weight in top[:limit]]
+    
+    def get_count(self, cap1: str, cap2: str) -> float:
+        """
+        获取两个能力衰减后的共现计数
+        
+        Args:
+            cap1: 能力ID
+            cap2: 能力ID
+        
+        Returns:
+            共现计数
+        """
+        with self._lock:
+            return self._neighbors.get(cap1, {}).get(cap2, 0.0) * self._decay()
+    
+    def pairs(self) -> Dict[Tuple[str, str], float]:
+        """
+        获取所有能力对的衰减后共现计数
+        
+        Returns:
+            (能力ID, 能力ID)（按字典序）-> 共现计数
+        """
+        with self._lock:
+            decay = self._decay()
+            return {
+                (cap1, cap2): weight * decay
+                for cap1, neighbors in self._neighbors.items()
+                for cap2, weight in neighbors.items()
+                if cap1 < cap2
+            }
+    
+    def save(self):
+        """保存到持久化文件（原子替换；未配置文件或无变化时跳过）"""
+        if not self.store_file:
+            return
+        
+        with self._lock:
+            if not self._dirty:
+                return
+            data = {
+                'version': 1,
+                'half_life_days': self.half_life / 86400,
+                'reference_time': self.reference_time,
+                'pairs': [[cap1, cap2, weight] for (cap1, cap2), weight in self._scaled_pairs()]
+            }
+            self._dirty = False
+        
+        self.store_file.parent.mkdir(parents=True, exist_ok=True)
+        temp_file = self.store_file.with_suffix(self.store_file.suffix + '.tmp')
+        with open(temp_file, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False)
+        os.replace(temp_file, self.store_file)
+    
+    def _scaled_pairs(self) -> Iterable[Tuple[Tuple[str, str], float]]:
+        """所有能力对的缩放权重（每对一次）"""
+        for cap1, neighbors in self._neighbors.items():
+            for cap2, weight in neighbors.items():
+                if cap1 < cap2:
+                    yield (cap1, cap2), weight
+    
+    def load(self):
+        """从持久化文件加载（替换当前内容；文件损坏或半衰期不一致时保持不变）"""
+        try:
+            with open(self.store_file, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, json.JSONDecodeError) as e:
+            logger.error(f"加载共现存储失败 {self.store_file}: {e}")
+            return
+        
+        # 缩放权重是多次使用的累加和，无法换算到其他半衰期，只能重建
+        if data.get('half_life_days') != self.half_life / 86400:
+            logger.warning(f"共现存储 {self.store_file} 的半衰期与当前配置不一致，忽略已保存的计数")
+            return
+        
+        with self._lock:
+            self._neighbors.clear()
+            self._top.clear()
+            self.reference_time = data.get('reference_time', time.time())
+            
+            for cap1, cap2, weight in data.get('pairs', []):
+                self._add(cap1, cap2, weight)
+                self._add(cap2, cap1, weight)
+            
+            self._dirty = False
+            self.loaded = True
@@ -0,0 +1,297 @@
+# -*- coding: utf-8 -*-
+"""
+能力依赖图
+
+由能力注册表中的 dependencies 字段构建，首次使用时一次性计算拓扑序和
+强连通分量（循环依赖），传递闭包按需计算并缓存，之后的查询直接读缓存；注册表变化后需调用 invalidate()
+"""
+
+import threading
+from collections import deque
+from typing import Any, Dict, FrozenSet, List, Optional, Tuple
+
+
+class DependencyGraph:
+    """
+    能力依赖图（惰性构建，线程安全）
+    
+    只保留注册表中存在的依赖；拓扑序中依赖排在依赖它的能力之前，
+    同一循环中的能力相邻排列。所有查询都在锁内读取，与 invalidate() 互斥
+    """
+    
+    def __init__(self, capability_registry: Dict[str, Dict[str, Any]]):
+        """
+        初始化依赖图
+        
+        Args:
+            capability_registry: 能力注册表（与调用方共享，变化后需调用 invalidate()）
+        """
+        self.registry = capability_registry
+        self._lock = threading.RLock()
+        self._built = False
+        
+        # 能力ID -> 直接依赖（去重，保持声明顺序）
+        self._edges: Dict[str, Tuple[str, ...]] = {}
+        # 能力ID -> 拓扑序位置
+        self._order: Dict[str, int] = {}
+        # 强连通分量（按拓扑序），能力ID -> 所在分量编号
+        self._components: List[Tuple[str, ...]] = []
+        self._component_of: Dict[str, int] = {}
+        # 循环依赖（强连通分量），能力ID -> 所在循环
+        self._cycles: List[Tuple[str, ...]] = []
+        self._cycle_of: Dict[str, Tuple[str, ...]] = {}
+        # 分量编号 -> 传递依赖（不含自身，除非处于循环中；按需计算）
+        self._closure: Dict[int, FrozenSet[str]] = {}
+        # 能力ID -> [(间接依赖, 经由的直接依赖)]（按需计算）
+        self._indirect: Dict[str, List[Tuple[str, str]]] = {}
+        # 能力ID -> 自身及传递依赖的拓扑序（按需计算）
+        self._resolved: Dict[str, List[str]] = {}
+    
+    def invalidate(self):
+        """注册表变化后清空缓存，下次查询时重建"""
+        with self._lock:
+            self._built = False
+            self._edges.clear()
+            self._order.clear()
+            self._components.clear()
+            self._component_of.clear()
+            self._cycles.clear()
+            self._cycle_of.clear()
+            self._closure.clear()
+            self._indirect.clear()
+            self._resolved.clear()
+    
+    def _ensure_built(self):
+        """首次查询时构建依赖图（查询方法在锁内调用）"""
+        if self._built:
+            return
+        with self._lock:
+            if self._built:
+                return
+            
+            for cap_id, metadata in self.registry.items():
+                deps = dict.fromkeys(
+                    dep_id for dep_id in metadata.get('dependencies', []) or []
+                    if dep_id in self.registry
+                )
+                self._edges[cap_id] = tuple(deps)
+            
+            for component in self._strongly_connected_components():
+                component_index = len(self._components)
+                self._components.append(tuple(component))
+                for cap_id in component:
+                    self._order[cap_id] = len(self._order)
+                    self._component_of[cap_id] = component_index
+                
+                if len(component) > 1 or component[0] in self._edges[component[0]]:
+                    cycle = tuple(component)
+                    self._cycles.append(cycle)
+                    for cap_id in component:
+                        self._cycle_of[cap_id] = cycle
+            
+            self._built = True
+    
+    def _component_closure(self, component_index: int) -> FrozenSet[str]:
+        """计算强连通分量的传递闭包（按需计算并缓存依赖分量的闭包）"""
+        cached = self._closure.get(component_index)
+        if cached is not None:
+            return cached
+        
+        # 收集尚未计算闭包的可达分量，按拓扑序（依赖在前）依次计算
+        pending = {component_index}
+        stack = [component_index]
+        while stack:
+            for cap_id in self._components[stack.pop()]:
+                for dep_id in self._edges[cap_id]:
+                    dep_component = self._component_of[dep_id]
+                    if dep_component not in pending and dep_component not in self._closure:
+                        pending.add(dep_component)
+                        stack.append(dep_component)
+        
+        for index in sorted(pending):
+            members = self._components[index]
+            closure = set(members) if members[0] in self._cycle_of else set()
+            for cap_id in members:
+                for dep_id in self._edges[cap_id]:
+                    dep_component = self._component_of[dep_id]
+                    if dep_component != index:
+                        closure.add(dep_id)
+                        closure.update(self._closure[dep_component])
+            self._closure[index] = frozenset(closure)
+        
+        return self._closure[component_index]
+    
+    def _strongly_connected_components(self) -> List[List[str]]:
+        """
+        Tarjan 算法（迭代实现，避免长依赖链超出递归深度）
+        
+        Returns:
+            强连通分量列表，依赖所在的分量排在前面
+        """
+        index: Dict[str, int] = {}
+        lowlink: Dict[str, int] = {}
+        stack: List[str] = []
+        on_stack = set()
+        components: List[List[str]] = []
+        
+        for root in self._edges:
+            if root in index:
+                continue
+            
+            work = [(root, 0)]
+            while work:
+                node, edge_pos = work.pop()
+                if edge_pos == 0:
+                    index[node] = lowlink[node] = len(index)
+                    stack.append(node)
+                    on_stack.add(node)
+                
+                edges = self._edges[node]
+                descended = False
+                while edge_pos < len(edges):
+                    dep_id = edges[edge_pos]
+                    edge_pos += 1
+                    if dep_id not in index:
+                        work.append((node, edge_pos))
+                        work.append((dep_id, 0))
+                        descended = True
+                        break
+                    if dep_id in on_stack:
+                        lowlink[node] = min(lowlink[node], index[dep_id])
+                if descended:
+                    continue
+                
+                if lowlink[node] == index[node]:
+                    component = []
+                    while True:
+                        member = stack.pop()
+                        on_stack.discard(member)
+                        component.append(member)
+                        if member == node:
+                            break
+                    components.append(component)
+                
+                if work:
+                    parent = work[-1][0]
+                    lowlink[parent] = min(lowlink[parent], lowlink[node])
+        
+        return components
+    
+    def get_direct_dependencies(self, capability_id: str) -> Tuple[str, ...]:
+        """
+        获取直接依赖（只含注册表中存在的能力）
+        
+        Args:
+            capability_id: 能力ID
+        
+        Returns:
+            直接依赖ID
+        """
+        with self._lock:
+            self._ensure_built()
+            return self._edges.get(capability_id, ())
+    
+    def get_transitive_dependencies(self, capability_id: str) -> FrozenSet[str]:
+        """
+        获取全部传递依赖
+        
+        Args:
+            capability_id: 能力ID
+        
+        Returns:
+            传递依赖ID集合（能力处于循环中时包含自身）
+        """
+        with self._lock:
+            self._ensure_built()
+            if capability_id not in self._component_of:
+                return frozenset()
+            return self._component_closure(self._component_of[capability_id])
+    
+    def get_indirect_dependencies(self, capability_id: str) -> List[Tuple[str, str]]:
+        """
+        获取间接依赖（传递依赖中除直接依赖和自身以外的部分）
+        
+        Args:
+            capability_id: 能力ID
+        
+        Returns:
+            (间接依赖ID, 经由的直接依赖ID) 列表，按广度优先顺序（近的在前）
+        """
+        with self._lock:
+            self._ensure_built()
+            cached = self._indirect.get(capability_id)
+            if cached is not None:
+                return cached
+            
+            direct = self._edges.get(capability_id, ())
+            seen = set(direct)
+            seen.add(capability_id)
+            result: List[Tuple[str, str]] = []
+            queue = deque((dep_id, dep_id) for dep_id in direct)
+            while queue:
+                node, via = queue.popleft()
+                for dep_id in self._edges[node]:
+                    if dep_id not in seen:
+                        seen.add(dep_id)
+                        result.append((dep_id, via))
+                        queue.append((dep_id, via))
+            
+            self._indirect[capability_id] = result
+            return result
+    
+    def topological_order(self, capabilities: Optional[List[str]] = None) -> List[str]:
+        """
+        按拓扑序排列能力（依赖在前）
+        
+        Args:
+            capabilities: 要排序的能力ID（可选，默认全部能力；不在注册表中的排在最后）
+        
+        Returns:
+            排序后的能力ID列表
+        """
+        with self._lock:
+            self._ensure_built()
+            if capabilities is None:
+                return sorted(self._order, key=self._order.get)
+            missing = len(self._order)
+            return sorted(capabilities, key=lambda cap_id: self._order.get(cap_id, missing))
+    
+    def resolve(self, capability_id: str) -> List[str]:
+        """
+        解析能力及其全部传递依赖的执行顺序
+        
+        Args:
+            capability_id: 能力ID
+        
+        Returns:
+            能力ID列表（依赖在前；不在循环中时最后是能力自身）
+        """
+        with self._lock:
+            self._ensure_built()
+            order = self._resolved.get(capability_id)
+            if order is None:
+                closure = self.get_transitive_dependencies(capability_id) | {capability_id}
+                order = self.topological_order(list(closure))
+                self._resolved[capability_id] = order
+            return list(order)
+    
+    def get_cycle(self, capability_id: str) -> Optional[Tuple[str, ...]]:
+        """
+        获取能力所在的循环依赖
+        
+        Args:
+            capability_id: 能力ID
+        
+        Returns:
+            循环中的能力ID，不在循环中时为 None
+        """
+        with self._lock:
+            self._ensure_built()
+            return self._cycle_of.get(capability_id)
+    
+    @property
+    def cycles(self) -> List[Tuple[str, ...]]:
+        """全部循环依赖"""
+        with self._lock:
+            self._ensure_built()
+            return list(self._cycles)
@@ -0,0 +1,193 @@
+# -*- coding: utf-8 -*-
+"""
+文本倒排索引
+
+中英文混合分词（拉丁字母按单词、中文按字符二元组）和 BM25 排序，
+支持增量添加/删除文档，查询只访问查询词的倒排表，耗时与文档总数基本无关
+"""
+
+import heapq
+import math
+import re
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+
+# 拉丁字母/数字单词（下划线、连字符等作为分隔符）
+_LATIN_PATTERN = re.compile(r'[a-z0-9]+')
+# 中文字符连续片段
+_CJK_PATTERN = re.compile(r'[\u4e00-\u9fff]+')
+# 驼峰命名拆分：getTableData -> get Table Data
+_CAMEL_PATTERN = re.compile(r'([a-z0-9])([A-Z])')
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    分词
+    
+    拉丁字母按单词切分（驼峰和下划线命名会被拆开），中文按相邻字符二元组切分
+    （单字片段保留单字），例如 "查询飞书表格 get_table" ->
+    ['查询', '询飞', '飞书', '书表', '表格', 'get', 'table']
+    
+    Args:
+        text: 文本
+    
+    Returns:
+        词项列表（保留重复，用于词频）
+    """
+    if not text:
+        return []
+    
+    text = _CAMEL_PATTERN.sub(r'\1 \2', text).lower()
+    tokens = _LATIN_PATTERN.findall(text)
+    
+    for run in _CJK_PATTERN.findall(text):
+        if len(run) == 1:
+            tokens.append(run)
+        else:
+            tokens.extend(run[i:i + 2] for i in range(len(run) - 1))
+    
+    return tokens
+
+
+class BM25Index:
+    """
+    BM25 倒排索引
+    
+    文档由若干字段组成，字段按权重计入词频（如名称权重高于描述）
+    """
+    
+    def __init__(
+        self,
+        field_weights: Optional[Dict[str, float]] = None,
+        k1: float = 1.2,
+        b: float = 0.75
+    ):
+        """
+        初始化索引
+        
+        Args:
+            field_weights: 字段名 -> 词频权重（未列出的字段权重为 1）
+            k1: 词频饱和参数
+            b: 文档长度归一化参数
+        """
+        self.field_weights = field_weights or {}
+        self.k1 = k1
+        self.b = b
+        # 词项 -> {文档ID: 加权词频}
+        self._postings: Dict[str, Dict[str, float]] = {}
+        # 文档ID -> {词项: 加权词频}（删除文档时使用）
+        self._documents: Dict[str, Dict[str, float]] = {}
+        self._doc_lengths: Dict[str, float] = {}
+        self._total_length = 0.0
+    
+    def __len__(self) -> int:
+        return len(self._documents)
+    
+    def __contains__(self, doc_id: str) -> bool:
+        return doc_id in self._documents
+    
+    def add(self, doc_id: str, fields: Dict[str, str]):
+        """
+        添加（或替换）文档
+        
+        Args:
+            doc_id: 文档ID
+            fields: 字段名 -> 文本
+        """
+        if doc_id in self._documents:
+            self.remove(doc_id)
+        
+        term_freqs: Dict[str, float] = {}
+        for field, text in fields.items():
+            weight = self.field_weights.get(field, 1.0)
+            for term, count in Counter(tokenize(text)).items():
+                term_freqs[term] = term_freqs.get(term, 0.0) + count * weight
+        
+        self._documents[doc_id] = term_freqs
+        length = sum(term_freqs.values())
+        self._doc_lengths[doc_id] = length
+        self._total_length += length
+        
+        for term, freq in term_freqs.items():
+            self._postings.setdefault(term, {})[doc_id] = freq
+    
+    def remove(self, doc_id: str):
+        """
+        删除文档（不存在时忽略）
+        
+        Args:
+            doc_id: 文档ID
+        """
+        term_freqs = self._documents.pop(doc_id, None)
+        if term_freqs is None:
+            return
+        
+        self._total_length -= self._doc_lengths.pop(doc_id, 0.0)
+        for term in term_freqs:
+            postings = self._postings.get(term)
+            if postings is None:
+                continue
+            postings.pop(doc_id, None)
+            if not postings:
+                del self._postings[term]
+    
+    def get_postings(self, term: str) -> Dict[str, float]:
+        """
+        获取词项的倒排表
+        
+        Args:
+            term: 词项
+        
+        Returns:
+            文档ID -> 加权词频（只读）
+        """
+        return self._postings.get(term, {})
+    
+    def candidates(self, text: str) -> Dict[str, int]:
+        """
+        获取与文本有共同词项的文档
+        
+        Args:
+            text: 文本
+        
+        Returns:
+            文档ID -> 共同词项数
+        """
+        overlap: Dict[str, int] = {}
+        for term in set(tokenize(text)):
+            for doc_id in self._postings.get(term, ()):
+                overlap[doc_id] = overlap.get(doc_id, 0) + 1
+        return overlap
+    
+    def search(self, query: str, limit: Optional[int] = None) -> List[Tuple[str, float]]:
+        """
+        BM25 检索
+        
+        Args:
+            query: 查询文本
+            limit: 返回结果数量限制（可选）
+        
+        Returns:
+            (文档ID, BM25 分数) 列表，按分数降序排列
+        """
+        doc_count = len(self._documents)
+        if doc_count == 0:
+            return []
+        
+        avg_length = self._total_length / doc_count or 1.0
+        scores: Dict[str, float] = {}
+        
+        for term, query_freq in Counter(tokenize(query)).items():
+            postings = self._postings.get(term)
+            if not postings:
+                continue
+            
+            doc_freq = len(postings)
+            idf = math.log(1 + (doc_count - doc_freq + 0.5) / (doc_freq + 0.5))
+            for doc_id, freq in postings.items():
+                norm = self.k1 * (1 - self.b + self.b * self._doc_lengths[doc_id] / avg_length)
+                scores[doc_id] = scores.get(doc_id, 0.0) + query_freq * idf * freq * (self.k1 + 1) / (freq + norm)
+        
+        if limit:
+            return heapq.nlargest(limit, scores.items(), key=lambda x: x[1])
+        return sorted(scores.items(), key=lambda x: x[1], reverse=True)
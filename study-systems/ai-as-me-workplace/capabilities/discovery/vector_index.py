@@ -0,0 +1,253 @@
+# -*- coding: utf-8 -*-
+"""
+本地向量相似度索引
+
+不依赖嵌入模型：文本分词后用特征哈希得到 TF-IDF 稀疏向量，
+以随机超平面 SimHash 做局部敏感哈希（LSH）分桶，查询时只对同桶候选计算余弦相似度
+"""
+
+import hashlib
+import heapq
+import math
+from functools import lru_cache
+from typing import Dict, Iterable, List, Set, Tuple
+
+from .text_index import tokenize
+
+# 特征哈希空间大小（2^20）
+FEATURE_BITS = 20
+_FEATURE_MASK = (1 << FEATURE_BITS) - 1
+# 签名最大位数
+MAX_SIGNATURE_BITS = 128
+
+
+@lru_cache(maxsize=65536)
+def _hash_token(token: str) -> int:
+    """词项 -> 特征编号"""
+    digest = hashlib.blake2b(token.encode('utf-8'), digest_size=8).digest()
+    return int.from_bytes(digest, 'big') & _FEATURE_MASK
+
+
+@lru_cache(maxsize=65536)
+def _feature_signs(feature: int) -> Tuple[bool, ...]:
+    """特征在各随机超平面上的符号（由特征编号确定，MAX_SIGNATURE_BITS 个）"""
+    digest = hashlib.blake2b(feature.to_bytes(4, 'big'), digest_size=MAX_SIGNATURE_BITS // 8).digest()
+    bits = int.from_bytes(digest, 'big')
+    return tuple(bool((bits >> i) & 1) for i in range(MAX_SIGNATURE_BITS))
+
+
+class HashedVectorIndex:
+    """
+    哈希 TF-IDF 向量索引（近似最近邻）
+    
+    签名共 bands * rows 位，分成 bands 段，任一段相同的文档进入候选；
+    候选按命中段数取前 max_candidates 个，再用当前 IDF 计算精确余弦相似度排序
+    """
+    
+    def __init__(self, bands: int = 24, rows: int = 5, max_candidates: int = 200):
+        """
+        初始化索引
+        
+        Args:
+            bands: 签名分段数（越多召回越高、候选越多）
+            rows: 每段位数（越多候选越精确）
+            max_candidates: 参与精确排序的候选上限
+        """
+        if bands * rows > MAX_SIGNATURE_BITS:
+            raise ValueError(f"bands * rows 不能超过 {MAX_SIGNATURE_BITS}")
+        
+        self.bands = bands
+        self.rows = rows
+        self.max_candidates = max_candidates
+        self._row_mask = (1 << rows) - 1
+        
+        # 文档ID -> {特征: 对数词频}
+        self._term_freqs: Dict[str, Dict[int, float]] = {}
+        # 特征 -> 文档频率
+        self._doc_freqs: Dict[int, int] = {}
+        # 文档ID -> SimHash 签名
+        self._signatures: Dict[str, int] = {}
+        # (段号, 段值) -> 文档ID集合
+        self._buckets: Dict[Tuple[int, int], Set[str]] = {}
+        # 文档ID -> 向量模长（按当前 IDF 计算，文档集合变化后失效）
+        self._norms: Dict[str, float] = {}
+    
+    def __len__(self) -> int:
+        return len(self._term_freqs)
+    
+    def __contains__(self, doc_id: str) -> bool:
+        return doc_id in self._term_freqs
+    
+    def _vectorize(self, text: str) -> Dict[int, float]:
+        """文本 -> {特征: 对数词频}"""
+        counts: Dict[int, int] = {}
+        for token in tokenize(text):
+            feature = _hash_token(token)
+            counts[feature] = counts.get(feature, 0) + 1
+        return {feature: 1.0 + math.log(count) for feature, count in counts.items()}
+    
+    def _idf(self, feature: int) -> float:
+        """平滑 IDF"""
+        return math.log((len(self._term_freqs) + 1) / (self._doc_freqs.get(feature, 0) + 1)) + 1.0
+    
+    def _weigh(self, term_freqs: Dict[int, float]) -> Dict[int, float]:
+        """对数词频 -> TF-IDF 权重"""
+        return {feature: freq * self._idf(feature) for feature, freq in term_freqs.items()}
+    
+    def _simhash(self, weights: Dict[int, float]) -> int:
+        """计算 SimHash 签名"""
+        bits = self.bands * self.rows
+        acc = [0.0] * bits
+        for feature, weight in weights.items():
+            signs = _feature_signs(feature)
+            for i in range(bits):
+                if signs[i]:
+                    acc[i] += weight
+                else:
+                    acc[i] -= weight
+        
+        signature = 0
+        for i, value in enumerate(acc):
+            if value > 0:
+                signature |= 1 << i
+        return signature
+    
+    def _band_keys(self, signature: int) -> Iterable[Tuple[int, int]]:
+        """签名 -> 各段的桶键"""
+        for band in range(self.bands):
+            yield band, (signature >> (band * self.rows)) & self._row_mask
+    
+    def _sign(self, doc_id: str):
+        """计算文档签名并放入桶中"""
+        signature = self._simhash(self._weigh(self._term_freqs[doc_id]))
+        self._signatures[doc_id] = signature
+        for key in self._band_keys(signature):
+            self._buckets.setdefault(key, set()).add(doc_id)
+    
+    def _unsign(self, doc_id: str):
+        """从桶中移除文档"""
+        signature = self._signatures.pop(doc_id, None)
+        if signature is None:
+            return
+        for key in self._band_keys(signature):
+            bucket = self._buckets.get(key)
+            if bucket is not None:
+                bucket.discard(doc_id)
+                if not bucket:
+                    del self._buckets[key]
+    
+    def _add_vector(self, doc_id: str, text: str):
+        """只登记文档词频（不计算签名）"""
+        if doc_id in self._term_freqs:
+            self.remove(doc_id)
+        term_freqs = self._vectorize(text)
+        self._term_freqs[doc_id] = term_freqs
+        self._norms.clear()
+        for feature in term_freqs:
+            self._doc_freqs[feature] = self._doc_freqs.get(feature, 0) + 1
+    
+    def add(self, doc_id: str, text: str):
+        """
+        添加（或替换）文档
+        
+        签名按添加时的 IDF 计算，之后文档增多时不重算；排序始终使用当前 IDF
+        
+        Args:
+            doc_id: 文档ID
+            text: 文档文本
+        """
+        self._add_vector(doc_id, text)
+        self._sign(doc_id)
+    
+    def add_many(self, documents: Dict[str, str]):
+        """
+        批量添加文档（先统计全部文档频率再计算签名）
+        
+        Args:
+            documents: 文档ID -> 文档文本
+        """
+        for doc_id, text in documents.items():
+            self._add_vector(doc_id, text)
+        for doc_id in documents:
+            self._sign(doc_id)
+    
+    def remove(self, doc_id: str):
+        """
+        删除文档（不存在时忽略）
+        
+        Args:
+            doc_id: 文档ID
+        """
+        term_freqs = self._term_freqs.pop(doc_id, None)
+        if term_freqs is None:
+            return
+        
+        self._unsign(doc_id)
+        self._norms.clear()
+        for feature in term_freqs:
+            count = self._doc_freqs.get(feature, 0) - 1
+            if count > 0:
+                self._doc_freqs[feature] = count
+            else:
+                self._doc_freqs.pop(feature, None)
+    
+    def query(
+        self,
+        text: str,
+        limit: int = 10,
+        min_similarity: float = 0.0
+    ) -> List[Tuple[str, float]]:
+        """
+        查询相似文档
+        
+        Args:
+            text: 查询文本
+            limit: 返回结果数量限制
+            min_similarity: 最低余弦相似度
+        
+        Returns:
+            (文档ID, 余弦相似度) 列表，按相似度降序排列
+        """
+        if not self._term_freqs:
+            return []
+        
+        query_weights = self._weigh(self._vectorize(text))
+        query_norm = math.sqrt(sum(w * w for w in query_weights.values()))
+        if query_norm == 0:
+            return []
+        
+        # 按命中段数收集候选
+        hits: Dict[str, int] = {}
+        for key in self._band_keys(self._simhash(query_weights)):
+            for doc_id in self._buckets.get(key, ()):
+                hits[doc_id] = hits.get(doc_id, 0) + 1
+        
+        if len(hits) > self.max_candidates:
+            candidates = heapq.nlargest(self.max_candidates, hits, key=hits.get)
+        else:
+            candidates = list(hits)
+        
+        # 余弦相似度：查询权重再乘一次 IDF，与文档对数词频点积即为两个 TF-IDF 向量的点积
+        scaled_query = {
+            feature: weight * self._idf(feature) for feature, weight in query_weights.items()
+        }
+        results = []
+        for doc_id in candidates:
+            term_freqs = self._term_freqs[doc_id]
+            dot = sum(weight * term_freqs.get(feature, 0.0) for feature, weight in scaled_query.items())
+            if dot <= 0:
+                continue
+            similarity = dot / (query_norm * self._get_norm(doc_id))
+            if similarity > min_similarity:
+                results.append((doc_id, similarity))
+        
+        results.sort(key=lambda x: x[1], reverse=True)
+        return results[:limit]
+    
+    def _get_norm(self, doc_id: str) -> float:
+        """获取文档 TF-IDF 向量模长（缓存到文档集合下次变化）"""
+        norm = self._norms.get(doc_id)
+        if norm is None:
+            norm = math.sqrt(sum(w * w for w in self._weigh(self._term_freqs[doc_id]).values()))
+            self._norms[doc_id] = norm
+        return norm
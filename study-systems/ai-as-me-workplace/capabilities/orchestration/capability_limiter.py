@@ -0,0 +1,114 @@
+# -*- coding: utf-8 -*-
+"""
+能力并发限额
+
+多个工作流并发运行时，按能力ID限制同时进行的调用数
+（如飞书接口、日志下载），超出限额的调用排队等待
+"""
+
+import threading
+from contextlib import contextmanager
+from typing import Dict, Optional
+
+
+class CapabilityLease:
+    """一个已占用的调用名额（可提前释放，重复释放无效）"""
+    
+    def __init__(self, limiter: 'CapabilityLimiter', capability_id: str, semaphore: threading.BoundedSemaphore):
+        """
+        初始化名额
+        
+        Args:
+            limiter: 所属的并发限额
+            capability_id: 能力ID
+            semaphore: 能力的信号量（已占用）
+        """
+        self._limiter = limiter
+        self._capability_id = capability_id
+        self._semaphore = semaphore
+        self._released = False
+    
+    def release(self):
+        """释放名额（如调用超时被放弃时，不必等调用真正结束）"""
+        with self._limiter._lock:
+            if self._released:
+                return
+            self._released = True
+            self._limiter._in_use[self._capability_id] -= 1
+        self._semaphore.release()
+
+
+class CapabilityLimiter:
+    """按能力ID的并发限额（线程安全，可在多个引擎间共享）"""
+    
+    def __init__(
+        self,
+        limits: Optional[Dict[str, int]] = None,
+        default_limit: Optional[int] = None
+    ):
+        """
+        初始化并发限额
+        
+        Args:
+            limits: 能力ID -> 最大并发调用数
+            default_limit: 未单独配置的能力的最大并发调用数（None 表示不限制）
+        """
+        self.limits = dict(limits or {})
+        self.default_limit = default_limit
+        self._semaphores: Dict[str, threading.BoundedSemaphore] = {}
+        self._in_use: Dict[str, int] = {}
+        self._lock = threading.Lock()
+    
+    def _get_semaphore(self, capability_id: str) -> Optional[threading.BoundedSemaphore]:
+        """获取能力的信号量（首次使用时创建，不限制时返回None）"""
+        limit = self.limits.get(capability_id, self.default_limit)
+        if limit is None:
+            return None
+        
+        with self._lock:
+            semaphore = self._semaphores.get(capability_id)
+            if semaphore is None:
+                semaphore = threading.BoundedSemaphore(max(1, limit))
+                self._semaphores[capability_id] = semaphore
+            return semaphore
+    
+    @contextmanager
+    def acquire(self, capability_id: str):
+        """
+        占用一个调用名额，退出时释放
+        
+        Args:
+            capability_id: 能力ID
+            
+        Yields:
+            名额（CapabilityLease，可提前释放；不限制时为None）
+        """
+        semaphore = self._get_semaphore(capability_id)
+        if semaphore is None:
+            yield None
+            return
+        
+        semaphore.acquire()
+        with self._lock:
+            self._in_use[capability_id] = self._in_use.get(capability_id, 0) + 1
+        lease = CapabilityLease(self, capability_id, semaphore)
+        try:
+            yield lease
+        finally:
+            lease.release()
+    
+    def get_usage(self) -> Dict[str, Dict[str, Optional[int]]]:
+        """
+        获取各能力的名额使用情况
+        
+        Returns:
+            能力ID -> {'in_use': 占用数, 'limit': 限额}
+        """
+        with self._lock:
+            return {
+                capability_id: {
+                    'in_use': in_use,
+                    'limit': self.limits.get(capability_id, self.default_limit)
+                }
+                for capability_id, in_use in self._in_use.items()
+            }
@@ -0,0 +1,283 @@
+# -*- coding: utf-8 -*-
+"""
+步骤条件表达式
+
+小型安全表达式语言，用于步骤的 condition 字段：
+- 变量：{{variable}} / {{step_name.field}}（不存在时为 null）
+- 字面量：字符串、数字、true/false/null、列表 [a, b]
+- 比较：== != < <= > >=、in、not in
+- 逻辑：and / or / not
+- 算术：+ - * / // %
+- 函数：len() int() float() str() bool() lower() upper()
+
+例如：len({{fault_ids}}) > 0 and {{ticket_info.status}} != "closed"
+
+表达式借助 Python 语法解析为 AST，只允许上述节点，并编译为闭包；
+同一条件字符串只编译一次（LRU 缓存）
+"""
+
+import ast
+import json
+import logging
+import operator
+import re
+from functools import lru_cache
+from typing import Any, Callable, Dict, Set, Tuple
+
+from .template_compiler import TEMPLATE_PATTERN, VariableLookup
+
+logger = logging.getLogger(__name__)
+
+# 变量占位名前缀（{{path}} 替换为合法的 Python 标识符后再解析）
+_VAR_PREFIX = '__var_'
+
+_CONSTANTS = {
+    'true': True, 'false': False, 'null': None,
+    'True': True, 'False': False, 'None': None,
+}
+
+_FUNCTIONS: Dict[str, Callable] = {
+    'len': len,
+    'int': int,
+    'float': float,
+    'str': str,
+    'bool': bool,
+    'lower': lambda value: str(value).lower(),
+    'upper': lambda value: str(value).upper(),
+}
+
+_BINARY_OPERATORS = {
+    ast.Add: operator.add,
+    ast.Sub: operator.sub,
+    ast.Mult: operator.mul,
+    ast.Div: operator.truediv,
+    ast.FloorDiv: operator.floordiv,
+    ast.Mod: operator.mod,
+}
+
+_UNARY_OPERATORS = {
+    ast.Not: operator.not_,
+    ast.USub: operator.neg,
+    ast.UAdd: operator.pos,
+}
+
+_COMPARE_OPERATORS = {
+    ast.Eq: operator.eq,
+    ast.NotEq: operator.ne,
+    ast.Lt: operator.lt,
+    ast.LtE: operator.le,
+    ast.Gt: operator.gt,
+    ast.GtE: operator.ge,
+    ast.In: lambda left, right: left in right,
+    ast.NotIn: lambda left, right: left not in right,
+}
+
+# 编译后的节点：lookup -> 值
+_Evaluator = Callable[[VariableLookup], Any]
+
+# 字符串字面量（代入参数时，其中的 {{var}} 按文本替换）
+_STRING_LITERAL = re.compile(r'"(?:[^"\\]|\\.)*"|\'(?:[^\'\\]|\\.)*\'')
+
+
+class ConditionSyntaxError(ValueError):
+    """条件表达式语法错误或使用了不支持的语法"""
+    pass
+
+
+class CompiledCondition:
+    """编译后的条件表达式"""
+    
+    def __init__(self, source: str, evaluator: _Evaluator, references: Set[str]):
+        """
+        初始化编译后的条件
+        
+        Args:
+            source: 原始条件表达式
+            evaluator: 编译后的求值函数
+            references: 引用的变量根名称
+        """
+        self.source = source
+        self.references = references
+        self._evaluator = evaluator
+    
+    def evaluate(self, lookup: VariableLookup) -> bool:
+        """
+        求值
+        
+        求值出错（如 null 与数字比较）时记录警告并视为不满足
+        
+        Args:
+            lookup: 变量查找函数
+        
+        Returns:
+            条件是否满足
+        """
+        try:
+            return bool(self._evaluator(lookup))
+        except Exception as e:
+            logger.warning(f"条件 {self.source} 求值失败，视为不满足: {e}")
+            return False
+
+
+@lru_cache(maxsize=512)
+def compile_condition(condition: str) -> CompiledCondition:
+    """
+    编译条件表达式（结果按条件字符串缓存）
+    
+    Args:
+        condition: 条件表达式
+    
+    Returns:
+        编译后的条件
+    
+    Raises:
+        ConditionSyntaxError: 语法错误或使用了不支持的语法
+    """
+    variables: Dict[str, Tuple[Tuple[str, ...], str]] = {}
+    
+    def to_placeholder(match) -> str:
+        var_path = match.group(1).strip()
+        name = f"{_VAR_PREFIX}{len(variables)}"
+        variables[name] = (tuple(var_path.split('.')), var_path)
+        return name
+    
+    expression = TEMPLATE_PATTERN.sub(to_placeholder, condition).strip()
+    if not expression:
+        raise ConditionSyntaxError("条件表达式为空")
+    
+    try:
+        tree = ast.parse(expression, mode='eval')
+    except SyntaxError as e:
+        raise ConditionSyntaxError(f"条件表达式语法错误: {condition}（{e.msg}）") from e
+    
+    evaluator = _compile_node(tree.body, variables, condition)
+    references = {parts[0] for parts, _ in variables.values()}
+    return CompiledCondition(condition, evaluator, references)
+
+
+def bind_parameters(condition: str, parameters: Dict[str, Any]) -> str:
+    """
+    将模板参数代入条件表达式
+    
+    字符串字面量之外的 {{param}} 替换为参数值的字面量（如 "open"、3、true、["a"]），
+    字符串字面量之内的按文本替换；参数中没有（或为 None）的变量保留为 {{var}}，
+    运行时按工作流变量解析
+    
+    Args:
+        condition: 条件表达式
+        parameters: 参数字典
+    
+    Returns:
+        代入参数后的条件表达式
+    """
+    def to_literal(match) -> str:
+        value = parameters.get(match.group(1).strip())
+        if value is None:
+            return match.group(0)
+        return json.dumps(value, ensure_ascii=False, default=str)
+    
+    def to_text(quote: str):
+        def replace(match) -> str:
+            value = parameters.get(match.group(1).strip())
+            if value is None:
+                return match.group(0)
+            escaped = json.dumps(str(value), ensure_ascii=False)[1:-1]
+            return escaped.replace("'", "\\'") if quote == "'" else escaped
+        return replace
+    
+    out = []
+    position = 0
+    for literal in _STRING_LITERAL.finditer(condition):
+        out.append(TEMPLATE_PATTERN.sub(to_literal, condition[position:literal.start()]))
+        out.append(TEMPLATE_PATTERN.sub(to_text(literal.group(0)[0]), literal.group(0)))
+        position = literal.end()
+    out.append(TEMPLATE_PATTERN.sub(to_literal, condition[position:]))
+    return ''.join(out)
+
+
+def _compile_node(
+    node: ast.AST,
+    variables: Dict[str, Tuple[Tuple[str, ...], str]],
+    source: str
+) -> _Evaluator:
+    """将 AST 节点编译为求值函数（只接受白名单内的节点）"""
+    def compile_child(child: ast.AST) -> _Evaluator:
+        return _compile_node(child, variables, source)
+    
+    if isinstance(node, ast.Constant):
+        if not isinstance(node.value, (str, int, float, bool, type(None))):
+            raise ConditionSyntaxError(f"不支持的字面量: {node.value!r}")
+        value = node.value
+        return lambda lookup: value
+    
+    if isinstance(node, ast.Name):
+        if node.id in variables:
+            parts, var_path = variables[node.id]
+            return lambda lookup: lookup(parts, var_path)
+        if node.id in _CONSTANTS:
+            value = _CONSTANTS[node.id]
+            return lambda lookup: value
+        raise ConditionSyntaxError(f"未知标识符 {node.id}（变量需写成 {{{{{node.id}}}}}）")
+    
+    if isinstance(node, (ast.List, ast.Tuple)):
+        elements = [compile_child(element) for element in node.elts]
+        return lambda lookup: [element(lookup) for element in elements]
+    
+    if isinstance(node, ast.BoolOp):
+        operands = [compile_child(value) for value in node.values]
+        if isinstance(node.op, ast.And):
+            def evaluate_and(lookup):
+                result = True
+                for operand in operands:
+                    result = operand(lookup)
+                    if not result:
+                        return result
+                return result
+            return evaluate_and
+        
+        def evaluate_or(lookup):
+            result = False
+            for operand in operands:
+                result = operand(lookup)
+                if result:
+                    return result
+            return result
+        return evaluate_or
+    
+    if isinstance(node, ast.UnaryOp) and type(node.op) in _UNARY_OPERATORS:
+        op = _UNARY_OPERATORS[type(node.op)]
+        operand = compile_child(node.operand)
+        return lambda lookup: op(operand(lookup))
+    
+    if isinstance(node, ast.BinOp) and type(node.op) in _BINARY_OPERATORS:
+        op = _BINARY_OPERATORS[type(node.op)]
+        left, right = compile_child(node.left), compile_child(node.right)
+        return lambda lookup: op(left(lookup), right(lookup))
+    
+    if isinstance(node, ast.Compare):
+        if not all(type(op) in _COMPARE_OPERATORS for op in node.ops):
+            raise ConditionSyntaxError(f"不支持的比较运算: {source}")
+        ops = [_COMPARE_OPERATORS[type(op)] for op in node.ops]
+        operands = [compile_child(node.left)] + [compile_child(c) for c in node.comparators]
+        
+        def evaluate_compare(lookup):
+            # 链式比较：a < b < c 等价于 a < b and b < c
+            left = operands[0](lookup)
+            for op, operand in zip(ops, operands[1:]):
+                right = operand(lookup)
+                if not op(left, right):
+                    return False
+                left = right
+            return True
+        return evaluate_compare
+    
+    if isinstance(node, ast.Call):
+        if not isinstance(node.func, ast.Name) or node.func.id not in _FUNCTIONS or node.keywords:
+            raise ConditionSyntaxError(
+                f"不支持的函数调用（可用函数：{', '.join(_FUNCTIONS)}）: {source}"
+            )
+        func = _FUNCTIONS[node.func.id]
+        args = [compile_child(arg) for arg in node.args]
+        return lambda lookup: func(*[arg(lookup) for arg in args])
+    
+    raise ConditionSyntaxError(f"不支持的语法 {type(node).__name__}: {source}")
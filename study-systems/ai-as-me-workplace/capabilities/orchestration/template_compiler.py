@@ -0,0 +1,163 @@
+# -*- coding: utf-8 -*-
+"""
+模板编译器
+
+将步骤输入中的 {{variable}} / {{step_name.field_name}} 模板编译为解析计划：
+常量子树预先计算、变量路径预先拆分，执行时只处理含变量的部分
+"""
+
+import logging
+import re
+from typing import Any, Callable, List, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+# 模板变量格式：{{variable_name}} 或 {{step_name.field_name}}
+TEMPLATE_PATTERN = re.compile(r'\{\{([^}]+)\}\}')
+
+# 变量查找函数：(拆分后的路径, 原始路径) -> 变量值
+VariableLookup = Callable[[Tuple[str, ...], str], Any]
+
+
+def _copy_containers(value: Any) -> Any:
+    """复制 dict/list 容器结构（其中的标量和其他对象共享）"""
+    if isinstance(value, dict):
+        return {key: _copy_containers(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_copy_containers(item) for item in value]
+    return value
+
+
+class CompiledTemplate:
+    """
+    编译后的模板
+    
+    resolve() 只对含变量的部分查找变量；每次解析都返回新的 dict/list 容器
+    （常量子树只复制容器结构），能力原地修改输入不会影响模板本身和其他次解析。
+    整个字符串就是一个模板变量时（如 "{{fault_ids}}"）保留变量原始类型，
+    模板嵌在其他文本中时按 str() 拼接
+    """
+    
+    def __init__(self, data: Any, warn_missing: bool = True):
+        """
+        编译模板
+        
+        Args:
+            data: 包含模板变量的数据（dict/list/str/其他）
+            warn_missing: 变量不存在时是否记录警告（只替换部分变量时可关闭）
+        """
+        self.source = data
+        self.warn_missing = warn_missing
+        self.references: Set[str] = set()
+        self.is_constant, self._plan = self._compile(data)
+    
+    def resolve(self, lookup: VariableLookup) -> Any:
+        """
+        解析模板
+        
+        Args:
+            lookup: 变量查找函数
+            
+        Returns:
+            解析后的数据
+        """
+        if self.is_constant:
+            return _copy_containers(self._plan)
+        return self._plan(lookup)
+    
+    def _compile(self, node: Any) -> Tuple[bool, Any]:
+        """
+        编译单个节点
+        
+        Returns:
+            (是否常量, 常量值或解析函数)
+        """
+        if isinstance(node, dict):
+            entries = [(key, *self._compile(value)) for key, value in node.items()]
+            if all(is_const for _, is_const, _ in entries):
+                return True, node
+            
+            def resolve_dict(lookup):
+                return {
+                    key: _copy_containers(plan) if is_const else plan(lookup)
+                    for key, is_const, plan in entries
+                }
+            return False, resolve_dict
+        
+        if isinstance(node, list):
+            items = [self._compile(item) for item in node]
+            if all(is_const for is_const, _ in items):
+                return True, node
+            
+            def resolve_list(lookup):
+                return [_copy_containers(plan) if is_const else plan(lookup) for is_const, plan in items]
+            return False, resolve_list
+        
+        if isinstance(node, str):
+            return self._compile_string(node)
+        
+        return True, node
+    
+    def _compile_string(self, text: str) -> Tuple[bool, Any]:
+        """编译字符串模板"""
+        if '{{' not in text or not TEMPLATE_PATTERN.search(text):
+            return True, text
+        
+        full_match = TEMPLATE_PATTERN.fullmatch(text)
+        if full_match:
+            var_path = full_match.group(1).strip()
+            parts = tuple(var_path.split('.'))
+            self.references.add(parts[0])
+            
+            def resolve_variable(lookup):
+                value = lookup(parts, var_path)
+                if value is None:
+                    # 变量不存在，保持原样
+                    if self.warn_missing:
+                        logger.warning(f"模板变量 {var_path} 不存在")
+                    return text
+                return value
+            return False, resolve_variable
+        
+        # 文本与变量混合：split 结果中奇数位是变量路径
+        pieces: List[Tuple[bool, Any]] = []
+        for i, piece in enumerate(TEMPLATE_PATTERN.split(text)):
+            if i % 2 == 0:
+                if piece:
+                    pieces.append((False, piece))
+            else:
+                var_path = piece.strip()
+                parts = tuple(var_path.split('.'))
+                self.references.add(parts[0])
+                pieces.append((True, (parts, var_path, '{{' + piece + '}}')))
+        
+        def resolve_text(lookup):
+            out = []
+            for is_var, piece in pieces:
+                if not is_var:
+                    out.append(piece)
+                    continue
+                parts, var_path, raw = piece
+                value = lookup(parts, var_path)
+                if value is None:
+                    if self.warn_missing:
+                        logger.warning(f"模板变量 {var_path} 不存在")
+                    out.append(raw)
+                else:
+                    out.append(str(value))
+            return ''.join(out)
+        return False, resolve_text
+
+
+def compile_template(data: Any, warn_missing: bool = True) -> CompiledTemplate:
+    """
+    编译模板
+    
+    Args:
+        data: 包含模板变量的数据
+        warn_missing: 变量不存在时是否记录警告
+        
+    Returns:
+        编译后的模板
+    """
+    return CompiledTemplate(data, warn_missing)
@@ -5,9 +5,13 @@
 定义工作流的JSON/YAML格式规范
 """
 
-from typing import Dict, Any, List, Optional
+import copy
+from typing import Collection, Dict, Any, List, Optional, Tuple
 from enum import Enum
 
+from .condition_expression import ConditionSyntaxError, compile_condition
+from .template_compiler import CompiledTemplate, compile_template
+
 
 class StepType(Enum):
     """步骤类型"""
@@ -17,6 +21,13 @@ class StepType(Enum):
     LOOP = "loop"  # 循环执行
 
 
+# 循环步骤的默认循环变量名
+DEFAULT_LOOP_ITEM_VAR = 'item'
+
+# 循环步骤单项失败时的处理策略
+LOOP_ERROR_POLICIES = ('fail', 'continue', 'skip')
+
+
 class WorkflowDefinition:
     """工作流定义"""
     
@@ -40,6 +51,7 @@ class WorkflowDefinition:
         self.version = version
         self.description = description
         self.steps = steps or []
+        self._compiled_inputs: Optional[List[Tuple[Any, CompiledTemplate]]] = None
     
     @classmethod
     def from_dict(cls, data: Dict[str, Any]) -> 'WorkflowDefinition':
@@ -52,12 +64,62 @@ class WorkflowDefinition:
         Returns:
             工作流定义对象
         """
-        return cls(
+        workflow = cls(
             name=data.get('name', ''),
             version=data.get('version', '1.0.0'),
             description=data.get('description', ''),
             steps=data.get('steps', [])
         )
+        workflow.compile()
+        return workflow
+    
+    def compile(self):
+        """
+        编译所有步骤的输入模板
+        
+        加载时调用一次，之后每次执行直接复用解析计划；
+        每个计划都保存编译时的输入快照，步骤输入被替换或修改后自动重新编译
+        """
+        self._compiled_inputs = [self._compile_step_input(step) for step in self.steps]
+    
+    @staticmethod
+    def _compile_step_input(step: Dict[str, Any]) -> Tuple[Any, CompiledTemplate]:
+        """编译单个步骤的输入模板，并返回 (输入快照, 编译结果)"""
+        source = step.get('input', {})
+        return copy.deepcopy(source), compile_template(source)
+    
+    def get_compiled_input(self, index: int) -> CompiledTemplate:
+        """
+        获取步骤的已编译输入模板（尚未编译或输入已变化时先编译）
+        
+        Args:
+            index: 步骤索引
+            
+        Returns:
+            编译后的输入模板
+        """
+        if self._compiled_inputs is None or len(self._compiled_inputs) != len(self.steps):
+            self.compile()
+        snapshot, compiled = self._compiled_inputs[index]
+        step = self.steps[index]
+        if step.get('input', {}) != snapshot:
+            snapshot, compiled = self._compile_step_input(step)
+            self._compiled_inputs[index] = (snapshot, compiled)
+        return compiled
+    
+    def copy(self) -> 'WorkflowDefinition':
+        """
+        复制工作流定义（步骤深拷贝，副本首次执行时按自己的步骤编译输入模板）
+        
+        Returns:
+            可独立修改的工作流定义对象
+        """
+        return WorkflowDefinition(
+            name=self.name,
+            version=self.version,
+            description=self.description,
+            steps=copy.deepcopy(self.steps)
+        )
     
     def to_dict(self) -> Dict[str, Any]:
         """
@@ -73,10 +135,13 @@ class WorkflowDefinition:
             'steps': self.steps
         }
     
-    def validate(self) -> tuple[bool, Optional[str]]:
+    def validate(self, cache_strategies: Optional[Collection[str]] = None) -> tuple[bool, Optional[str]]:
         """
         验证工作流定义
         
+        Args:
+            cache_strategies: 已配置的缓存策略名称（可选，指定时步骤 cache 的 strategy 必须是其中之一）
+            
         Returns:
             (是否有效, 错误信息)
         """
@@ -92,6 +157,30 @@ class WorkflowDefinition:
             
             if 'action' not in step:
                 return False, f"步骤 {i+1} 缺少 action 字段"
+            
+            if 'condition' in step:
+                try:
+                    compile_condition(str(step['condition']))
+                except ConditionSyntaxError as e:
+                    return False, f"步骤 {i+1} 的条件无效: {e}"
+            
+            if 'cache' in step and not isinstance(step['cache'], (bool, dict)):
+                return False, f"步骤 {i+1} 的 cache 字段必须是布尔值或字典"
+            
+            if cache_strategies is not None and isinstance(step.get('cache'), dict):
+                strategy = step['cache'].get('strategy', 'default')
+                if strategy not in cache_strategies:
+                    return False, f"步骤 {i+1} 的缓存策略 {strategy} 未配置"
+            
+            if step.get('type') == StepType.LOOP.value and 'foreach' not in step:
+                return False, f"步骤 {i+1} 是循环步骤但缺少 foreach 字段"
+            
+            if step.get('on_item_error', 'fail') not in LOOP_ERROR_POLICIES:
+                return False, f"步骤 {i+1} 的 on_item_error 必须是 {'/'.join(LOOP_ERROR_POLICIES)} 之一"
+            
+            max_concurrency = step.get('max_concurrency')
+            if max_concurrency is not None and (not isinstance(max_concurrency, int) or max_concurrency < 1):
+                return False, f"步骤 {i+1} 的 max_concurrency 必须是正整数"
         
         return True, None
 
@@ -124,7 +213,10 @@ def create_step(
     output: str,
     condition: Optional[str] = None,
     retry: Optional[int] = None,
-    timeout: Optional[int] = None
+    timeout: Optional[int] = None,
+    depends_on: Optional[List[str]] = None,
+    retry_delay: Optional[float] = None,
+    cache: Optional[Any] = None
 ) -> Dict[str, Any]:
     """
     创建工作流步骤
@@ -134,9 +226,13 @@ def create_step(
         action: 动作名称
         input_data: 输入数据（支持模板变量）
         output: 输出变量名
-        condition: 执行条件（可选）
+        condition: 执行条件表达式（可选），如 len({{fault_ids}}) > 0
         retry: 重试次数（可选）
         timeout: 超时时间（秒，可选）
+        depends_on: 显式依赖的步骤输出名列表（可选，模板变量引用的依赖会自动识别）
+        retry_delay: 首次重试的基准延迟（秒，可选），之后按指数退避并加随机抖动
+        cache: 结果缓存配置（可选）：True 或 {'ttl': 秒, 'strategy': 策略名, 'tags': [...]}，
+               相同能力版本和已解析输入的结果从统一缓存读取
         
     Returns:
         步骤定义字典
@@ -157,4 +253,55 @@ def create_step(
     if timeout:
         step['timeout'] = timeout
     
+    if depends_on:
+        step['depends_on'] = depends_on
+    
+    if retry_delay:
+        step['retry_delay'] = retry_delay
+    
+    if cache:
+        step['cache'] = cache
+    
+    return step
+
+
+def create_foreach_step(
+    capability: str,
+    action: str,
+    foreach: str,
+    input_data: Dict[str, Any],
+    output: str,
+    item_var: str = DEFAULT_LOOP_ITEM_VAR,
+    max_concurrency: Optional[int] = None,
+    on_item_error: str = 'fail'
+) -> Dict[str, Any]:
+    """
+    创建循环步骤（对列表变量的每一项调用能力）
+    
+    Args:
+        capability: 能力ID
+        action: 动作名称
+        foreach: 列表变量模板（如 "{{fault_ids}}"）
+        input_data: 每项的输入数据（可用 {{item}} / {{item.field}} 引用当前项）
+        output: 输出变量名（结果列表，顺序与 foreach 列表一致）
+        item_var: 循环变量名（默认 item）
+        max_concurrency: 最大并发项数（可选，默认为引擎线程数）
+        on_item_error: 单项失败的处理策略：fail / continue / skip
+        
+    Returns:
+        步骤定义字典（可另行添加 retry、timeout（作用于整个步骤）和 cache（作用于每一项））
+    """
+    step = create_step(capability, action, input_data, output)
+    step['type'] = StepType.LOOP.value
+    step['foreach'] = foreach
+    
+    if item_var != DEFAULT_LOOP_ITEM_VAR:
+        step['item_var'] = item_var
+    
+    if max_concurrency:
+        step['max_concurrency'] = max_concurrency
+    
+    if on_item_error != 'fail':
+        step['on_item_error'] = on_item_error
+    
     return step
@@ -2,19 +2,75 @@
 """
 工作流引擎
 
-支持顺序执行、并行执行、条件分支、错误处理和重试机制
+支持顺序执行、并行执行、条件分支、错误处理和重试机制。
+步骤按数据依赖（模板变量引用和 depends_on）构成DAG，互不依赖的步骤在线程池中并行执行
 """
 
+import copy
+import hashlib
+import heapq
+import json
 import logging
+import random
+import threading
 import time
-import re
-from typing import Dict, Any, Optional, List, Callable
+from contextlib import contextmanager
+from contextvars import ContextVar, copy_context
+from concurrent.futures import ThreadPoolExecutor, Future, wait, as_completed, FIRST_COMPLETED
+from typing import Dict, Any, Optional, List, Callable, Set, Tuple
 from datetime import datetime
 
-from .workflow_definition import WorkflowDefinition, StepType
+from ..cache.cache_manager import UnifiedCacheManager
+from .workflow_definition import WorkflowDefinition, StepType, DEFAULT_LOOP_ITEM_VAR
+from .capability_limiter import CapabilityLease, CapabilityLimiter
+from .condition_expression import ConditionSyntaxError, compile_condition
+from .template_compiler import TEMPLATE_PATTERN, compile_template
+from .workflow_journal import WorkflowJournal
+from .workflow_tracer import WorkflowTracer
 
 logger = logging.getLogger(__name__)
 
+# 重试退避默认值（秒）：首次重试基准延迟和最大延迟
+DEFAULT_RETRY_DELAY = 1.0
+DEFAULT_RETRY_MAX_DELAY = 30.0
+
+# 步骤结果缓存的键前缀和标签前缀（按能力失效：invalidate_tag('workflow_step:<能力ID>')）
+STEP_CACHE_PREFIX = 'workflow_step:'
+
+
+class _StepAttempt:
+    """
+    一次设置了超时的步骤尝试
+    
+    超时被放弃后释放其占用的能力名额，尚未开始的能力调用（如循环步骤的剩余项）不再执行
+    """
+    
+    def __init__(self):
+        """初始化尝试"""
+        self.abandoned = False
+        self._leases: List[CapabilityLease] = []
+        self._lock = threading.Lock()
+    
+    def hold(self, lease: CapabilityLease):
+        """登记尝试占用的能力名额（尝试已被放弃时立即释放）"""
+        with self._lock:
+            if not self.abandoned:
+                self._leases.append(lease)
+                return
+        lease.release()
+    
+    def abandon(self):
+        """放弃尝试并释放其占用的全部能力名额"""
+        with self._lock:
+            self.abandoned = True
+            leases, self._leases = self._leases, []
+        for lease in leases:
+            lease.release()
+
+
+# 当前线程所属的步骤尝试（循环步骤的工作线程通过 copy_context 继承）
+_current_attempt: ContextVar[Optional[_StepAttempt]] = ContextVar('workflow_step_attempt', default=None)
+
 
 class WorkflowContext:
     """工作流上下文"""
@@ -24,6 +80,8 @@ class WorkflowContext:
         self.variables: Dict[str, Any] = {}
         self.step_results: Dict[str, Any] = {}
         self.errors: List[Dict[str, Any]] = []
+        # 每次步骤尝试的 span（开始/结束时间、排队等待、输入输出大小等）
+        self.spans: List[Dict[str, Any]] = []
         self.start_time: Optional[datetime] = None
         self.end_time: Optional[datetime] = None
     
@@ -55,15 +113,33 @@ class WorkflowContext:
 class WorkflowEngine:
     """工作流引擎"""
     
-    def __init__(self, capability_registry: Optional[Dict[str, Any]] = None):
+    def __init__(
+        self,
+        capability_registry: Optional[Dict[str, Any]] = None,
+        max_workers: int = 4,
+        cache_manager: Optional[UnifiedCacheManager] = None,
+        journal: Optional[WorkflowJournal] = None,
+        capability_limiter: Optional[CapabilityLimiter] = None,
+        tracer: Optional[WorkflowTracer] = None
+    ):
         """
         初始化工作流引擎
         
         Args:
             capability_registry: 能力注册表（能力ID -> 能力实例的映射）
+            max_workers: 并行执行步骤的线程数（1 表示按依赖顺序逐个执行）
+            cache_manager: 步骤结果缓存使用的缓存管理器（可选，未指定时 cache 步骤不缓存）
+            journal: 运行日志（可选，启用后每个成功步骤落盘，可用 resume() 恢复中断的运行）
+            capability_limiter: 按能力的并发限额（可选，多个引擎共享时为全局限额）
+            tracer: 追踪器（可选，每次运行结束后记录其步骤 span，用于导出时间线）
         """
         self.capability_registry = capability_registry or {}
+        self.max_workers = max(1, max_workers)
         self.context = WorkflowContext()
+        self._cache_manager = cache_manager
+        self.journal = journal
+        self.capability_limiter = capability_limiter
+        self.tracer = tracer
     
     def register_capability(self, capability_id: str, capability: Any):
         """
@@ -75,18 +151,20 @@ class WorkflowEngine:
         """
         self.capability_registry[capability_id] = capability
     
-    def execute(self, workflow: WorkflowDefinition) -> Dict[str, Any]:
+    def execute(self, workflow: WorkflowDefinition, run_id: Optional[str] = None) -> Dict[str, Any]:
         """
         执行工作流
         
         Args:
             workflow: 工作流定义
+            run_id: 运行ID（可选，启用运行日志时未指定则自动生成）
             
         Returns:
-            执行结果字典
+            执行结果字典（启用运行日志时包含 run_id）
         """
         # 验证工作流
-        is_valid, error_msg = workflow.validate()
+        cache_strategies = self._cache_manager.get_strategy_names() if self._cache_manager else None
+        is_valid, error_msg = workflow.validate(cache_strategies)
         if not is_valid:
             return {
                 'success': False,
@@ -94,6 +172,74 @@ class WorkflowEngine:
                 'context': self.context
             }
         
+        if self.journal:
+            run_id = run_id or self.journal.new_run_id()
+            self.journal.start_run(run_id, workflow.to_dict())
+        
+        return self._execute_run(workflow, run_id)
+    
+    def resume(self, run_id: str) -> Dict[str, Any]:
+        """
+        恢复中断的运行
+        
+        从运行日志读取工作流定义和已完成的步骤结果，已完成的步骤不再执行，
+        其余步骤（包括失败的步骤及依赖它们的步骤）按依赖关系继续执行
+        
+        Args:
+            run_id: 运行ID
+            
+        Returns:
+            执行结果字典
+        """
+        if not self.journal:
+            return {
+                'success': False,
+                'error': "未配置运行日志，无法恢复运行"
+            }
+        
+        state = self.journal.load_run(run_id)
+        if state is None:
+            return {
+                'success': False,
+                'error': f"运行 {run_id} 不存在"
+            }
+        
+        workflow = WorkflowDefinition.from_dict(state['workflow'])
+        completed: Dict[int, Dict[str, Any]] = {}
+        for index, (step_name, result) in state['completed'].items():
+            if index >= len(workflow.steps) or self._get_step_name(workflow.steps[index], index) != step_name:
+                return {
+                    'success': False,
+                    'error': f"运行 {run_id} 的日志与工作流定义不一致（步骤 {step_name}）"
+                }
+            completed[index] = result
+        
+        # 依赖了未完成步骤的已完成步骤（上次运行时其输入不完整）需要重新执行
+        dependencies = self._build_dependency_graph(workflow)
+        for index in sorted(completed):
+            if not dependencies[index] <= completed.keys():
+                del completed[index]
+        
+        logger.info(f"恢复运行 {run_id}：跳过 {len(completed)}/{len(workflow.steps)} 个已完成步骤")
+        return self._execute_run(workflow, run_id, completed)
+    
+    def _execute_run(
+        self,
+        workflow: WorkflowDefinition,
+        run_id: Optional[str],
+        completed: Optional[Dict[int, Dict[str, Any]]] = None
+    ) -> Dict[str, Any]:
+        """
+        执行一次运行（新运行或恢复的运行）
+        
+        Args:
+            workflow: 工作流定义
+            run_id: 运行ID（未启用运行日志时为None）
+            completed: 已完成步骤的结果（步骤索引 -> 结果）
+            
+        Returns:
+            执行结果字典
+        """
         # 初始化上下文
         self.context = WorkflowContext()
         self.context.start_time = datetime.now()
@@ -101,44 +247,8 @@ class WorkflowEngine:
         logger.info(f"开始执行工作流: {workflow.name}")
         
         try:
-            # 执行步骤
-            for i, step in enumerate(workflow.steps):
-                step_name = step.get('output', f'step_{i+1}')
-                
-                # 检查执行条件
-                if 'condition' in step:
-                    if not self._evaluate_condition(step['condition']):
-                        logger.info(f"步骤 {step_name} 条件不满足，跳过")
-                        continue
-                
-                # 执行步骤
-                result = self._execute_step(step, step_name)
-                
-                if not result['success']:
-                    # 检查是否需要重试
-                    retry_count = step.get('retry', 0)
-                    if retry_count > 0:
-                        logger.warning(f"步骤 {step_name} 执行失败，尝试重试（剩余 {retry_count} 次）")
-                        for retry in range(retry_count):
-                            time.sleep(1)  # 等待1秒后重试
-                            result = self._execute_step(step, step_name)
-                            if result['success']:
-                                break
-                    
-                    if not result['success']:
-                        # 如果步骤失败且没有重试成功，记录错误
-                        self.context.add_error(step_name, result.get('error', '未知错误'))
-                        
-                        # 检查是否应该继续执行（可以根据配置决定）
-                        # 这里默认继续执行，但记录错误
-                        logger.warning(f"步骤 {step_name} 执行失败: {result.get('error')}")
-                
-                # 保存步骤结果
-                self.context.set_step_result(step_name, result)
-                
-                # 将输出保存到上下文变量
-                if 'output' in step and result['success']:
-                    self.context.set_variable(step['output'], result.get('data'))
+            # 按依赖关系调度步骤，互不依赖的步骤并行执行
+            self._run_steps(workflow, run_id, completed)
             
             self.context.end_time = datetime.now()
             
@@ -147,7 +257,7 @@ class WorkflowEngine:
             
             logger.info(f"工作流执行完成: {workflow.name}，耗时 {duration:.2f} 秒")
             
-            return {
+            result = {
                 'success': len(self.context.errors) == 0,
                 'workflow_name': workflow.name,
                 'duration': duration,
@@ -164,7 +274,7 @@ class WorkflowEngine:
             logger.error(error_msg, exc_info=True)
             self.context.add_error('workflow', error_msg)
             
-            return {
+            result = {
                 'success': False,
                 'error': error_msg,
                 'context': {
@@ -173,25 +283,484 @@ class WorkflowEngine:
                     'errors': self.context.errors
                 }
             }
+        
+        result['context']['spans'] = self.context.spans
+        if self.tracer:
+            self.tracer.record_run(
+                workflow.name, self.context.spans, run_id,
+                start=self.context.start_time.timestamp(),
+                end=self.context.end_time.timestamp(),
+                success=result['success']
+            )
+        
+        if self.journal and run_id:
+            result['run_id'] = run_id
+            # 失败的运行不标记结束，可修复后 resume()
+            if result['success']:
+                self.journal.finish_run(run_id, True)
+        
+        return result
+    
+    @staticmethod
+    def _get_step_name(step: Dict[str, Any], index: int) -> str:
+        """获取步骤名称（输出变量名，未指定时为 step_N）"""
+        return step.get('output', f'step_{index+1}')
+    
+    def _build_dependency_graph(self, workflow: WorkflowDefinition) -> List[Set[int]]:
+        """
+        构建步骤依赖图
+        
+        步骤的输入和条件中引用的 {{var}} / {{step.field}}，若由之前的某个步骤
+        输出（output），则依赖该步骤；也可用 depends_on 显式声明依赖的输出名。
+        引用的是工作流外部变量时不产生读后写依赖。
+        
+        为保持顺序执行的语义，输出同名变量的步骤还依赖该变量之前的写入者
+        （写后写）和自上次写入以来的读取者（读后写，包括读取外部变量的步骤）
+        
+        Args:
+            workflow: 工作流定义
+            
+        Returns:
+            每个步骤依赖的步骤索引集合
+        """
+        producers: Dict[str, int] = {}
+        # 变量名 -> 自上次写入以来读取它的步骤
+        readers: Dict[str, Set[int]] = {}
+        dependencies: List[Set[int]] = []
+        
+        for i, step in enumerate(workflow.steps):
+            referenced = set(workflow.get_compiled_input(i).references)
+            if self._is_loop_step(step):
+                # 循环变量是每项的局部变量，不是前序步骤的输出
+                referenced.discard(step.get('item_var', DEFAULT_LOOP_ITEM_VAR))
+                referenced |= self._collect_references(step['foreach'])
+            if 'condition' in step:
+                referenced |= self._get_condition_references(step['condition'])
+            referenced.update(step.get('depends_on', []))
+            
+            # 依赖最近一个产出该变量的前序步骤
+            step_deps = {producers[name] for name in referenced if name in producers}
+            
+            # 覆盖同名输出：等之前的写入者和读取者都完成
+            output_name = self._get_step_name(step, i)
+            if output_name in producers:
+                step_deps.add(producers[output_name])
+            step_deps |= readers.get(output_name, set())
+            step_deps.discard(i)
+            dependencies.append(step_deps)
+            
+            for name in referenced:
+                readers.setdefault(name, set()).add(i)
+            producers[output_name] = i
+            readers[output_name] = set()
+        
+        return dependencies
+    
+    @staticmethod
+    def _get_condition_references(condition: str) -> Set[str]:
+        """获取条件表达式引用的变量根名称（语法错误时按模板变量提取）"""
+        if not isinstance(condition, str):
+            return set()
+        try:
+            return set(compile_condition(condition).references)
+        except ConditionSyntaxError:
+            return {match.strip().split('.', 1)[0] for match in TEMPLATE_PATTERN.findall(condition)}
+    
+    def _collect_references(self, data: Any) -> Set[str]:
+        """收集数据中模板变量引用的根变量名"""
+        if isinstance(data, dict):
+            names: Set[str] = set()
+            for value in data.values():
+                names |= self._collect_references(value)
+            return names
+        elif isinstance(data, list):
+            names = set()
+            for item in data:
+                names |= self._collect_references(item)
+            return names
+        elif isinstance(data, str):
+            return {match.strip().split('.', 1)[0] for match in TEMPLATE_PATTERN.findall(data)}
+        return set()
+    
+    def _run_steps(
+        self,
+        workflow: WorkflowDefinition,
+        run_id: Optional[str] = None,
+        completed: Optional[Dict[int, Dict[str, Any]]] = None
+    ):
+        """
+        按依赖图调度执行步骤
+        
+        输入在调度线程中解析（此时依赖均已完成），能力调用在线程池中执行，
+        结果回到调度线程写入上下文，因此上下文只被单线程修改。
+        
+        超时：从尝试实际开始执行时计时（不含排队时间），到期后判定失败；设置了超时的
+        尝试在独立线程中运行，超时后放弃等待（线程无法强制终止，其迟到的结果会被丢弃），
+        线程池线程和占用的能力名额随即释放；重试：按带抖动的指数退避排入延迟队列，
+        等待期间调度线程继续执行其他就绪步骤
+        
+        恢复运行时，completed 中的步骤直接写入上下文并视为已完成，不再调度
+        
+        Args:
+            workflow: 工作流定义
+            run_id: 运行ID（启用运行日志时每个成功步骤写入日志）
+            completed: 已完成步骤的结果（步骤索引 -> 结果）
+        """
+        steps = workflow.steps
+        completed = completed or {}
+        dependencies = self._build_dependency_graph(workflow)
+        dependents: Dict[int, List[int]] = {i: [] for i in range(len(steps))}
+        for i, deps in enumerate(dependencies):
+            for dep in deps:
+                dependents[dep].append(i)
+        
+        remaining = [set(deps) for deps in dependencies]
+        ready = [i for i, deps in enumerate(remaining) if not deps and i not in completed]
+        attempts = [0] * len(steps)
+        resolved_inputs: Dict[int, Dict[str, Any]] = {}
+        # 运行中的尝试：future -> (步骤索引, 提交时间)
+        running: Dict[Future, Tuple[int, float]] = {}
+        # 等待重试的步骤：(可重试时间, 步骤索引)
+        delayed: List[Tuple[float, int]] = []
+        
+        def complete(index: int):
+            for dependent in dependents[index]:
+                remaining[dependent].discard(index)
+                if not remaining[dependent] and dependent not in completed:
+                    ready.append(dependent)
+            ready.sort()
+        
+        def dispatch(index: int):
+            step = steps[index]
+            attempts[index] += 1
+            runner = self._execute_loop_step if self._is_loop_step(step) else self._execute_step
+            submitted_at = time.time()
+            future = pool.submit(
+                self._run_attempt, runner, step.get('timeout'),
+                step, self._get_step_name(step, index), resolved_inputs[index]
+            )
+            running[future] = (index, submitted_at)
+        
+        def finish(index: int, result: Dict[str, Any]):
+            step = steps[index]
+            step_name = self._get_step_name(step, index)
+            retry_count = step.get('retry', 0)
+            
+            if not result['success'] and attempts[index] <= retry_count:
+                delay = self._compute_retry_delay(step, attempts[index])
+                logger.warning(
+                    f"步骤 {step_name} 执行失败: {result.get('error')}，"
+                    f"{delay:.2f} 秒后重试（第 {attempts[index]}/{retry_count} 次）"
+                )
+                heapq.heappush(delayed, (time.monotonic() + delay, index))
+                return
+            
+            self._record_step_result(step, step_name, result)
+            if self.journal and run_id and result['success']:
+                self.journal.record_step(run_id, index, step_name, result)
+            complete(index)
+        
+        for index in sorted(completed):
+            self._record_step_result(steps[index], self._get_step_name(steps[index], index), completed[index])
+            complete(index)
+        
+        pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='workflow-step')
+        try:
+            while ready or running or delayed:
+                while ready:
+                    index = ready.pop(0)
+                    step = steps[index]
+                    step_name = self._get_step_name(step, index)
+                    
+                    # 检查执行条件
+                    if 'condition' in step and not self._evaluate_condition(step['condition']):
+                        logger.info(f"步骤 {step_name} 条件不满足，跳过")
+                        complete(index)
+                        continue
+                    
+                    try:
+                        resolved_inputs[index] = self._resolve_step_input(workflow, index)
+                    except ValueError as e:
+                        self._record_step_result(step, step_name, {'success': False, 'error': str(e)})
+                        complete(index)
+                        continue
+                    dispatch(index)
+                
+                now = time.monotonic()
+                while delayed and delayed[0][0] <= now:
+                    dispatch(heapq.heappop(delayed)[1])
+                
+                # 等到有步骤完成或重试到点为止
+                wait_timeout = max(0.0, delayed[0][0] - now) if delayed else None
+                
+                if running:
+                    done, _ = wait(list(running), timeout=wait_timeout, return_when=FIRST_COMPLETED)
+                else:
+                    time.sleep(wait_timeout or 0)
+                    done = set()
+                
+                for future in done:
+                    index, submitted_at = running.pop(future)
+                    result, timing = future.result()
+                    self._record_span(
+                        steps[index], index, attempts[index], submitted_at, timing,
+                        resolved_inputs[index], result
+                    )
+                    finish(index, result)
+        finally:
+            pool.shutdown(wait=False, cancel_futures=True)
+    
+    @staticmethod
+    def _run_attempt(
+        runner: Callable,
+        timeout: Optional[float],
+        step: Dict[str, Any],
+        step_name: str,
+        step_input: Any
+    ) -> Tuple[Dict[str, Any], Tuple[float, float, int]]:
+        """
+        在工作线程中执行一次步骤尝试，返回 (结果, (开始时间, 结束时间, 线程ID))
+        
+        设置了超时时，在独立线程中运行并从此刻开始计时；到期后放弃该尝试
+        （释放其能力名额），工作线程返回超时结果，不再被挂起的调用占用
+        """
+        started = time.time()
+        if not timeout:
+            result = runner(step, step_name, step_input)
+            return result, (started, time.time(), threading.get_ident())
+        
+        attempt = _StepAttempt()
+        outcome: Dict[str, Any] = {}
+        
+        def target():
+            _current_attempt.set(attempt)
+            try:
+                outcome['result'] = runner(step, step_name, step_input)
+            except BaseException as e:
+                outcome['exception'] = e
+        
+        thread = threading.Thread(target=target, name='workflow-step-attempt', daemon=True)
+        thread.start()
+        thread.join(timeout)
+        
+        if thread.is_alive():
+            attempt.abandon()
+            logger.error(f"步骤 {step_name} 执行超时（{timeout} 秒），放弃等待")
+            result = {
+                'success': False,
+                'error': f"步骤执行超时（{timeout} 秒）"
+            }
+            return result, (started, time.time(), thread.ident)
+        
+        if 'exception' in outcome:
+            raise outcome['exception']
+        return outcome['result'], (started, time.time(), thread.ident)
+    
+    def _record_span(
+        self,
+        step: Dict[str, Any],
+        index: int,
+        attempt: int,
+        submitted_at: float,
+        timing: Tuple[float, float, int],
+        resolved_input: Any,
+        result: Dict[str, Any]
+    ):
+        """
+        记录一次步骤尝试的 span
+        
+        超时被放弃的尝试，结束时间为放弃等待的时间
+        """
+        started, ended, thread = timing
+        queue_wait = started - submitted_at
+        
+        self.context.spans.append({
+            'step': self._get_step_name(step, index),
+            'capability': step.get('capability'),
+            'action': step.get('action'),
+            'attempt': attempt,
+            'start': started,
+            'end': ended,
+            'queue_wait': queue_wait,
+            'thread': thread,
+            'success': result.get('success', False),
+            'error': result.get('error'),
+            'cached': result.get('cached', False),
+            'input_bytes': self._payload_size(resolved_input),
+            'output_bytes': self._payload_size(result.get('data'))
+        })
+    
+    @staticmethod
+    def _payload_size(payload: Any) -> int:
+        """估算载荷大小（JSON 序列化后的字节数）"""
+        if payload is None:
+            return 0
+        try:
+            return len(json.dumps(payload, ensure_ascii=False, default=str).encode('utf-8'))
+        except (TypeError, ValueError):
+            return 0
+    
+    @staticmethod
+    def _is_loop_step(step: Dict[str, Any]) -> bool:
+        """是否为循环（foreach）步骤"""
+        return 'foreach' in step or step.get('type') == StepType.LOOP.value
+    
+    def _resolve_step_input(self, workflow: WorkflowDefinition, index: int) -> Any:
+        """
+        解析步骤输入
+        
+        普通步骤返回输入字典；循环步骤按 foreach 列表逐项解析，返回每项的输入列表
+        （循环变量 item_var 只在该项的输入中可见）
+        
+        Raises:
+            ValueError: 循环步骤的 foreach 不是列表
+        """
+        step = workflow.steps[index]
+        compiled_input = workflow.get_compiled_input(index)
+        if not self._is_loop_step(step):
+            return compiled_input.resolve(self._lookup_variable)
+        
+        items = compile_template(step.get('foreach')).resolve(self._lookup_variable)
+        if not isinstance(items, (list, tuple)):
+            raise ValueError(f"foreach 的值不是列表: {step.get('foreach')}")
+        
+        item_var = step.get('item_var', DEFAULT_LOOP_ITEM_VAR)
+        item_inputs = []
+        for item in items:
+            def lookup(parts, var_path, item=item):
+                if parts[0] == item_var:
+                    return item if len(parts) == 1 else self._get_nested_parts(item, parts[1:])
+                return self._lookup_variable(parts, var_path)
+            item_inputs.append(compiled_input.resolve(lookup))
+        return item_inputs
     
-    def _execute_step(self, step: Dict[str, Any], step_name: str) -> Dict[str, Any]:
+    def _execute_loop_step(
+        self,
+        step: Dict[str, Any],
+        step_name: str,
+        item_inputs: List[Dict[str, Any]]
+    ) -> Dict[str, Any]:
+        """
+        执行循环步骤
+        
+        对每项输入调用能力，最多 max_concurrency 项并发，结果按输入顺序收集。
+        单项失败的处理由 on_item_error 决定：
+        - fail：取消尚未开始的项，步骤失败（默认）
+        - continue：执行所有项，失败项的结果为 None，步骤成功
+        - skip：执行所有项，结果中去掉失败项，步骤成功
+        
+        Args:
+            step: 步骤定义
+            step_name: 步骤名称
+            item_inputs: 每项已解析的输入
+            
+        Returns:
+            执行结果（data 为结果列表，errors 为失败项列表）
+        """
+        policy = step.get('on_item_error', 'fail')
+        max_concurrency = max(1, step.get('max_concurrency') or self.max_workers)
+        item_results: List[Any] = [None] * len(item_inputs)
+        errors: List[Dict[str, Any]] = []
+        
+        with ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix='workflow-loop') as pool:
+            futures = {
+                pool.submit(copy_context().run, self._execute_step, step, f"{step_name}[{i}]", item_input): i
+                for i, item_input in enumerate(item_inputs)
+            }
+            for future in as_completed(futures):
+                i = futures[future]
+                result = future.result()
+                if result.get('success'):
+                    item_results[i] = result.get('data')
+                    continue
+                
+                errors.append({'index': i, 'error': result.get('error')})
+                if policy == 'fail':
+                    for pending in futures:
+                        pending.cancel()
+                    break
+        
+        errors.sort(key=lambda error: error['index'])
+        failed = {error['index'] for error in errors}
+        if policy == 'skip':
+            item_results = [r for i, r in enumerate(item_results) if i not in failed]
+        
+        result = {
+            'success': policy != 'fail' or not errors,
+            'data': item_results,
+            'errors': errors,
+            'metadata': {
+                'total': len(item_inputs),
+                'failed': len(errors)
+            }
+        }
+        if errors and policy == 'fail':
+            result['error'] = f"第 {errors[0]['index']} 项执行失败: {errors[0]['error']}"
+        elif errors:
+            logger.warning(f"步骤 {step_name}：{len(errors)}/{len(item_inputs)} 项执行失败（{policy}）")
+        
+        return result
+    
+    @staticmethod
+    def _compute_retry_delay(step: Dict[str, Any], attempt: int) -> float:
+        """
+        计算重试延迟（带抖动的指数退避）
+        
+        第 n 次重试的退避上限为 retry_delay * 2^(n-1)（不超过 retry_max_delay），
+        实际延迟在上限的一半到上限之间随机取值，避免多个步骤同时重试
+        
+        Args:
+            step: 步骤定义
+            attempt: 已执行的尝试次数
+            
+        Returns:
+            延迟秒数
+        """
+        base = step.get('retry_delay', DEFAULT_RETRY_DELAY)
+        cap = step.get('retry_max_delay', DEFAULT_RETRY_MAX_DELAY)
+        backoff = min(cap, base * (2 ** (attempt - 1)))
+        return backoff / 2 + random.uniform(0, backoff / 2)
+    
+    def _record_step_result(self, step: Dict[str, Any], step_name: str, result: Dict[str, Any]):
+        """记录步骤结果并将输出写入上下文变量"""
+        if not result['success']:
+            # 如果步骤失败且没有重试成功，记录错误
+            self.context.add_error(step_name, result.get('error', '未知错误'))
+            
+            # 检查是否应该继续执行（可以根据配置决定）
+            # 这里默认继续执行，但记录错误
+            logger.warning(f"步骤 {step_name} 执行失败: {result.get('error')}")
+        
+        # 保存步骤结果
+        self.context.set_step_result(step_name, result)
+        
+        # 将输出保存到上下文变量
+        if 'output' in step and result['success']:
+            self.context.set_variable(step['output'], result.get('data'))
+    
+    def _execute_step(
+        self,
+        step: Dict[str, Any],
+        step_name: str,
+        resolved_input: Dict[str, Any]
+    ) -> Dict[str, Any]:
         """
         执行单个步骤
         
+        步骤声明了 cache 且注入了缓存管理器时，先按（能力、动作、能力版本、已解析输入）
+        查缓存，命中则跳过执行；只缓存成功的结果，缓存读写失败不影响步骤执行。
+        写入和命中时都深拷贝结果，后续步骤修改结果不会影响缓存中的值
+        
         Args:
             step: 步骤定义
             step_name: 步骤名称
+            resolved_input: 已解析模板变量的输入数据
             
         Returns:
             执行结果
         """
         capability_id = step.get('capability')
         action = step.get('action')
-        input_data = step.get('input', {})
-        timeout = step.get('timeout')
-        
-        # 解析输入数据中的模板变量
-        resolved_input = self._resolve_template_variables(input_data)
         
         # 获取能力实例
         capability = self.capability_registry.get(capability_id)
@@ -201,52 +770,166 @@ class WorkflowEngine:
                 'error': f"能力 {capability_id} 未注册"
             }
         
-        # 执行能力
+        cache_manager = self._cache_manager
+        cache_options = self._get_step_cache_options(step)
+        if cache_options is None or cache_manager is None:
+            return self._invoke_capability(capability, capability_id, action, resolved_input)
+        
+        strategy_name = cache_options.get('strategy', 'default')
+        cache_key = self._build_step_cache_key(capability, capability_id, action, resolved_input)
+        
         try:
-            # 如果能力有execute方法，直接调用
-            if hasattr(capability, 'execute'):
-                if timeout:
-                    # 简单的超时处理（实际应该使用threading或asyncio）
-                    result = capability.execute(resolved_input)
-                else:
+            cached = cache_manager.get(cache_key, strategy_name)
+        except Exception as e:
+            # 缓存读取失败按未命中处理
+            logger.warning(f"步骤 {step_name} 结果缓存读取失败: {e}")
+            cached = None
+        if cached is not None:
+            logger.debug(f"步骤 {step_name} 命中结果缓存")
+            result = copy.deepcopy(cached)
+            result['cached'] = True
+            return result
+        
+        result = self._invoke_capability(capability, capability_id, action, resolved_input)
+        if result.get('success'):
+            try:
+                cache_manager.set(
+                    cache_key,
+                    copy.deepcopy(result),
+                    ttl=cache_options.get('ttl'),
+                    strategy_name=strategy_name,
+                    tags=[STEP_CACHE_PREFIX + capability_id] + list(cache_options.get('tags', []))
+                )
+            except Exception as e:
+                # 缓存写入失败不影响步骤结果
+                logger.warning(f"步骤 {step_name} 结果缓存写入失败: {e}")
+        
+        return result
+    
+    @staticmethod
+    def _get_step_cache_options(step: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """
+        获取步骤的缓存配置
+        
+        cache: true 使用默认策略和 TTL；cache: {ttl, strategy, tags} 指定细节；
+        未声明或为 false 时不缓存（返回 None）
+        """
+        options = step.get('cache')
+        if not options:
+            return None
+        if options is True:
+            return {}
+        return options
+    
+    @staticmethod
+    def _build_step_cache_key(
+        capability: Any,
+        capability_id: str,
+        action: str,
+        resolved_input: Dict[str, Any]
+    ) -> str:
+        """
+        构建步骤结果缓存键
+        
+        能力版本参与哈希，能力升级后旧结果自然失效
+        """
+        payload = json.dumps(
+            {
+                'action': action,
+                'version': getattr(capability, 'version', None),
+                'input': resolved_input
+            },
+            sort_keys=True,
+            ensure_ascii=False,
+            default=str
+        )
+        digest = hashlib.sha256(payload.encode('utf-8')).hexdigest()
+        return f"{STEP_CACHE_PREFIX}{capability_id}:{digest}"
+    
+    @contextmanager
+    def _capability_slot(self, capability_id: str):
+        """占用能力调用名额（未配置并发限额时不限制；所在尝试超时被放弃时提前释放）"""
+        if self.capability_limiter is None:
+            yield
+            return
+        
+        with self.capability_limiter.acquire(capability_id) as lease:
+            attempt = _current_attempt.get()
+            if attempt is not None and lease is not None:
+                attempt.hold(lease)
+            yield
+    
+    def _invoke_capability(
+        self,
+        capability: Any,
+        capability_id: str,
+        action: str,
+        resolved_input: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        """
+        调用能力并将结果统一为字典
+        
+        Args:
+            capability: 能力实例
+            capability_id: 能力ID
+            action: 动作名称
+            resolved_input: 已解析模板变量的输入数据
+            
+        Returns:
+            执行结果
+        """
+        # 所在尝试已超时被放弃（如循环步骤的剩余项），不再调用
+        attempt = _current_attempt.get()
+        if attempt is not None and attempt.abandoned:
+            return {
+                'success': False,
+                'error': "步骤执行超时，已放弃"
+            }
+        
+        # 执行能力（配置了并发限额时先占用该能力的名额）
+        with self._capability_slot(capability_id):
+            try:
+                # 如果能力有execute方法，直接调用
+                if hasattr(capability, 'execute'):
                     result = capability.execute(resolved_input)
-                
-                # 如果结果是CapabilityResult对象，转换为字典
-                if hasattr(result, 'to_dict'):
-                    return result.to_dict()
-                elif isinstance(result, dict):
-                    return result
-                else:
+                    
+                    # 如果结果是CapabilityResult对象，转换为字典
+                    if hasattr(result, 'to_dict'):
+                        return result.to_dict()
+                    elif isinstance(result, dict):
+                        return result
+                    else:
+                        return {
+                            'success': True,
+                            'data': result
+                        }
+                # 如果能力有action方法，调用action
+                elif hasattr(capability, action):
+                    method = getattr(capability, action)
+                    result = method(**resolved_input)
+                    
                     return {
                         'success': True,
                         'data': result
                     }
-            # 如果能力有action方法，调用action
-            elif hasattr(capability, action):
-                method = getattr(capability, action)
-                result = method(**resolved_input)
-                
-                return {
-                    'success': True,
-                    'data': result
-                }
-            else:
+                else:
+                    return {
+                        'success': False,
+                        'error': f"能力 {capability_id} 不支持动作 {action}"
+                    }
+                    
+            except Exception as e:
                 return {
                     'success': False,
-                    'error': f"能力 {capability_id} 不支持动作 {action}"
+                    'error': f"执行异常: {str(e)}"
                 }
-                
-        except Exception as e:
-            return {
-                'success': False,
-                'error': f"执行异常: {str(e)}"
-            }
     
     def _resolve_template_variables(self, data: Any) -> Any:
         """
         解析模板变量
         
-        支持格式：{{variable_name}} 或 {{step_name.field_name}}
+        支持格式：{{variable_name}} 或 {{step_name.field_name}}。
+        工作流步骤输入在加载时已编译，此方法用于临时数据
         
         Args:
             data: 包含模板变量的数据
@@ -254,33 +937,7 @@ class WorkflowEngine:
         Returns:
             解析后的数据
         """
-        if isinstance(data, dict):
-            return {k: self._resolve_template_variables(v) for k, v in data.items()}
-        elif isinstance(data, list):
-            return [self._resolve_template_variables(item) for item in data]
-        elif isinstance(data, str):
-            # 匹配 {{variable}} 格式
-            pattern = r'\{\{([^}]+)\}\}'
-            matches = re.findall(pattern, data)
-            
-            if not matches:
-                return data
-            
-            resolved = data
-            for match in matches:
-                var_path = match.strip()
-                value = self._get_variable_value(var_path)
-                
-                if value is not None:
-                    # 替换变量
-                    resolved = resolved.replace(f'{{{{{var_path}}}}}', str(value))
-                else:
-                    # 变量不存在，保持原样或抛出错误
-                    logger.warning(f"模板变量 {var_path} 不存在")
-            
-            return resolved
-        else:
-            return data
+        return compile_template(data).resolve(self._lookup_variable)
     
     def _get_variable_value(self, var_path: str) -> Any:
         """
@@ -294,16 +951,25 @@ class WorkflowEngine:
         Returns:
             变量值
         """
-        # 检查是否是步骤结果路径
-        if '.' in var_path:
-            parts = var_path.split('.', 1)
-            step_name = parts[0]
-            field_path = parts[1]
+        return self._lookup_variable(tuple(var_path.split('.')), var_path)
+    
+    def _lookup_variable(self, parts: tuple, var_path: str) -> Any:
+        """
+        按预先拆分的路径获取变量值
+        
+        Args:
+            parts: 拆分后的路径（step_name, field, ...）
+            var_path: 原始变量路径
             
-            step_result = self.context.get_step_result(step_name)
+        Returns:
+            变量值
+        """
+        # 检查是否是步骤结果路径
+        if len(parts) > 1:
+            step_result = self.context.get_step_result(parts[0])
             if step_result and isinstance(step_result, dict):
                 # 递归获取字段值
-                return self._get_nested_value(step_result.get('data', {}), field_path)
+                return self._get_nested_parts(step_result.get('data', {}), parts[1:])
         
         # 直接变量
         return self.context.get_variable(var_path)
@@ -319,7 +985,11 @@ class WorkflowEngine:
         Returns:
             字段值
         """
-        parts = path.split('.')
+        return self._get_nested_parts(data, path.split('.'))
+    
+    @staticmethod
+    def _get_nested_parts(data: Any, parts) -> Any:
+        """按拆分后的字段路径获取嵌套值"""
         value = data
         
         for part in parts:
@@ -339,20 +1009,25 @@ class WorkflowEngine:
         """
         评估执行条件
         
-        支持简单的条件表达式，如：{{variable}} == "value"
+        条件为表达式（见 condition_expression），如：
+        len({{fault_ids}}) > 0 and {{ticket_info.status}} != "closed"；
+        单独的 {{variable}} 按真值判断（null、false、0、空字符串/列表/字典为不满足）。
+        表达式首次使用时编译并缓存
         
         Args:
             condition: 条件表达式
             
         Returns:
-            条件是否满足
+            条件是否满足（语法错误或求值出错时为不满足）
         """
-        # 简单的条件评估（实际应该使用更强大的表达式引擎）
-        # 这里只支持简单的变量检查
-        if condition.startswith('{{') and condition.endswith('}}'):
-            var_path = condition[2:-2].strip()
-            value = self._get_variable_value(var_path)
-            return value is not None and value != False
+        if not isinstance(condition, str):
+            # 模板实例化时已替换为具体值（如布尔参数）
+            return bool(condition)
+        
+        try:
+            compiled = compile_condition(condition)
+        except ConditionSyntaxError as e:
+            logger.error(str(e))
+            return False
         
-        # 其他条件表达式可以在这里扩展
-        return True
+        return compiled.evaluate(self._lookup_variable)
@@ -0,0 +1,167 @@
+# -*- coding: utf-8 -*-
+"""
+工作流运行日志
+
+以追加写 JSONL 记录每次运行的工作流定义和已成功完成的步骤结果，
+进程崩溃或重新部署后可据此恢复运行、跳过已完成的步骤
+"""
+
+import json
+import logging
+import os
+import threading
+import uuid
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class WorkflowJournal:
+    """
+    工作流运行日志（每次运行一个 <run_id>.jsonl 文件）
+    
+    记录类型：
+    - run_started：运行开始，包含工作流定义
+    - step_completed：步骤成功完成，包含步骤索引、名称和结果
+    - run_finished：运行结束
+    
+    每条记录写入后立即 fsync；崩溃时写了一半的最后一行在读取时被忽略，
+    恢复运行后追加的记录从新的一行开始
+    """
+    
+    def __init__(self, journal_dir: Optional[Path] = None):
+        """
+        初始化运行日志
+        
+        Args:
+            journal_dir: 日志目录（默认 work/workflow_runs）
+        """
+        self.journal_dir = Path(journal_dir or "work/workflow_runs")
+        self.journal_dir.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        # 本进程已检查过末尾换行的运行
+        self._checked_runs: set = set()
+    
+    @staticmethod
+    def new_run_id() -> str:
+        """生成运行ID（时间戳 + 随机后缀，按时间排序）"""
+        return f"{datetime.now().strftime('%Y%m%d_%H%M%S')}_{uuid.uuid4().hex[:8]}"
+    
+    def _get_run_file(self, run_id: str) -> Path:
+        """获取运行日志文件路径"""
+        return self.journal_dir / f"{run_id}.jsonl"
+    
+    def _append(self, run_id: str, record: Dict[str, Any]):
+        """追加一条记录并落盘"""
+        record['timestamp'] = datetime.now().isoformat()
+        line = json.dumps(record, ensure_ascii=False, default=str) + '\n'
+        
+        with self._lock:
+            run_file = self._get_run_file(run_id)
+            if run_id not in self._checked_runs:
+                # 上次崩溃留下的半行没有换行符，先补上，避免新记录接在半行后面
+                if not self._ends_with_newline(run_file):
+                    line = '\n' + line
+                self._checked_runs.add(run_id)
+            with open(run_file, 'a', encoding='utf-8') as f:
+                f.write(line)
+                f.flush()
+                os.fsync(f.fileno())
+    
+    @staticmethod
+    def _ends_with_newline(run_file: Path) -> bool:
+        """日志文件是否为空或以换行符结尾"""
+        try:
+            with open(run_file, 'rb') as f:
+                f.seek(0, os.SEEK_END)
+                if f.tell() == 0:
+                    return True
+                f.seek(-1, os.SEEK_END)
+                return f.read(1) == b'\n'
+        except FileNotFoundError:
+            return True
+    
+    def start_run(self, run_id: str, workflow: Dict[str, Any]):
+        """
+        记录运行开始
+        
+        Args:
+            run_id: 运行ID
+            workflow: 工作流定义字典（WorkflowDefinition.to_dict()）
+        """
+        self._append(run_id, {'event': 'run_started', 'workflow': workflow})
+    
+    def record_step(self, run_id: str, index: int, step_name: str, result: Dict[str, Any]):
+        """
+        记录步骤完成
+        
+        结果按 JSON 序列化，无法序列化的值以 str() 形式保存
+        
+        Args:
+            run_id: 运行ID
+            index: 步骤索引
+            step_name: 步骤名称
+            result: 步骤结果
+        """
+        self._append(run_id, {
+            'event': 'step_completed',
+            'index': index,
+            'step': step_name,
+            'result': result
+        })
+    
+    def finish_run(self, run_id: str, success: bool):
+        """
+        记录运行结束
+        
+        Args:
+            run_id: 运行ID
+            success: 是否成功
+        """
+        self._append(run_id, {'event': 'run_finished', 'success': success})
+    
+    def load_run(self, run_id: str) -> Optional[Dict[str, Any]]:
+        """
+        读取运行记录
+        
+        Args:
+            run_id: 运行ID
+        
+        Returns:
+            {'workflow': 工作流定义字典, 'completed': {步骤索引: (步骤名称, 结果)},
+             'finished': 是否已结束}，运行不存在时返回None
+        """
+        run_file = self._get_run_file(run_id)
+        if not run_file.exists():
+            return None
+        
+        workflow = None
+        completed: Dict[int, tuple] = {}
+        finished = False
+        
+        with open(run_file, 'r', encoding='utf-8') as f:
+            for line_no, line in enumerate(f, 1):
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    logger.warning(f"运行日志 {run_id} 第 {line_no} 行不完整，已忽略")
+                    continue
+                
+                event = record.get('event')
+                if event == 'run_started':
+                    workflow = record['workflow']
+                elif event == 'step_completed':
+                    completed[record['index']] = (record['step'], record['result'])
+                elif event == 'run_finished':
+                    finished = True
+        
+        if workflow is None:
+            return None
+        
+        return {'workflow': workflow, 'completed': completed, 'finished': finished}
+    
+    def list_runs(self) -> List[str]:
+        """列出所有运行ID（按时间排序）"""
+        return sorted(path.stem for path in self.journal_dir.glob('*.jsonl'))
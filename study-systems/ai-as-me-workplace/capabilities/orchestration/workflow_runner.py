@@ -0,0 +1,177 @@
+# -*- coding: utf-8 -*-
+"""
+多工作流并发运行器
+
+同时执行多个工作流（如一批新单号），每次运行使用独立的引擎和上下文，
+共享能力注册表、步骤结果缓存、运行日志和按能力的全局并发限额
+"""
+
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor, Future
+from typing import Dict, Any, Optional, List
+
+from ..cache.cache_manager import UnifiedCacheManager
+from .capability_limiter import CapabilityLimiter
+from .workflow_definition import WorkflowDefinition
+from .workflow_engine import WorkflowEngine
+from .workflow_journal import WorkflowJournal
+from .workflow_tracer import WorkflowTracer
+
+logger = logging.getLogger(__name__)
+
+
+class WorkflowRunner:
+    """多工作流并发运行器"""
+    
+    def __init__(
+        self,
+        capability_registry: Optional[Dict[str, Any]] = None,
+        max_concurrent_workflows: int = 4,
+        max_workers_per_workflow: int = 4,
+        capability_limits: Optional[Dict[str, int]] = None,
+        default_capability_limit: Optional[int] = None,
+        cache_manager: Optional[UnifiedCacheManager] = None,
+        journal: Optional[WorkflowJournal] = None,
+        tracer: Optional[WorkflowTracer] = None
+    ):
+        """
+        初始化运行器
+        
+        Args:
+            capability_registry: 能力注册表（所有运行共享，能力实例需可并发调用）
+            max_concurrent_workflows: 同时运行的工作流数，超出的排队等待
+            max_workers_per_workflow: 每个工作流内并行执行步骤的线程数
+            capability_limits: 能力ID -> 全局最大并发调用数（跨所有运行）
+            default_capability_limit: 未单独配置的能力的全局最大并发调用数（None 表示不限制）
+            cache_manager: 步骤结果缓存使用的缓存管理器（可选）
+            journal: 运行日志（可选）
+            tracer: 追踪器（可选，所有运行的步骤 span 汇总到同一时间线）
+        """
+        self.capability_registry = capability_registry or {}
+        self.max_workers_per_workflow = max_workers_per_workflow
+        self.capability_limiter = CapabilityLimiter(capability_limits, default_capability_limit)
+        self.cache_manager = cache_manager
+        self.journal = journal
+        self.tracer = tracer
+        
+        self._executor = ThreadPoolExecutor(
+            max_workers=max(1, max_concurrent_workflows),
+            thread_name_prefix='workflow-run'
+        )
+        self._active_runs = 0
+        self._completed_runs = 0
+        self._failed_runs = 0
+        self._lock = threading.Lock()
+    
+    def register_capability(self, capability_id: str, capability: Any):
+        """
+        注册能力（对之后提交的运行生效）
+        
+        Args:
+            capability_id: 能力ID
+            capability: 能力实例
+        """
+        self.capability_registry[capability_id] = capability
+    
+    def create_engine(self) -> WorkflowEngine:
+        """创建一个共享注册表、缓存、日志、并发限额和追踪器的引擎（每次运行一个）"""
+        return WorkflowEngine(
+            capability_registry=self.capability_registry,
+            max_workers=self.max_workers_per_workflow,
+            cache_manager=self.cache_manager,
+            journal=self.journal,
+            capability_limiter=self.capability_limiter,
+            tracer=self.tracer
+        )
+    
+    def submit(self, workflow: WorkflowDefinition, run_id: Optional[str] = None) -> Future:
+        """
+        提交工作流
+        
+        Args:
+            workflow: 工作流定义
+            run_id: 运行ID（可选，启用运行日志时使用）
+        
+        Returns:
+            Future，结果为 WorkflowEngine.execute() 的返回值
+        """
+        return self._executor.submit(self._run, lambda engine: engine.execute(workflow, run_id))
+    
+    def submit_resume(self, run_id: str) -> Future:
+        """
+        提交恢复中断的运行（需要配置运行日志）
+        
+        Args:
+            run_id: 运行ID
+        
+        Returns:
+            Future，结果为 WorkflowEngine.resume() 的返回值
+        """
+        return self._executor.submit(self._run, lambda engine: engine.resume(run_id))
+    
+    def run_all(self, workflows: List[WorkflowDefinition]) -> List[Dict[str, Any]]:
+        """
+        并发执行多个工作流并等待全部完成
+        
+        Args:
+            workflows: 工作流定义列表
+        
+        Returns:
+            执行结果列表（顺序与输入一致）
+        """
+        futures = [self.submit(workflow) for workflow in workflows]
+        return [future.result() for future in futures]
+    
+    def _run(self, execute) -> Dict[str, Any]:
+        """在独立引擎中执行一次运行并更新统计"""
+        with self._lock:
+            self._active_runs += 1
+        
+        try:
+            result = execute(self.create_engine())
+        except Exception as e:
+            logger.error(f"工作流运行异常: {e}", exc_info=True)
+            result = {
+                'success': False,
+                'error': f"工作流运行异常: {str(e)}"
+            }
+        
+        with self._lock:
+            self._active_runs -= 1
+            self._completed_runs += 1
+            if not result.get('success'):
+                self._failed_runs += 1
+        
+        return result
+    
+    def get_statistics(self) -> Dict[str, Any]:
+        """
+        获取运行统计
+        
+        Returns:
+            统计信息（运行数和各能力的名额占用）
+        """
+        with self._lock:
+            statistics = {
+                'active_runs': self._active_runs,
+                'completed_runs': self._completed_runs,
+                'failed_runs': self._failed_runs
+            }
+        statistics['capability_usage'] = self.capability_limiter.get_usage()
+        return statistics
+    
+    def shutdown(self, wait: bool = True):
+        """
+        关闭运行器
+        
+        Args:
+            wait: 是否等待已提交的运行完成
+        """
+        self._executor.shutdown(wait=wait)
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.shutdown()
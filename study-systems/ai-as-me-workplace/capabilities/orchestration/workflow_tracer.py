@@ -0,0 +1,171 @@
+# -*- coding: utf-8 -*-
+"""
+工作流追踪
+
+汇总各次运行的步骤 span（开始/结束时间、排队等待、重试次数、输入输出大小），
+导出为 Chrome trace-event JSON，可在 chrome://tracing 或 Perfetto 中按时间线查看
+"""
+
+import json
+import threading
+from pathlib import Path
+from typing import Dict, Any, Optional, List
+
+
+class WorkflowTracer:
+    """
+    工作流追踪器（线程安全，可在多个引擎间共享）
+    
+    每次运行对应 trace 中的一个进程，整次运行是 0 号线程上的一个完整事件（ph=X），
+    执行步骤的工作线程对应线程，每次步骤尝试对应一个完整事件，时间上嵌套在运行事件内
+    """
+    
+    def __init__(self):
+        """初始化追踪器"""
+        self._runs: List[Dict[str, Any]] = []
+        self._lock = threading.Lock()
+    
+    def record_run(
+        self,
+        workflow_name: str,
+        spans: List[Dict[str, Any]],
+        run_id: Optional[str] = None,
+        start: Optional[float] = None,
+        end: Optional[float] = None,
+        success: Optional[bool] = None
+    ):
+        """
+        记录一次运行的步骤 span
+        
+        Args:
+            workflow_name: 工作流名称
+            spans: 步骤 span 列表（WorkflowContext.spans）
+            run_id: 运行ID（可选）
+            start: 运行开始时间（时间戳，可选，未指定时取最早的 span 开始时间）
+            end: 运行结束时间（时间戳，可选，未指定时取最晚的 span 结束时间）
+            success: 运行是否成功（可选）
+        """
+        spans = list(spans)
+        starts = [span['start'] for span in spans] + ([start] if start is not None else [])
+        ends = [span['end'] for span in spans] + ([end] if end is not None else [])
+        with self._lock:
+            self._runs.append({
+                'workflow_name': workflow_name,
+                'run_id': run_id,
+                'start': min(starts) if starts else None,
+                'end': max(ends) if ends else None,
+                'success': success,
+                'spans': spans
+            })
+    
+    def clear(self):
+        """清空已记录的运行"""
+        with self._lock:
+            self._runs.clear()
+    
+    def get_step_summary(self) -> Dict[str, Dict[str, Any]]:
+        """
+        按步骤汇总耗时
+        
+        Returns:
+            步骤名称 -> {'count': 尝试次数, 'total_time': 总执行时间（秒）,
+                        'queue_wait': 总排队时间（秒）, 'failures': 失败次数}
+        """
+        summary: Dict[str, Dict[str, Any]] = {}
+        with self._lock:
+            runs = list(self._runs)
+        
+        for run in runs:
+            for span in run['spans']:
+                entry = summary.setdefault(span['step'], {
+                    'count': 0, 'total_time': 0.0, 'queue_wait': 0.0, 'failures': 0
+                })
+                entry['count'] += 1
+                entry['total_time'] += span['end'] - span['start']
+                entry['queue_wait'] += span.get('queue_wait') or 0.0
+                if not span['success']:
+                    entry['failures'] += 1
+        
+        return summary
+    
+    def build_trace_events(self) -> List[Dict[str, Any]]:
+        """
+        构建 Chrome trace 事件列表
+        
+        Returns:
+            trace 事件列表（时间单位为微秒）
+        """
+        with self._lock:
+            runs = list(self._runs)
+        
+        events: List[Dict[str, Any]] = []
+        for pid, run in enumerate(runs, 1):
+            label = run['workflow_name']
+            if run['run_id']:
+                label = f"{label} ({run['run_id']})"
+            events.append({
+                'name': 'process_name', 'ph': 'M', 'pid': pid, 'tid': 0,
+                'args': {'name': label}
+            })
+            if run['start'] is not None:
+                events.append({
+                    'name': run['workflow_name'],
+                    'cat': 'workflow',
+                    'ph': 'X',
+                    'ts': round(run['start'] * 1e6),
+                    'dur': max(0, round((run['end'] - run['start']) * 1e6)),
+                    'pid': pid,
+                    'tid': 0,
+                    'args': {
+                        'run_id': run['run_id'],
+                        'success': run['success'],
+                        'steps': len(run['spans'])
+                    }
+                })
+            
+            # 工作线程ID映射为从 1 开始的小整数，超时未返回的尝试放在 0 号线程
+            lanes: Dict[Any, int] = {}
+            for span in run['spans']:
+                thread = span.get('thread')
+                tid = lanes.setdefault(thread, len(lanes) + 1) if thread is not None else 0
+                events.append({
+                    'name': span['step'],
+                    'cat': span.get('capability') or 'step',
+                    'ph': 'X',
+                    'ts': round(span['start'] * 1e6),
+                    'dur': max(0, round((span['end'] - span['start']) * 1e6)),
+                    'pid': pid,
+                    'tid': tid,
+                    'args': {
+                        key: span.get(key)
+                        for key in (
+                            'action', 'attempt', 'queue_wait', 'input_bytes',
+                            'output_bytes', 'success', 'error', 'cached'
+                        )
+                    }
+                })
+        
+        return events
+    
+    def export_chrome_trace(self, output_file: Optional[Path] = None) -> Path:
+        """
+        导出 Chrome trace-event JSON
+        
+        Args:
+            output_file: 输出文件（默认 work/workflow_traces/workflow_trace.json）
+        
+        Returns:
+            输出文件路径
+        """
+        output_file = Path(output_file or "work/workflow_traces/workflow_trace.json")
+        output_file.parent.mkdir(parents=True, exist_ok=True)
+        
+        with open(output_file, 'w', encoding='utf-8') as f:
+            json.dump(
+                {'traceEvents': self.build_trace_events(), 'displayTimeUnit': 'ms'},
+                f,
+                ensure_ascii=False,
+                default=str
+            )
+        
+        return output_file
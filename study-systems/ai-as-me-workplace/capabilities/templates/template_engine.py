@@ -7,60 +7,162 @@
 
 import yaml
 import json
+import hashlib
 import logging
+import threading
+from collections import OrderedDict
 from typing import Dict, Any, Optional, List
 from pathlib import Path
 
+from ..orchestration.condition_expression import bind_parameters
+from ..orchestration.template_compiler import CompiledTemplate, compile_template
 from ..orchestration.workflow_definition import WorkflowDefinition
 from ..orchestration.workflow_engine import WorkflowEngine
 
 logger = logging.getLogger(__name__)
 
+# 模板文件后缀（同名时后者优先）
+TEMPLATE_SUFFIXES = ('.yaml', '.json')
+
+
+class _LoadedTemplate:
+    """已加载的模板（文件修改时间 + 模板数据 + 参数替换计划）"""
+    
+    def __init__(self, path: Path, mtime: float, data: Dict[str, Any]):
+        self.path = path
+        self.mtime = mtime
+        self.data = data
+        self.workflow_data = data.get('workflow') if isinstance(data, dict) else None
+        # 参数只替换传入的部分，其余 {{变量}} 留给工作流引擎运行时解析
+        self.plan: Optional[CompiledTemplate] = (
+            compile_template(self.workflow_data, warn_missing=False) if self.workflow_data else None
+        )
+
+
+def _bind_condition_parameters(
+    source: Dict[str, Any],
+    resolved: Dict[str, Any],
+    parameters: Dict[str, Any]
+):
+    """
+    步骤条件改为按表达式字面量代入参数
+    
+    参数替换计划按文本替换，字符串参数代入条件后会变成裸标识符（如 open == "open"），
+    因此条件从模板原文重新代入
+    
+    Args:
+        source: 模板中的工作流定义
+        resolved: 参数替换后的工作流定义（原地修改）
+        parameters: 参数字典
+    """
+    if not isinstance(source, dict) or not isinstance(resolved, dict):
+        return
+    source_steps = source.get('steps')
+    resolved_steps = resolved.get('steps')
+    if not isinstance(source_steps, list) or not isinstance(resolved_steps, list):
+        return
+    
+    for source_step, resolved_step in zip(source_steps, resolved_steps):
+        if not isinstance(source_step, dict) or not isinstance(resolved_step, dict):
+            continue
+        condition = source_step.get('condition')
+        if isinstance(condition, str):
+            resolved_step['condition'] = bind_parameters(condition, parameters)
+
 
 class TemplateEngine:
-    """模板引擎"""
+    """
+    模板引擎
     
-    def __init__(self, template_dir: Optional[Path] = None):
+    模板在首次使用时加载，之后按文件修改时间检查是否需要重新加载；
+    实例化结果按（模板、参数）缓存，每次返回缓存实例的独立副本（编译结果共享）
+    """
+    
+    def __init__(self, template_dir: Optional[Path] = None, instance_cache_size: int = 128):
         """
         初始化模板引擎
         
         Args:
             template_dir: 模板目录路径
+            instance_cache_size: 缓存的已实例化工作流数量（0 表示不缓存）
         """
         if template_dir is None:
             template_dir = Path(__file__).parent / "business_processes"
         
         self.template_dir = Path(template_dir)
-        self.templates: Dict[str, Dict[str, Any]] = {}
-        self._load_templates()
-    
-    def _load_templates(self):
-        """加载所有模板"""
+        self.instance_cache_size = instance_cache_size
+        self._loaded: Dict[str, _LoadedTemplate] = {}
+        # (模板名称, 模板修改时间, 参数哈希) -> 工作流定义，按最近使用排序
+        self._instances: 'OrderedDict[tuple, WorkflowDefinition]' = OrderedDict()
+        self._lock = threading.RLock()
+        
         if not self.template_dir.exists():
             logger.warning(f"模板目录不存在: {self.template_dir}")
-            return
+    
+    @property
+    def templates(self) -> Dict[str, Dict[str, Any]]:
+        """所有模板（名称 -> 模板数据，会加载全部模板）"""
+        templates = {}
+        for template_name in self.list_templates():
+            template = self.get_template(template_name)
+            if template is not None:
+                templates[template_name] = template
+        return templates
+    
+    def _find_template_file(self, template_name: str) -> Optional[Path]:
+        """查找模板文件（同名的 JSON 模板优先于 YAML 模板）"""
+        for suffix in reversed(TEMPLATE_SUFFIXES):
+            path = self.template_dir / f"{template_name}{suffix}"
+            if path.is_file():
+                return path
+        return None
+    
+    def _load_template(self, template_name: str) -> Optional[_LoadedTemplate]:
+        """
+        加载模板（文件未修改时直接返回已加载的模板）
         
-        # 加载YAML模板
-        for yaml_file in self.template_dir.glob("*.yaml"):
-            try:
-                with open(yaml_file, 'r', encoding='utf-8') as f:
-                    template_data = yaml.safe_load(f)
-                    template_name = yaml_file.stem
-                    self.templates[template_name] = template_data
-                    logger.info(f"加载模板: {template_name}")
-            except Exception as e:
-                logger.error(f"加载模板失败 {yaml_file}: {e}")
-        
-        # 加载JSON模板
-        for json_file in self.template_dir.glob("*.json"):
-            try:
-                with open(json_file, 'r', encoding='utf-8') as f:
+        Args:
+            template_name: 模板名称
+            
+        Returns:
+            已加载的模板，不存在或加载失败时返回None
+        """
+        path = self._find_template_file(template_name)
+        if path is None:
+            with self._lock:
+                self._loaded.pop(template_name, None)
+            return None
+        
+        try:
+            mtime = path.stat().st_mtime
+        except OSError:
+            return None
+        
+        with self._lock:
+            loaded = self._loaded.get(template_name)
+            if loaded and loaded.path == path and loaded.mtime == mtime:
+                return loaded
+        
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                if path.suffix == '.json':
                     template_data = json.load(f)
-                    template_name = json_file.stem
-                    self.templates[template_name] = template_data
-                    logger.info(f"加载模板: {template_name}")
-            except Exception as e:
-                logger.error(f"加载模板失败 {json_file}: {e}")
+                else:
+                    template_data = yaml.safe_load(f)
+            loaded = _LoadedTemplate(path, mtime, template_data)
+        except Exception as e:
+            logger.error(f"加载模板失败 {path}: {e}")
+            return None
+        
+        with self._lock:
+            reloaded = template_name in self._loaded
+            self._loaded[template_name] = loaded
+            # 丢弃旧版本模板的实例
+            for key in [key for key in self._instances if key[0] == template_name]:
+                del self._instances[key]
+        
+        logger.info(f"{'重新加载' if reloaded else '加载'}模板: {template_name}")
+        return loaded
     
     def get_template(self, template_name: str) -> Optional[Dict[str, Any]]:
         """
@@ -72,7 +174,8 @@ class TemplateEngine:
         Returns:
             模板数据字典
         """
-        return self.templates.get(template_name)
+        loaded = self._load_template(template_name)
+        return loaded.data if loaded else None
     
     def list_templates(self) -> List[str]:
         """
@@ -81,7 +184,14 @@ class TemplateEngine:
         Returns:
             模板名称列表
         """
-        return list(self.templates.keys())
+        if not self.template_dir.exists():
+            return []
+        
+        names = {
+            path.stem for path in self.template_dir.iterdir()
+            if path.suffix in TEMPLATE_SUFFIXES and path.is_file()
+        }
+        return sorted(names)
     
     def instantiate_template(
         self,
@@ -96,71 +206,50 @@ class TemplateEngine:
             parameters: 参数字典
             
         Returns:
-            工作流定义对象
+            工作流定义对象（每次调用返回独立副本，修改不影响缓存和其他调用方）
         """
-        template = self.get_template(template_name)
-        if not template:
+        loaded = self._load_template(template_name)
+        if not loaded:
             logger.error(f"模板不存在: {template_name}")
             return None
         
         # 提取工作流定义
-        workflow_data = template.get('workflow')
-        if not workflow_data:
+        if loaded.plan is None:
             logger.error(f"模板格式错误: {template_name}")
             return None
         
+        cache_key = None
+        if self.instance_cache_size > 0:
+            cache_key = (template_name, loaded.mtime, self._hash_parameters(parameters))
+            with self._lock:
+                workflow = self._instances.get(cache_key)
+                if workflow is not None:
+                    self._instances.move_to_end(cache_key)
+                    return workflow.copy()
+        
         # 参数化处理
-        instantiated_workflow = self._apply_parameters(workflow_data, parameters)
+        instantiated_workflow = loaded.plan.resolve(
+            lambda parts, param_name: parameters.get(param_name)
+        )
+        _bind_condition_parameters(loaded.workflow_data, instantiated_workflow, parameters)
         
         # 创建工作流定义
-        return WorkflowDefinition.from_dict(instantiated_workflow)
-    
-    def _apply_parameters(
-        self,
-        workflow_data: Dict[str, Any],
-        parameters: Dict[str, Any]
-    ) -> Dict[str, Any]:
-        """
-        应用参数到工作流定义
+        workflow = WorkflowDefinition.from_dict(instantiated_workflow)
         
-        Args:
-            workflow_data: 工作流数据
-            parameters: 参数字典
-            
-        Returns:
-            参数化后的工作流数据
-        """
-        import copy
-        import re
-        
-        result = copy.deepcopy(workflow_data)
-        
-        # 递归替换参数
-        def replace_params(obj):
-            if isinstance(obj, dict):
-                return {k: replace_params(v) for k, v in obj.items()}
-            elif isinstance(obj, list):
-                return [replace_params(item) for item in obj]
-            elif isinstance(obj, str):
-                # 替换 {{param_name}} 格式的参数
-                pattern = r'\{\{([^}]+)\}\}'
-                matches = re.findall(pattern, obj)
-                
-                if not matches:
-                    return obj
-                
-                resolved = obj
-                for match in matches:
-                    param_name = match.strip()
-                    if param_name in parameters:
-                        value = parameters[param_name]
-                        resolved = resolved.replace(f'{{{{{param_name}}}}}', str(value))
-                
-                return resolved
-            else:
-                return obj
-        
-        return replace_params(result)
+        if cache_key is not None:
+            with self._lock:
+                self._instances[cache_key] = workflow
+                while len(self._instances) > self.instance_cache_size:
+                    self._instances.popitem(last=False)
+            return workflow.copy()
+        
+        return workflow
+    
+    @staticmethod
+    def _hash_parameters(parameters: Dict[str, Any]) -> str:
+        """计算参数哈希（实例缓存键）"""
+        payload = json.dumps(parameters, sort_keys=True, ensure_ascii=False, default=str)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
     
     def execute_template(
         self,
@@ -0,0 +1,13 @@
+# -*- coding: utf-8 -*-
+"""
+测试配置
+
+将 ai-as-me-workplace 目录加入导入路径，使测试可以 import capabilities.*
+"""
+
+import sys
+from pathlib import Path
+
+WORKPLACE_DIR = Path(__file__).resolve().parents[2]
+if str(WORKPLACE_DIR) not in sys.path:
+    sys.path.insert(0, str(WORKPLACE_DIR))
@@ -0,0 +1,95 @@
+# -*- coding: utf-8 -*-
+"""
+原子能力基类测试
+"""
+
+import asyncio
+
+from capabilities.core.atomic_capability import AtomicCapability
+from capabilities.core.capability_interface import CapabilityResult
+
+
+class _AsyncOnlyCapability(AtomicCapability):
+    """只实现了原生异步实现的能力"""
+    
+    async def _execute_impl_async(self, input_data):
+        await asyncio.sleep(0)
+        return CapabilityResult(success=True, data={'echo': input_data.get('value')})
+
+
+def test_sync_execute_runs_native_async_impl():
+    capability = _AsyncOnlyCapability('async_only', '异步能力')
+    
+    result = capability.execute({'value': 1})
+    
+    assert result.success
+    assert result.data == {'echo': 1}
+
+
+def test_sync_execute_inside_running_loop():
+    capability = _AsyncOnlyCapability('async_only', '异步能力')
+    
+    async def caller():
+        return capability.execute({'value': 2})
+    
+    result = asyncio.run(caller())
+    
+    assert result.success, result.error
+    assert result.data == {'echo': 2}
+
+
+def test_execute_async_uses_native_impl():
+    capability = _AsyncOnlyCapability('async_only', '异步能力')
+    
+    result = asyncio.run(capability.execute_async({'value': 3}))
+    
+    assert result.success
+    assert result.data == {'echo': 3}
+
+
+class _DivideCapability(AtomicCapability):
+    """计算 100 / divisor 的能力（divisor 为 0 时抛异常，为负数时返回失败结果）"""
+    
+    def __init__(self):
+        super().__init__('divide', '除法')
+        self.set_input_schema({
+            'type': 'object',
+            'properties': {'divisor': {'type': 'integer'}},
+            'required': ['divisor']
+        })
+    
+    def _execute_impl(self, input_data):
+        divisor = input_data['divisor']
+        if divisor < 0:
+            return CapabilityResult(success=False, error='负数除数')
+        return CapabilityResult(success=True, data=100 // divisor)
+
+
+def test_execute_batch_keeps_order_and_per_item_errors():
+    capability = _DivideCapability()
+    inputs = [{'divisor': 1}, {}, {'divisor': 0}, {'divisor': -1}, {'divisor': 4}]
+    
+    batch = capability.execute_batch(inputs)
+    
+    assert [result.success for result in batch.results] == [True, False, False, False, True]
+    assert [result.data for result in batch.results] == [100, None, None, None, 25]
+    assert batch.results[1].error.startswith('输入验证失败')
+    assert batch.results[2].error.startswith('执行异常')
+    assert batch.results[3].error == '负数除数'
+    assert [result.metadata['batch_index'] for result in batch.results] == [0, 1, 2, 3, 4]
+    assert (batch.success, batch.success_count, batch.error_count) == (False, 2, 3)
+    assert batch.to_dict()['statistics'] == {'total': 5, 'success_count': 2, 'error_count': 3}
+    assert capability.get_statistics()['execution_count'] == 5
+    assert capability.get_statistics()['error_count'] == 3
+
+
+def test_execute_batch_mismatched_impl_fails_every_valid_item():
+    capability = _DivideCapability()
+    capability._execute_batch_impl = lambda inputs: []
+    
+    batch = capability.execute_batch([{'divisor': 1}, {}, {'divisor': 2}])
+    
+    assert [result.success for result in batch.results] == [False, False, False]
+    assert batch.results[0].error.startswith('执行异常')
+    assert batch.results[1].error.startswith('输入验证失败')
+    assert batch.results[2].metadata['batch_index'] == 2
@@ -0,0 +1,173 @@
+# -*- coding: utf-8 -*-
+"""
+统一缓存管理器测试
+"""
+
+import json
+import threading
+import time
+
+import pytest
+
+from capabilities.cache.cache_manager import UnifiedCacheManager
+
+
+def _make_manager(tmp_path, strategies):
+    config_file = tmp_path / 'cache_config.json'
+    config_file.write_text(json.dumps({'cache_strategies': strategies}), encoding='utf-8')
+    return UnifiedCacheManager(config_file)
+
+
+def _indexed_keys(manager, strategy_name):
+    return set(manager._key_indexes[strategy_name].key_to_tags)
+
+
+def test_evicted_keys_leave_index(tmp_path):
+    manager = _make_manager(tmp_path, {
+        'default': {'type': 'memory', 'max_entries': 2}
+    })
+    for i in range(5):
+        manager.set(f'k{i}', i, tags=['t'])
+    
+    assert _indexed_keys(manager, 'default') == {'k3', 'k4'}
+    assert manager.invalidate_tag('t') == 2
+
+
+def test_expired_keys_leave_index(tmp_path):
+    manager = _make_manager(tmp_path, {'default': {'type': 'memory'}})
+    manager.set('k', 'v', ttl=1, tags=['t'])
+    manager.get_strategy('default')._cache['k']['expires_at'] = 0
+    
+    assert manager.get('k') is None
+    assert _indexed_keys(manager, 'default') == set()
+
+
+@pytest.mark.parametrize('strategy_type', ['file', 'sharded_file', 'sqlite', 'hybrid'])
+def test_invalidate_tag_after_restart(tmp_path, strategy_type):
+    location = tmp_path / ('cache.db' if strategy_type == 'sqlite' else 'cache')
+    strategies = {
+        'default': {'type': 'memory'},
+        'persistent': {'type': strategy_type, 'location': str(location)}
+    }
+    manager = _make_manager(tmp_path, strategies)
+    manager.set('table:1', 'old', strategy_name='persistent', tags=['table'])
+    manager.set('other', 'keep', strategy_name='persistent')
+    manager.close()
+    
+    restarted = _make_manager(tmp_path, strategies)
+    try:
+        assert restarted.invalidate_tag('table', 'persistent') == 1
+        assert restarted.get('table:1', 'persistent') is None
+        assert restarted.get('other', 'persistent') == 'keep'
+        assert restarted.invalidate_prefix('oth', 'persistent') == 1
+        assert restarted.get('other', 'persistent') is None
+    finally:
+        restarted.close()
+
+
+def test_unknown_strategy_falls_back_to_default(tmp_path):
+    manager = _make_manager(tmp_path, {'default': {'type': 'memory'}})
+    
+    manager.set('k', 'v', strategy_name='missing', tags=['t'])
+    
+    assert manager.get('k', 'missing') == 'v'
+    assert manager.get_many(['k'], 'missing') == {'k': 'v'}
+    assert manager.get_statistics('default')['hits'] == 2
+    assert manager.invalidate_tag('t', 'missing') == 1
+    assert manager.get('k') is None
+
+
+def test_concurrent_refresh_computes_once(tmp_path):
+    manager = _make_manager(tmp_path, {'default': {'type': 'memory'}})
+    calls = []
+    start = threading.Barrier(8)
+    
+    def load():
+        calls.append(1)
+        time.sleep(0.2)
+        return 'value'
+    
+    def worker(results):
+        start.wait()
+        results.append(manager.refresh('k', load))
+    
+    results = []
+    threads = [threading.Thread(target=worker, args=(results,)) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    
+    assert len(calls) == 1
+    assert results == ['value'] * 8
+    assert manager.get_statistics('default')['coalesced'] == 7
+
+
+def _expire_freshness(manager, key, strategy_name='default'):
+    """把已写入条目的新鲜期截止时间改到过去（值仍在宽限期内）"""
+    strategy = manager.get_strategy(strategy_name)
+    stored = strategy.get(key)
+    stored['__cache_fresh_until__'] = time.time() - 1
+    strategy.set(key, stored, 60)
+
+
+def _wait_for(predicate, timeout=5):
+    deadline = time.time() + timeout
+    while not predicate() and time.time() < deadline:
+        time.sleep(0.01)
+    return predicate()
+
+
+def test_stale_hit_returns_old_value_and_refreshes_in_background(tmp_path):
+    manager = _make_manager(tmp_path, {'default': {'type': 'memory'}})
+    versions = iter(['old', 'new'])
+    refreshed = threading.Event()
+    
+    def load():
+        value = next(versions)
+        if value == 'new':
+            refreshed.wait(5)
+        return value
+    
+    assert manager.refresh('k', load, ttl=60, stale_while_revalidate=60) == 'old'
+    _expire_freshness(manager, 'k')
+    
+    assert manager.refresh('k', load, ttl=60, stale_while_revalidate=60) == 'old'
+    assert manager.get('k') == 'old'
+    refreshed.set()
+    
+    assert _wait_for(lambda: manager.get('k') == 'new')
+    assert manager.get_statistics('default')['stale_hits'] == 1
+    manager.close()
+
+
+def test_freshness_deadline_survives_restart(tmp_path):
+    strategies = {
+        'default': {'type': 'memory'},
+        'persistent': {'type': 'sqlite', 'location': str(tmp_path / 'cache.db')}
+    }
+    manager = _make_manager(tmp_path, strategies)
+    manager.refresh('k', lambda: 'old', ttl=60, strategy_name='persistent', stale_while_revalidate=60)
+    _expire_freshness(manager, 'k', 'persistent')
+    manager.close()
+    
+    restarted = _make_manager(tmp_path, strategies)
+    try:
+        value = restarted.refresh(
+            'k', lambda: 'new', ttl=60, strategy_name='persistent', stale_while_revalidate=60
+        )
+        
+        assert value == 'old'
+        assert _wait_for(lambda: restarted.get('k', 'persistent') == 'new')
+    finally:
+        restarted.close()
+
+
+def test_stale_hit_after_close_skips_background_refresh(tmp_path):
+    manager = _make_manager(tmp_path, {'default': {'type': 'memory'}})
+    manager.refresh('k', lambda: 'old', ttl=60, stale_while_revalidate=60)
+    _expire_freshness(manager, 'k')
+    manager.close()
+    
+    assert manager.refresh('k', lambda: 'new', ttl=60, stale_while_revalidate=60) == 'old'
+    assert manager._inflight == {}
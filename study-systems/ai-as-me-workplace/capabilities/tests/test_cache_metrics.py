@@ -0,0 +1,72 @@
+# -*- coding: utf-8 -*-
+"""
+缓存指标测试
+"""
+
+import json
+
+from capabilities.cache.cache_manager import UnifiedCacheManager
+from capabilities.cache.cache_metrics import CacheMetrics, LatencyHistogram
+
+
+def test_histogram_cumulative_bucket_counts():
+    histogram = LatencyHistogram(buckets=(0.01, 0.1, 1.0))
+    for seconds in (0.005, 0.01, 0.05, 0.5, 0.5, 2.0):
+        histogram.observe(seconds)
+    
+    snap = histogram.snapshot()
+    
+    assert snap['buckets'] == [(0.01, 2), (0.1, 3), (1.0, 5), (float('inf'), 6)]
+    assert snap['count'] == 6
+    assert snap['max'] == 2.0
+    assert abs(snap['sum'] - 3.065) < 1e-9
+
+
+def test_latency_summary_is_per_strategy():
+    metrics = CacheMetrics(buckets=(0.1,))
+    metrics.observe('a', 'get', 0.2)
+    metrics.observe('a', 'get', 0.4)
+    metrics.observe('b', 'set', 1.0)
+    
+    summary = metrics.get_latency_summary('a')
+    
+    assert list(summary) == ['get']
+    assert summary['get']['count'] == 2
+    assert abs(summary['get']['avg'] - 0.3) < 1e-9
+
+
+def test_export_metrics_prometheus_text(tmp_path):
+    config_file = tmp_path / 'cache_config.json'
+    config_file.write_text(json.dumps({
+        'cache_strategies': {'default': {'type': 'memory'}}
+    }), encoding='utf-8')
+    manager = UnifiedCacheManager(config_file)
+    manager.set('k', 'v')
+    manager.get('k')
+    manager.get('missing')
+    output_file = tmp_path / 'metrics' / 'cache.prom'
+    
+    text = manager.export_metrics(output_file)
+    lines = text.splitlines()
+    
+    assert output_file.read_text(encoding='utf-8') == text
+    assert '# TYPE unified_cache_operation_duration_seconds histogram' in lines
+    get_buckets = [
+        line for line in lines
+        if line.startswith('unified_cache_operation_duration_seconds_bucket{strategy="default",operation="get"')
+    ]
+    assert len(get_buckets) == len(manager._metrics.buckets) + 1
+    assert get_buckets[-1] == (
+        'unified_cache_operation_duration_seconds_bucket'
+        '{strategy="default",operation="get",le="+Inf"} 2'
+    )
+    counts = [int(line.rsplit(' ', 1)[1]) for line in get_buckets]
+    assert counts == sorted(counts)
+    assert 'unified_cache_operation_duration_seconds_count{strategy="default",operation="get"} 2' in lines
+    assert '# TYPE unified_cache_requests_total counter' in lines
+    assert 'unified_cache_requests_total{strategy="default",result="hit"} 1' in lines
+    assert 'unified_cache_requests_total{strategy="default",result="miss"} 1' in lines
+    assert 'unified_cache_sets_total{strategy="default"} 1' in lines
+    for line in lines:
+        if not line.startswith('#'):
+            float(line.rsplit(' ', 1)[1])
@@ -0,0 +1,240 @@
+# -*- coding: utf-8 -*-
+"""
+缓存策略测试
+"""
+
+import gc
+import threading
+import time
+import weakref
+from types import SimpleNamespace
+
+import pytest
+
+from capabilities.cache import cache_strategies
+from capabilities.cache.cache_strategies import (
+    HAS_MSGPACK, HAS_ZSTD, HybridCacheStrategy, ShardedFileCacheStrategy, SqliteCacheStrategy
+)
+
+
+def _advance_clock(monkeypatch, seconds):
+    """让策略模块看到的当前时间前进 seconds 秒"""
+    future = time.time() + seconds
+    monkeypatch.setattr(cache_strategies, 'time', SimpleNamespace(time=lambda: future))
+
+
+@pytest.mark.parametrize('serializer, compression', [
+    ('pickle', None),
+    ('pickle', 'zlib'),
+    pytest.param('pickle', 'zstd', marks=pytest.mark.skipif(not HAS_ZSTD, reason='zstandard未安装')),
+    pytest.param('msgpack', None, marks=pytest.mark.skipif(not HAS_MSGPACK, reason='msgpack未安装')),
+    pytest.param('msgpack', 'zlib', marks=pytest.mark.skipif(not HAS_MSGPACK, reason='msgpack未安装')),
+])
+def test_sharded_round_trip(tmp_path, serializer, compression):
+    cache = ShardedFileCacheStrategy(tmp_path, serializer=serializer, compression=compression)
+    value = {'rows': [{'id': i, 'name': f'记录{i}'} for i in range(50)], 'total': 50}
+    
+    cache.set('key', value, ttl=60, tags=['table'])
+    
+    assert cache.get('key') == value
+    assert cache.get_entry('key')[0] == value
+    assert list(cache.iter_tagged_keys()) == [('key', ['table'])]
+    with open(cache._get_cache_path('key'), 'rb') as f:
+        header = cache._read_header(f)
+    assert (header['serializer'], header['compression']) == (serializer, compression)
+
+
+def test_sharded_exists_reads_only_header(tmp_path):
+    cache = ShardedFileCacheStrategy(tmp_path, compression='zlib')
+    cache.set('key', 'x' * 100000)
+    cache_path = cache._get_cache_path('key')
+    with open(cache_path, 'r+b') as f:
+        f.seek(-16, 2)
+        f.write(b'\xff' * 16)
+    
+    assert cache.exists('key')
+    assert cache.bytes_read == 0
+    assert cache.get('key') is None
+    assert cache.bytes_read > 0
+
+
+def test_sharded_expired_entry_is_evicted(tmp_path, monkeypatch):
+    cache = ShardedFileCacheStrategy(tmp_path)
+    removed = []
+    cache.removal_listener = removed.append
+    cache.set('short', 'v', ttl=10)
+    cache.set('long', 'v', ttl=1000)
+    cache.set('forever', 'v')
+    
+    _advance_clock(monkeypatch, 60)
+    
+    assert cache.get('short') is None
+    assert not cache._get_cache_path('short').exists()
+    assert removed == ['short']
+    assert cache.exists('long')
+    assert cache.get('forever') == 'v'
+    assert sorted(key for key, _ in cache.iter_tagged_keys()) == ['forever', 'long']
+
+
+def test_sharded_clear_only_removes_shard_dirs(tmp_path):
+    cache = ShardedFileCacheStrategy(tmp_path)
+    for i in range(20):
+        cache.set(f'key{i}', i)
+    other_dir = tmp_path / 'keep_me'
+    other_dir.mkdir()
+    (other_dir / 'data.txt').write_text('x')
+    (tmp_path / 'notes.txt').write_text('x')
+    
+    cache.clear()
+    
+    assert cache.get('key0') is None
+    assert list(cache.iter_tagged_keys()) == []
+    assert (other_dir / 'data.txt').exists()
+    assert sorted(p.name for p in tmp_path.iterdir()) == ['keep_me', 'notes.txt']
+
+
+def test_hybrid_queued_delete_hides_flushed_value(tmp_path):
+    cache = HybridCacheStrategy(tmp_path, flush_interval=60)
+    try:
+        cache.set('key', 'v1')
+        cache.flush()
+        cache.delete('key')
+        
+        assert cache.get('key') is None
+        assert not cache.exists('key')
+        
+        cache.flush()
+        assert cache.get('key') is None
+    finally:
+        cache.close()
+
+
+def test_hybrid_batch_visible_while_flushing(tmp_path):
+    cache = HybridCacheStrategy(tmp_path, flush_interval=60)
+    try:
+        cache.set('key', 'v1')
+        cache.memory_cache.clear()
+        seen = []
+        original_set = cache.file_cache.set
+        
+        def observing_set(key, value, ttl=None, tags=None):
+            seen.append((cache.get(key), cache.exists(key)))
+            original_set(key, value, ttl, tags)
+        
+        cache.file_cache.set = observing_set
+        cache.flush()
+        
+        assert seen == [('v1', True)]
+        assert cache.get('key') == 'v1'
+    finally:
+        cache.close()
+
+
+def test_closed_hybrid_can_be_collected(tmp_path):
+    cache = HybridCacheStrategy(tmp_path, flush_interval=60)
+    cache.set('key', 'value')
+    cache.close()
+    ref = weakref.ref(cache)
+    
+    del cache
+    gc.collect()
+    
+    assert ref() is None
+    assert HybridCacheStrategy(tmp_path, write_behind=False).get('key') == 'value'
+
+
+def test_hybrid_promotes_after_concurrent_l2_hits(tmp_path):
+    cache = HybridCacheStrategy(tmp_path, write_behind=False, promote_after=3)
+    try:
+        for i in range(50):
+            cache.set(f'key{i}', i)
+        cache.memory_cache.clear()
+        errors = []
+        
+        def reader():
+            try:
+                for _ in range(20):
+                    for i in range(50):
+                        assert cache.get(f'key{i}') == i
+            except Exception as e:
+                errors.append(e)
+        
+        threads = [threading.Thread(target=reader) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        
+        assert errors == []
+        assert all(cache.memory_cache.exists(f'key{i}') for i in range(50))
+        assert len(cache._l2_hits) <= 50
+    finally:
+        cache.close()
+
+def test_sqlite_get_many_set_many_across_batches(tmp_path):
+    cache = SqliteCacheStrategy(tmp_path / 'cache.db')
+    try:
+        items = {f'key{i}': {'id': i} for i in range(1200)}
+        cache.set_many(items, ttl=60, tags=['bulk'])
+        
+        keys = list(items) + ['missing']
+        
+        assert cache.get_many(keys) == items
+        assert cache.get_many([]) == {}
+        assert cache.get('key1199') == {'id': 1199}
+        assert sum(1 for _ in cache.iter_tagged_keys()) == 1200
+    finally:
+        cache.close()
+
+
+def test_sqlite_purge_expired(tmp_path, monkeypatch):
+    cache = SqliteCacheStrategy(tmp_path / 'cache.db')
+    try:
+        removed = []
+        cache.removal_listener = removed.append
+        cache.set_many({'a': 1, 'b': 2}, ttl=10)
+        cache.set('c', 3, ttl=1000)
+        cache.set('d', 4)
+        
+        _advance_clock(monkeypatch, 60)
+        
+        assert cache.get('a') is None
+        assert cache.get_many(['a', 'b', 'c', 'd']) == {'c': 3, 'd': 4}
+        assert cache.purge_expired() == 2
+        assert sorted(removed) == ['a', 'b']
+        assert cache.get_usage()['entries'] == 2
+        assert cache.purge_expired() == 0
+    finally:
+        cache.close()
+
+
+def test_sqlite_concurrent_reads_under_wal(tmp_path):
+    cache = SqliteCacheStrategy(tmp_path / 'cache.db')
+    try:
+        assert cache._conn.execute("PRAGMA journal_mode").fetchone()[0] == 'wal'
+        cache.set_many({f'key{i}': i for i in range(100)})
+        errors = []
+        stop = threading.Event()
+        
+        def reader():
+            try:
+                while not stop.is_set():
+                    for i in range(100):
+                        assert cache.get(f'key{i}') == i
+                    assert len(cache.get_many([f'key{i}' for i in range(100)])) == 100
+            except Exception as e:
+                errors.append(e)
+        
+        threads = [threading.Thread(target=reader) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for i in range(200):
+            cache.set(f'extra{i}', i)
+        stop.set()
+        for thread in threads:
+            thread.join()
+        
+        assert errors == []
+        assert cache.get('extra199') == 199
+    finally:
+        cache.close()
@@ -0,0 +1,61 @@
+# -*- coding: utf-8 -*-
+"""
+能力发现引擎测试
+"""
+
+from capabilities.discovery import capability_discovery
+from capabilities.discovery.capability_discovery import CapabilityDiscovery
+
+
+def _registry():
+    return {
+        'fault_query': {'name': 'fault query', 'description': '查询故障详情', 'dependencies': ['auth']},
+        'log_download': {'name': 'log download', 'description': '下载日志', 'dependencies': ['auth']},
+        'auth': {'name': 'auth', 'description': '获取访问令牌'},
+    }
+
+
+def test_record_usage_skips_duplicate_use_cases(monkeypatch):
+    discovery = CapabilityDiscovery(_registry())
+    reindexed = []
+    original_add = discovery.vector_index.add
+    monkeypatch.setattr(
+        discovery.vector_index, 'add',
+        lambda doc_id, text: (reindexed.append(doc_id), original_add(doc_id, text))
+    )
+    
+    record = {'capabilities': ['fault_query', 'fault_query'], 'use_case': '排查告警'}
+    discovery.record_usage(record)
+    discovery.record_usage(record)
+    
+    assert discovery._use_cases['fault_query'] == ['排查告警']
+    assert reindexed == ['fault_query']
+
+
+def test_record_usage_keeps_latest_unique_use_cases(monkeypatch):
+    monkeypatch.setattr(capability_discovery, 'MAX_USE_CASES', 3)
+    discovery = CapabilityDiscovery(_registry())
+    
+    for use_case in ['a', 'b', 'c', 'a', 'd']:
+        discovery.record_usage({'capabilities': ['auth'], 'use_case': use_case})
+    
+    assert discovery._use_cases['auth'] == ['c', 'a', 'd']
+
+
+def test_use_cases_feed_semantic_search():
+    discovery = CapabilityDiscovery(_registry(), usage_history=[
+        {'capabilities': ['log_download'], 'use_case': 'collect crash dumps'}
+    ])
+    
+    results = discovery.discover('crash dumps', limit=1)
+    
+    assert results[0]['capability_id'] == 'log_download'
+
+
+def test_suggest_workflow_puts_dependencies_first():
+    discovery = CapabilityDiscovery(_registry())
+    
+    workflow = discovery.suggest_workflow('fault query')['workflow']
+    capabilities = [step['capability'] for step in workflow['steps']]
+    
+    assert capabilities.index('auth') < capabilities.index('fault_query')
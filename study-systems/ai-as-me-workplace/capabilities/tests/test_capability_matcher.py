@@ -0,0 +1,76 @@
+# -*- coding: utf-8 -*-
+"""
+能力匹配器测试
+"""
+
+from capabilities.discovery.capability_matcher import CapabilityMatcher
+
+
+def _registry():
+    return {
+        'fault_query': {'name': 'fault query', 'description': '按故障ID查询故障详情', 'category': 'ops'},
+        'bitable_read': {'name': '读表', 'description': '读取飞书多维表格', 'category': 'feishu'},
+        'log_download': {'name': 'log download', 'description': '下载日志文件', 'category': 'ops'},
+    }
+
+
+def test_bm25_ranks_matching_capability_first():
+    matcher = CapabilityMatcher(_registry())
+    
+    matches = matcher.match('下载日志')
+    
+    assert matches[0][0] == 'log_download'
+    assert matcher.match('故障', category='feishu') == []
+
+
+def test_match_by_name_tolerates_typos():
+    matcher = CapabilityMatcher(_registry())
+    
+    matches = dict(matcher.match_by_name('fualt qeury'))
+    
+    assert 'fault_query' in matches
+
+
+def test_single_cjk_character_query():
+    matcher = CapabilityMatcher(_registry())
+    
+    assert [cap_id for cap_id, _ in matcher.match_by_name('读', threshold=0.5)] == ['bitable_read']
+    assert 'bitable_read' in dict(matcher.match('表'))
+
+
+def test_incremental_updates_keep_name_index_consistent():
+    matcher = CapabilityMatcher(_registry())
+    
+    matcher.add_capability('fault_query', {'name': 'incident lookup', 'description': '', 'category': 'ops'})
+    matcher.remove_capability('log_download')
+    
+    assert dict(matcher.match_by_name('fualt qeury')) == {}
+    assert 'fault_query' in dict(matcher.match_by_name('incidnet lookup'))
+    assert 'log_download' not in dict(matcher.match('log download'))
+
+
+def test_update_after_registry_mutated_leaves_no_stale_postings():
+    registry = _registry()
+    matcher = CapabilityMatcher(registry)
+    
+    # 调用方先改了共享注册表，再通知匹配器
+    registry['fault_query'] = {'name': 'incident lookup', 'description': '', 'category': 'ops'}
+    matcher.add_capability('fault_query', registry['fault_query'])
+    
+    assert dict(matcher.match_by_name('fualt qeury')) == {}
+    assert 'fault_query' not in matcher._name_grams.get('fa', set())
+    assert 'fault query' not in matcher.name_index
+    assert 'fault' not in matcher.keyword_index
+    assert matcher.match_by_keywords(['故障']) == []
+    assert 'fault_query' in dict(matcher.match_by_name('incidnet lookup'))
+
+
+def test_keyword_index_is_kept():
+    matcher = CapabilityMatcher(_registry())
+    
+    assert matcher.keyword_index['log'] == ['log_download']
+    assert matcher.keyword_index['故障'] == ['fault_query']
+    
+    matcher.remove_capability('log_download')
+    
+    assert 'log' not in matcher.keyword_index
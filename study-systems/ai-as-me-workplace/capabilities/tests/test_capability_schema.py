@@ -0,0 +1,91 @@
+# -*- coding: utf-8 -*-
+"""
+能力Schema测试
+"""
+
+import pytest
+
+from capabilities.core.atomic_capability import AtomicCapability
+from capabilities.core.capability_interface import CapabilityResult
+from capabilities.core.capability_schema import CapabilitySchema
+
+
+_TICKET_SCHEMA = CapabilitySchema.create_input_schema(
+    {
+        'ticket_id': {'type': 'string'},
+        'limit': {'type': 'integer'},
+        'score': {'type': 'number'},
+        'force_refresh': {'type': 'boolean'},
+        'fields': {'type': 'array'},
+        'filters': {'type': 'object'},
+        'note': {'description': '未声明类型'}
+    },
+    required=['ticket_id']
+)
+_OPEN_SCHEMA = CapabilitySchema.create_input_schema(
+    {'ticket_id': {'type': 'string'}}, additional_properties=True
+)
+
+
+@pytest.mark.parametrize('schema, data', [
+    (_TICKET_SCHEMA, {'ticket_id': 'T1'}),
+    (_TICKET_SCHEMA, {
+        'ticket_id': 'T1', 'limit': 10, 'score': 0.5, 'force_refresh': False,
+        'fields': ['a'], 'filters': {}, 'note': 1
+    }),
+    (_TICKET_SCHEMA, {'ticket_id': 'T1', 'score': 3}),
+    (_OPEN_SCHEMA, {'ticket_id': 'T1', 'extra': 1}),
+    (_OPEN_SCHEMA, {}),
+    ({'type': 'string'}, 'not checked'),
+    ({}, {'anything': 1}),
+])
+def test_compiled_validator_accepts_like_interpreted(schema, data):
+    expected = CapabilitySchema.validate_against_schema(data, schema)
+    
+    assert CapabilitySchema.compile_validator(schema)(data) == expected
+    assert expected == (True, None)
+
+
+@pytest.mark.parametrize('schema, data', [
+    (_TICKET_SCHEMA, {}),
+    (_TICKET_SCHEMA, {'ticket_id': 1}),
+    (_TICKET_SCHEMA, {'ticket_id': 'T1', 'limit': '10'}),
+    (_TICKET_SCHEMA, {'ticket_id': 'T1', 'score': '0.5'}),
+    (_TICKET_SCHEMA, {'ticket_id': 'T1', 'force_refresh': 'yes'}),
+    (_TICKET_SCHEMA, {'ticket_id': 'T1', 'fields': 'a'}),
+    (_TICKET_SCHEMA, {'ticket_id': 'T1', 'filters': []}),
+    (_TICKET_SCHEMA, {'ticket_id': 'T1', 'unknown': 1}),
+    (_TICKET_SCHEMA, {'limit': 'x', 'unknown': 1}),
+    (_TICKET_SCHEMA, {'ticket_id': 'T1', 'limit': 'x', 'unknown': 1}),
+    (_TICKET_SCHEMA, ['ticket_id']),
+    (_OPEN_SCHEMA, {'ticket_id': None}),
+])
+def test_compiled_validator_rejects_like_interpreted(schema, data):
+    expected = CapabilitySchema.validate_against_schema(data, schema)
+    
+    assert CapabilitySchema.compile_validator(schema)(data) == expected
+    assert expected[0] is False
+
+
+class _LegacySchemaCapability(AtomicCapability):
+    """直接给 _input_schema 赋值的旧式能力"""
+    
+    def __init__(self):
+        super().__init__('legacy', '旧式能力')
+        self._input_schema = CapabilitySchema.create_input_schema(
+            {'ticket_id': {'type': 'string'}}, required=['ticket_id']
+        )
+    
+    def _execute_impl(self, input_data):
+        return CapabilityResult(success=True, data=input_data['ticket_id'])
+
+
+def test_direct_schema_assignment_compiles_validator():
+    capability = _LegacySchemaCapability()
+    
+    assert capability.validate({}) == (False, '缺少必需属性: ticket_id')
+    assert capability.execute({'ticket_id': 'T1'}).data == 'T1'
+    
+    capability._input_schema = None
+    
+    assert capability.validate({}) == (True, None)
@@ -0,0 +1,48 @@
+# -*- coding: utf-8 -*-
+"""
+步骤条件表达式测试
+"""
+
+import pytest
+
+from capabilities.orchestration.condition_expression import (
+    ConditionSyntaxError, bind_parameters, compile_condition
+)
+
+
+def _evaluate(condition, variables=None):
+    variables = variables or {}
+    return compile_condition(condition).evaluate(lambda parts, var_path: variables.get(var_path))
+
+
+def test_expression_operators():
+    variables = {'ids': [1, 2], 'ticket.status': 'open'}
+    
+    assert _evaluate('len({{ids}}) > 1 and {{ticket.status}} != "closed"', variables)
+    assert _evaluate('1 < len({{ids}}) <= 2', variables)
+    assert not _evaluate('{{missing}}', variables)
+    assert _evaluate('lower("OPEN") in ["open", "new"]')
+
+
+def test_unknown_identifier_is_rejected():
+    with pytest.raises(ConditionSyntaxError):
+        compile_condition('open == "open"')
+
+
+def test_evaluation_error_counts_as_false():
+    assert not _evaluate('{{count}} > 3')
+
+
+def test_bind_parameters_substitutes_literals():
+    assert bind_parameters('{{status}} == "open"', {'status': 'open'}) == '"open" == "open"'
+    assert bind_parameters('{{limit}} > 3', {'limit': 5}) == '5 > 3'
+    assert bind_parameters('{{flag}}', {'flag': False}) == 'false'
+    assert _evaluate(bind_parameters('{{status}} in {{allowed}}', {'status': 'a', 'allowed': ['a']}))
+
+
+def test_bind_parameters_inside_string_literals_and_unknown_names():
+    condition = bind_parameters('"{{name}}" == {{step.name}}', {'name': 'say "hi"'})
+    
+    assert condition == '"say \\"hi\\"" == {{step.name}}'
+    assert _evaluate(condition, {'step.name': 'say "hi"'})
+    assert _evaluate(bind_parameters("'{{name}}' == \"it's\"", {'name': "it's"}))
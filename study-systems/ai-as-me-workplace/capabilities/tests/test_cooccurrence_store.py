@@ -0,0 +1,55 @@
+# -*- coding: utf-8 -*-
+"""
+能力共现存储测试
+"""
+
+import time
+
+import pytest
+
+from capabilities.discovery.capability_recommender import CapabilityRecommender
+from capabilities.discovery.cooccurrence_store import CooccurrenceStore
+
+
+def test_counts_decay_with_half_life():
+    store = CooccurrenceStore(half_life_days=1.0)
+    now = time.time()
+    store.record(['a', 'b'], now)
+    store.record(['a', 'c'], now - 86400)
+    
+    assert store.get_count('a', 'b') == pytest.approx(1.0, rel=1e-3)
+    assert store.get_count('c', 'a') == pytest.approx(0.5, rel=1e-3)
+    assert [cap_id for cap_id, _ in store.top_neighbors('a')] == ['b', 'c']
+
+
+@pytest.mark.parametrize('timestamp', ['', 'yesterday', '2024-13-45', float('nan'), object()])
+def test_malformed_timestamp_counts_as_now(timestamp):
+    store = CooccurrenceStore()
+    
+    store.record_many([{'capabilities': ['a', 'b'], 'timestamp': timestamp}])
+    
+    assert store.get_count('a', 'b') == pytest.approx(1.0, rel=1e-3)
+
+
+def test_recommender_survives_malformed_usage_history():
+    recommender = CapabilityRecommender({'a': {}, 'b': {}}, usage_history=[
+        {'capabilities': ['a', 'b'], 'timestamp': 'not a date'},
+        {'capabilities': None, 'timestamp': '2024-01-01T00:00:00'},
+        {'capabilities': ['a', 'b'], 'timestamp': '2024-01-01T00:00:00'}
+    ])
+    
+    assert [cap_id for cap_id, _ in recommender.recommend_combinations('a')] == ['b']
+
+
+def test_save_and_load_round_trip(tmp_path):
+    store_file = tmp_path / 'cooccurrence.json'
+    store = CooccurrenceStore(store_file)
+    store.record(['a', 'b', 'c'])
+    store.save()
+    
+    loaded = CooccurrenceStore(store_file)
+    other_half_life = CooccurrenceStore(store_file, half_life_days=7.0)
+    
+    assert loaded.loaded
+    assert loaded.pairs() == pytest.approx(store.pairs(), rel=1e-6)
+    assert not other_half_life.loaded
@@ -0,0 +1,96 @@
+# -*- coding: utf-8 -*-
+"""
+能力依赖图测试
+"""
+
+import threading
+import time
+
+from capabilities.discovery.dependency_graph import DependencyGraph
+
+
+def _registry():
+    return {
+        'report': {'dependencies': ['query', 'render']},
+        'query': {'dependencies': ['auth']},
+        'render': {'dependencies': ['auth', 'missing']},
+        'auth': {},
+        'a': {'dependencies': ['b']},
+        'b': {'dependencies': ['a']},
+    }
+
+
+def test_resolve_orders_dependencies_first():
+    graph = DependencyGraph(_registry())
+    
+    order = graph.resolve('report')
+    
+    assert order[0] == 'auth' and order[-1] == 'report'
+    assert set(order) == {'report', 'query', 'render', 'auth'}
+    assert graph.get_direct_dependencies('render') == ('auth',)
+
+
+def test_transitive_and_indirect_dependencies():
+    graph = DependencyGraph(_registry())
+    
+    assert graph.get_transitive_dependencies('report') == {'query', 'render', 'auth'}
+    assert graph.get_indirect_dependencies('report') == [('auth', 'query')]
+
+
+def test_cycles_are_detected():
+    graph = DependencyGraph(_registry())
+    
+    assert set(graph.get_cycle('a')) == {'a', 'b'}
+    assert graph.get_cycle('report') is None
+    assert graph.get_transitive_dependencies('a') == {'a', 'b'}
+
+
+def test_invalidate_picks_up_registry_changes():
+    registry = _registry()
+    graph = DependencyGraph(registry)
+    assert graph.resolve('auth') == ['auth']
+    
+    registry['auth'] = {'dependencies': ['token']}
+    registry['token'] = {}
+    graph.invalidate()
+    
+    assert graph.resolve('auth') == ['token', 'auth']
+
+
+def test_long_chain_does_not_hit_recursion_limit():
+    registry = {f'c{i}': {'dependencies': [f'c{i + 1}']} for i in range(5000)}
+    registry['c5000'] = {}
+    graph = DependencyGraph(registry)
+    
+    assert len(graph.get_transitive_dependencies('c0')) == 5000
+    assert graph.topological_order(['c0', 'c4999', 'c10']) == ['c4999', 'c10', 'c0']
+
+
+def test_concurrent_invalidate_and_queries():
+    registry = {f'cap{i}': {'dependencies': [f'cap{i - 1}'] if i else []} for i in range(300)}
+    graph = DependencyGraph(registry)
+    errors = []
+    stop = threading.Event()
+    
+    def reader():
+        try:
+            while not stop.is_set():
+                assert graph.resolve('cap299')[-1] == 'cap299'
+                assert len(graph.get_transitive_dependencies('cap150')) == 150
+                assert graph.get_indirect_dependencies('cap3')[0] == ('cap1', 'cap2')
+                assert len(graph.topological_order()) == 300
+                assert graph.cycles == []
+        except Exception as e:
+            errors.append(e)
+    
+    threads = [threading.Thread(target=reader) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for _ in range(50):
+        graph.invalidate()
+        time.sleep(0.001)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    
+    assert errors == []
@@ -0,0 +1,74 @@
+# -*- coding: utf-8 -*-
+"""
+使用模式分析测试
+"""
+
+import gc
+import json
+import weakref
+from datetime import datetime, timedelta
+
+from capabilities.usage.pattern_analysis import PatternAnalyzer
+
+
+def _history():
+    now = datetime.now()
+    return [
+        {'capabilities': ['a', 'b'], 'timestamp': now.isoformat(), 'success': True, 'scenario': 'ops'},
+        {'capabilities': ['a'], 'timestamp': (now - timedelta(days=40)).isoformat(), 'success': False},
+        {'capabilities': ['a', 'b'], 'timestamp': 'not a date', 'success': True, 'scenario': 'ops'},
+    ]
+
+
+def test_frequency_and_effectiveness():
+    analyzer = PatternAnalyzer(_history())
+    
+    frequency = analyzer.analyze_usage_frequency()
+    effectiveness = analyzer.analyze_effectiveness()
+    
+    assert frequency['total_usage'] == 3
+    assert frequency['most_used'][0] == ('a', 3)
+    assert effectiveness['capability_effectiveness']['a']['failure'] == 1
+    assert effectiveness['overall_success_rate'] == 4 / 5
+
+
+class _History(list):
+    """可被弱引用的记录列表"""
+
+
+def test_history_not_retained_after_ingest():
+    history = _History(_history())
+    ref = weakref.ref(history)
+    analyzer = PatternAnalyzer(history)
+    
+    del history
+    gc.collect()
+    
+    assert ref() is None
+    assert analyzer.usage_history is None
+    assert analyzer.analyze_usage_frequency()['total_usage'] == 3
+    
+    kept = _History(_history())
+    assert PatternAnalyzer(kept, keep_history=True).usage_history is kept
+
+def test_patterns_and_trends_skip_bad_timestamps():
+    analyzer = PatternAnalyzer(_history())
+    
+    patterns = analyzer.analyze_usage_patterns()
+    trends = analyzer.identify_trends(days=30)
+    
+    assert sum(patterns['time_patterns']['hourly_distribution'].values()) == 2
+    assert patterns['scenario_patterns']['most_common_scenario'] == ('ops', 2)
+    assert trends['trends']['a']['recent_count'] == 1
+    assert trends['trends']['b']['trend'] == 'new'
+
+
+def test_from_jsonl_matches_in_memory_history(tmp_path):
+    log_file = tmp_path / 'usage.jsonl'
+    log_file.write_text('\n'.join(json.dumps(record) for record in _history()), encoding='utf-8')
+    
+    streamed = PatternAnalyzer.from_jsonl(log_file, chunk_size=2)
+    in_memory = PatternAnalyzer(_history())
+    
+    assert streamed.analyze_usage_frequency() == in_memory.analyze_usage_frequency()
+    assert streamed.analyze_usage_patterns() == in_memory.analyze_usage_patterns()
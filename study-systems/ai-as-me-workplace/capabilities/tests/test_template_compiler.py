@@ -0,0 +1,70 @@
+# -*- coding: utf-8 -*-
+"""
+模板编译器测试
+"""
+
+from capabilities.orchestration.template_compiler import compile_template
+from capabilities.orchestration.workflow_definition import WorkflowDefinition
+from capabilities.orchestration.workflow_engine import WorkflowEngine
+
+
+def _lookup(variables):
+    return lambda parts, var_path: variables.get(var_path)
+
+
+def test_resolve_substitutes_variables_and_keeps_types():
+    template = compile_template({'ids': '{{ids}}', 'title': 'id={{ids.0}}', 'n': 1})
+    
+    result = template.resolve(lambda parts, var_path: [3, 4] if var_path == 'ids' else None)
+    
+    assert result == {'ids': [3, 4], 'title': 'id={{ids.0}}', 'n': 1}
+
+
+def test_constant_template_returns_fresh_containers():
+    source = {'options': {'fields': ['a']}, 'limit': 10}
+    template = compile_template(source)
+    
+    first = template.resolve(_lookup({}))
+    first['options']['fields'].append('b')
+    first['limit'] = 0
+    
+    assert source == {'options': {'fields': ['a']}, 'limit': 10}
+    assert template.resolve(_lookup({})) == source
+
+
+def test_constant_subtrees_are_not_shared_between_resolves():
+    template = compile_template({'query': '{{q}}', 'options': {'fields': ['a']}})
+    
+    first = template.resolve(_lookup({'q': 'x'}))
+    second = template.resolve(_lookup({'q': 'y'}))
+    first['options']['fields'].append('b')
+    
+    assert second['options'] == {'fields': ['a']}
+
+
+class _MutatingCapability:
+    """原地修改输入的能力"""
+    
+    def execute(self, input_data):
+        input_data['options']['seen'] = True
+        return {'success': True, 'data': input_data.get('item')}
+
+
+def test_capability_mutating_input_does_not_leak():
+    engine = WorkflowEngine()
+    engine.register_capability('mutate', _MutatingCapability())
+    workflow = WorkflowDefinition.from_dict({
+        'name': 'mutate',
+        'steps': [
+            {'capability': 'mutate', 'action': 'execute', 'input': {'options': {}}, 'output': 'A'},
+            {
+                'capability': 'mutate', 'action': 'execute', 'foreach': [1, 2],
+                'input': {'item': '{{item}}', 'options': {}}, 'output': 'B'
+            }
+        ]
+    })
+    
+    assert engine.execute(workflow)['success']
+    assert engine.execute(workflow)['success']
+    assert workflow.steps[0]['input'] == {'options': {}}
+    assert workflow.steps[1]['input'] == {'item': '{{item}}', 'options': {}}
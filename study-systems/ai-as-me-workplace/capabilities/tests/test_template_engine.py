@@ -0,0 +1,106 @@
+# -*- coding: utf-8 -*-
+"""
+模板引擎测试
+"""
+
+import json
+
+from capabilities.orchestration.workflow_engine import WorkflowEngine
+from capabilities.templates.template_engine import TemplateEngine
+
+
+class _EchoCapability:
+    """返回 value 的能力"""
+    
+    def __init__(self):
+        self.calls = []
+    
+    def execute(self, input_data):
+        self.calls.append(dict(input_data))
+        return {'success': True, 'data': input_data.get('value')}
+
+
+def _write_template(template_dir, name, steps):
+    template = {'name': name, 'workflow': {'name': name, 'steps': steps}}
+    (template_dir / f'{name}.json').write_text(json.dumps(template), encoding='utf-8')
+
+
+def test_string_parameter_in_condition(tmp_path):
+    _write_template(tmp_path, 'conditional', [
+        {
+            'capability': 'echo', 'action': 'execute', 'input': {'value': '{{status}}'},
+            'output': 'opened', 'condition': '{{status}} == "open"'
+        },
+        {
+            'capability': 'echo', 'action': 'execute', 'input': {'value': 'closed'},
+            'output': 'closed', 'condition': '{{status}} == "closed"'
+        }
+    ])
+    engine = TemplateEngine(tmp_path)
+    
+    workflow = engine.instantiate_template('conditional', {'status': 'open'})
+    
+    assert workflow.validate() == (True, None)
+    assert workflow.steps[0]['condition'] == '"open" == "open"'
+    
+    workflow_engine = WorkflowEngine()
+    workflow_engine.register_capability('echo', _EchoCapability())
+    result = engine.execute_template('conditional', {'status': 'open'}, workflow_engine)
+    
+    assert result['success']
+    assert result['context']['variables'] == {'opened': 'open'}
+
+
+def test_cached_instances_are_independent_copies(tmp_path):
+    _write_template(tmp_path, 'simple', [
+        {'capability': 'echo', 'action': 'execute', 'input': {'value': '{{value}}', 'options': {}}, 'output': 'out'}
+    ])
+    engine = TemplateEngine(tmp_path)
+    
+    first = engine.instantiate_template('simple', {'value': 1})
+    first.steps[0]['input']['options']['mutated'] = True
+    first.steps.append({'capability': 'echo', 'action': 'execute'})
+    second = engine.instantiate_template('simple', {'value': 1})
+    second.steps[0]['input']['value'] = 2
+    third = engine.instantiate_template('simple', {'value': 1})
+    
+    assert third.steps == [
+        {'capability': 'echo', 'action': 'execute', 'input': {'value': 1, 'options': {}}, 'output': 'out'}
+    ]
+    assert third.get_compiled_input(0).resolve(lambda parts, var_path: None) == {'value': 1, 'options': {}}
+
+
+def test_edited_instance_input_reaches_capability(tmp_path):
+    _write_template(tmp_path, 'query', [
+        {
+            'capability': 'echo', 'action': 'execute',
+            'input': {'table': '{{table}}', 'limit': 10}, 'output': 'rows'
+        }
+    ])
+    engine = TemplateEngine(tmp_path)
+    engine.instantiate_template('query', {'table': 'T1'})
+    
+    workflow = engine.instantiate_template('query', {'table': 'T1'})
+    workflow.steps[0]['input']['limit'] = 99
+    workflow.steps[0]['input']['table'] = 'OVERRIDE'
+    capability = _EchoCapability()
+    workflow_engine = WorkflowEngine()
+    workflow_engine.register_capability('echo', capability)
+    result = workflow_engine.execute(workflow)
+    
+    assert result['success']
+    assert capability.calls == [{'table': 'OVERRIDE', 'limit': 99}]
+
+
+def test_none_parameter_keeps_placeholder(tmp_path):
+    _write_template(tmp_path, 'optional', [
+        {
+            'capability': 'echo', 'action': 'execute',
+            'input': {'value': '{{owner}}', 'label': 'owner={{owner}}'}, 'output': 'out'
+        }
+    ])
+    engine = TemplateEngine(tmp_path)
+    
+    workflow = engine.instantiate_template('optional', {'owner': None})
+    
+    assert workflow.steps[0]['input'] == {'value': '{{owner}}', 'label': 'owner={{owner}}'}
@@ -0,0 +1,36 @@
+# -*- coding: utf-8 -*-
+"""
+BM25 倒排索引测试
+"""
+
+from capabilities.discovery.text_index import BM25Index, tokenize
+
+
+def test_tokenize_splits_latin_words_and_cjk_bigrams():
+    assert tokenize('查询飞书表格 getTable_rows') == ['get', 'table', 'rows', '查询', '询飞', '飞书', '书表', '表格']
+    assert tokenize('查') == ['查']
+
+
+def test_search_ranks_by_bm25_and_field_weight():
+    index = BM25Index({'name': 3.0, 'description': 1.0})
+    index.add('a', {'name': 'log download', 'description': 'fetch files'})
+    index.add('b', {'name': 'fault query', 'description': 'query fault by log id'})
+    index.add('c', {'name': 'bitable', 'description': 'read rows'})
+    
+    results = index.search('log')
+    
+    assert [doc_id for doc_id, _ in results] == ['a', 'b']
+    assert index.candidates('query log') == {'a': 1, 'b': 2}
+
+
+def test_remove_and_readd_update_postings():
+    index = BM25Index()
+    index.add('a', {'text': 'log download'})
+    index.add('b', {'text': 'log query'})
+    
+    index.remove('a')
+    index.add('b', {'text': 'fault query'})
+    
+    assert 'a' not in index
+    assert index.search('log') == []
+    assert [doc_id for doc_id, _ in index.search('fault')] == ['b']
@@ -0,0 +1,41 @@
+# -*- coding: utf-8 -*-
+"""
+哈希向量索引（LSH）测试
+"""
+
+from capabilities.discovery.vector_index import HashedVectorIndex
+
+
+def _documents(count):
+    return {f'doc{i}': f'topic{i} alpha{i} beta{i} gamma{i}' for i in range(count)}
+
+
+def test_query_finds_most_similar_document():
+    index = HashedVectorIndex()
+    index.add_many(_documents(50))
+    index.add('target', '下载 故障 日志 文件 download fault logs')
+    
+    results = index.query('下载 故障 日志 download logs', limit=3)
+    
+    assert results[0][0] == 'target'
+    assert 0 < results[0][1] <= 1.0
+
+
+def test_candidates_are_capped():
+    index = HashedVectorIndex(max_candidates=5)
+    index.add_many({f'doc{i}': 'shared words here' for i in range(20)})
+    
+    assert len(index.query('shared words here', limit=50)) == 5
+
+
+def test_remove_and_update_documents():
+    index = HashedVectorIndex()
+    index.add_many(_documents(10))
+    
+    index.remove('doc1')
+    index.add('doc2', 'completely different text')
+    
+    assert 'doc1' not in index
+    assert len(index) == 9
+    assert [doc_id for doc_id, _ in index.query('topic1 alpha1 beta1')] == []
+    assert index.query('completely different text')[0][0] == 'doc2'
@@ -0,0 +1,338 @@
+# -*- coding: utf-8 -*-
+"""
+工作流引擎测试
+"""
+
+import json
+import threading
+import time
+
+from capabilities.cache.cache_manager import UnifiedCacheManager
+from capabilities.orchestration.capability_limiter import CapabilityLimiter
+from capabilities.orchestration.workflow_definition import WorkflowDefinition
+from capabilities.orchestration.workflow_engine import WorkflowEngine
+
+
+class _EchoCapability:
+    """按输入延迟后返回 value 的能力"""
+    
+    def __init__(self):
+        self.calls = []
+    
+    def execute(self, input_data):
+        self.calls.append(input_data.get('value'))
+        time.sleep(input_data.get('delay', 0))
+        return {'success': True, 'data': input_data.get('value')}
+
+
+def _make_engine(**kwargs):
+    engine = WorkflowEngine(max_workers=4, **kwargs)
+    engine.register_capability('echo', _EchoCapability())
+    return engine
+
+
+def _step(output, value, delay=0, **extra):
+    step = {
+        'capability': 'echo',
+        'action': 'execute',
+        'input': {'value': value, 'delay': delay},
+        'output': output
+    }
+    step.update(extra)
+    return step
+
+
+def test_dependency_graph_orders_writers_and_readers():
+    workflow = WorkflowDefinition.from_dict({
+        'name': 'deps',
+        'steps': [
+            _step('X', 'first'),
+            _step('Y', '{{X}}'),
+            _step('X', 'second'),
+            _step('Z', 'other')
+        ]
+    })
+    
+    dependencies = _make_engine()._build_dependency_graph(workflow)
+    
+    assert dependencies == [set(), {0}, {0, 1}, set()]
+
+
+def test_sequential_writers_keep_last_value():
+    workflow = WorkflowDefinition.from_dict({
+        'name': 'waw',
+        'steps': [
+            _step('X', 'first', delay=0.2),
+            _step('X', 'second')
+        ]
+    })
+    
+    result = _make_engine().execute(workflow)
+    
+    assert result['success']
+    assert result['context']['variables']['X'] == 'second'
+
+
+def test_edited_step_input_recompiles_after_first_run():
+    workflow = WorkflowDefinition.from_dict({
+        'name': 'edit',
+        'steps': [_step('X', 'before')]
+    })
+    engine = _make_engine()
+    engine.execute(workflow)
+    
+    workflow.steps[0]['input']['value'] = 'edited'
+    edited = engine.execute(workflow)
+    workflow.steps[0] = _step('X', 'replaced')
+    replaced = engine.execute(workflow)
+    
+    assert edited['context']['variables']['X'] == 'edited'
+    assert replaced['context']['variables']['X'] == 'replaced'
+
+
+def test_later_writer_waits_for_earlier_reader():
+    workflow = WorkflowDefinition.from_dict({
+        'name': 'war',
+        'steps': [
+            _step('X', 'first'),
+            _step('W', 'slow', delay=0.2),
+            _step('Y', '{{X}}-{{W}}'),
+            _step('X', 'second')
+        ]
+    })
+    
+    result = _make_engine().execute(workflow)
+    
+    assert result['success']
+    assert result['context']['variables']['Y'] == 'first-slow'
+    assert result['context']['variables']['X'] == 'second'
+
+
+def test_timeout_excludes_queue_wait():
+    workflow = WorkflowDefinition.from_dict({
+        'name': 'queued',
+        'steps': [
+            _step('A', 'a', delay=0.4, timeout=1),
+            _step('B', 'b', delay=0.4, timeout=1),
+            _step('C', 'c', delay=0.4, timeout=1)
+        ]
+    })
+    engine = WorkflowEngine(max_workers=1)
+    engine.register_capability('echo', _EchoCapability())
+    
+    result = engine.execute(workflow)
+    
+    assert result['success'], result['context']['errors']
+    assert [result['context']['variables'][name] for name in 'ABC'] == ['a', 'b', 'c']
+
+
+class _HangingCapability:
+    """输入 hang 为真时挂起，直到测试结束"""
+    
+    def __init__(self):
+        self.release = threading.Event()
+    
+    def execute(self, input_data):
+        if input_data.get('hang'):
+            self.release.wait(5)
+        return {'success': True, 'data': input_data.get('value')}
+
+
+def test_timed_out_attempt_releases_pool_and_limiter_slot():
+    hanging = _HangingCapability()
+    limiter = CapabilityLimiter({'hang': 1})
+    engine = WorkflowEngine(max_workers=1, capability_limiter=limiter)
+    engine.register_capability('hang', hanging)
+    workflow = WorkflowDefinition.from_dict({
+        'name': 'hung',
+        'steps': [
+            {'capability': 'hang', 'action': 'execute', 'input': {'hang': True}, 'output': 'A', 'timeout': 0.2},
+            {'capability': 'hang', 'action': 'execute', 'input': {'value': 'b'}, 'output': 'B', 'timeout': 1}
+        ]
+    })
+    
+    try:
+        started = time.monotonic()
+        result = engine.execute(workflow)
+        elapsed = time.monotonic() - started
+    finally:
+        hanging.release.set()
+    
+    errors = result['context']['errors']
+    assert [error['step'] for error in errors] == ['A']
+    assert '超时' in errors[0]['error']
+    assert result['context']['variables']['B'] == 'b'
+    assert elapsed < 1
+    assert limiter.get_usage()['hang']['in_use'] == 0
+
+
+def _make_cache_manager(tmp_path):
+    config_file = tmp_path / 'cache_config.json'
+    config_file.write_text(json.dumps({'cache_strategies': {'default': {'type': 'memory'}}}), encoding='utf-8')
+    return UnifiedCacheManager(config_file)
+
+
+def test_unknown_cache_strategy_fails_validation(tmp_path):
+    engine = _make_engine(cache_manager=_make_cache_manager(tmp_path))
+    workflow = WorkflowDefinition.from_dict({
+        'name': 'cached',
+        'steps': [_step('X', 'x', cache={'strategy': 'bitable_rows'})]
+    })
+    
+    result = engine.execute(workflow)
+    
+    assert not result['success']
+    assert 'bitable_rows' in result['error']
+
+
+def test_cache_read_failure_runs_step(tmp_path):
+    cache_manager = _make_cache_manager(tmp_path)
+    
+    def broken_get(*args, **kwargs):
+        raise OSError('disk error')
+    
+    cache_manager.get = broken_get
+    engine = _make_engine(cache_manager=cache_manager)
+    workflow = WorkflowDefinition.from_dict({
+        'name': 'cached',
+        'steps': [_step('X', 'x', cache=True)]
+    })
+    
+    result = engine.execute(workflow)
+    
+    assert result['success']
+    assert result['context']['variables']['X'] == 'x'
+
+
+def test_cache_step_without_manager_does_not_touch_disk(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    engine = _make_engine()
+    workflow = WorkflowDefinition.from_dict({
+        'name': 'cached',
+        'steps': [_step('X', 'x', cache=True), _step('Y', 'y', cache=True)]
+    })
+    
+    result = engine.execute(workflow)
+    
+    assert result['success']
+    assert engine.capability_registry['echo'].calls == ['x', 'y']
+    assert list(tmp_path.iterdir()) == []
+
+
+class _ProbeCapability:
+    """记录最大并发数的能力，value 为负数时执行失败"""
+    
+    def __init__(self, delay=0.05):
+        self.delay = delay
+        self.active = 0
+        self.max_active = 0
+        self.calls = []
+        self._lock = threading.Lock()
+    
+    def execute(self, input_data):
+        value = input_data['value']
+        with self._lock:
+            self.calls.append(value)
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+        try:
+            time.sleep(self.delay)
+            if value < 0:
+                return {'success': False, 'error': f'负数 {value}'}
+            return {'success': True, 'data': value * 10}
+        finally:
+            with self._lock:
+                self.active -= 1
+
+
+def _run_foreach(items, probe, max_workers=8, **loop_options):
+    engine = WorkflowEngine(max_workers=max_workers)
+    engine.register_capability('echo', _EchoCapability())
+    engine.register_capability('probe', probe)
+    loop_step = {
+        'capability': 'probe',
+        'action': 'execute',
+        'foreach': '{{items}}',
+        'input': {'value': '{{item}}'},
+        'output': 'results'
+    }
+    loop_step.update(loop_options)
+    workflow = WorkflowDefinition.from_dict({
+        'name': 'foreach',
+        'steps': [_step('items', items), loop_step]
+    })
+    return engine.execute(workflow)
+
+
+def test_foreach_respects_max_concurrency():
+    probe = _ProbeCapability()
+    
+    result = _run_foreach(list(range(10)), probe, max_concurrency=3)
+    
+    assert result['success']
+    assert result['context']['variables']['results'] == [i * 10 for i in range(10)]
+    assert 1 < probe.max_active <= 3
+
+
+def test_foreach_fail_policy_stops_and_fails_step():
+    probe = _ProbeCapability()
+    
+    result = _run_foreach([1, -2, 3, 4, 5, 6], probe, max_concurrency=1, on_item_error='fail')
+    
+    assert not result['success']
+    assert 'results' not in result['context']['variables']
+    step_result = result['context']['step_results']['results']
+    assert step_result['errors'] == [{'index': 1, 'error': '负数 -2'}]
+    assert '第 1 项执行失败' in step_result['error']
+    assert len(probe.calls) < 6
+
+
+def test_foreach_continue_policy_keeps_failed_slots():
+    probe = _ProbeCapability()
+    
+    result = _run_foreach([1, -2, 3, -4], probe, max_concurrency=2, on_item_error='continue')
+    
+    assert result['success']
+    assert result['context']['variables']['results'] == [10, None, 30, None]
+    errors = result['context']['step_results']['results']['errors']
+    assert [error['index'] for error in errors] == [1, 3]
+
+
+def test_foreach_skip_policy_drops_failed_items():
+    probe = _ProbeCapability()
+    
+    result = _run_foreach([1, -2, 3, -4], probe, max_concurrency=2, on_item_error='skip')
+    
+    assert result['success']
+    assert result['context']['variables']['results'] == [10, 30]
+    assert result['context']['step_results']['results']['metadata'] == {'total': 4, 'failed': 2}
+
+
+class _MutatingCapability:
+    """往输入列表中追加元素并返回该列表（模拟原地修改上游结果的步骤）"""
+    
+    def execute(self, input_data):
+        rows = input_data['rows']
+        rows.append('mutated')
+        return {'success': True, 'data': rows}
+
+
+def test_cached_result_is_not_shared_between_runs(tmp_path):
+    cache_manager = _make_cache_manager(tmp_path)
+    engine = _make_engine(cache_manager=cache_manager)
+    engine.register_capability('mutate', _MutatingCapability())
+    workflow = WorkflowDefinition.from_dict({
+        'name': 'cached',
+        'steps': [
+            _step('rows', ['a'], cache=True),
+            {'capability': 'mutate', 'action': 'execute', 'input': {'rows': '{{rows}}'}, 'output': 'mutated'}
+        ]
+    })
+    
+    results = [engine.execute(workflow) for _ in range(3)]
+    
+    assert [result['context']['variables']['mutated'] for result in results] == [['a', 'mutated']] * 3
+    assert [result['context']['step_results']['rows'].get('cached', False) for result in results] == [
+        False, True, True
+    ]
+    assert len(engine.capability_registry['echo'].calls) == 1
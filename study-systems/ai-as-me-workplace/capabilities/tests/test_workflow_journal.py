@@ -0,0 +1,75 @@
+# -*- coding: utf-8 -*-
+"""
+工作流运行日志与恢复测试
+"""
+
+from capabilities.orchestration.workflow_definition import WorkflowDefinition
+from capabilities.orchestration.workflow_engine import WorkflowEngine
+from capabilities.orchestration.workflow_journal import WorkflowJournal
+
+
+class _RecordingCapability:
+    """记录调用的能力，value 在 failing 中时执行失败（模拟中断）"""
+    
+    def __init__(self):
+        self.calls = []
+        self.failing = set()
+    
+    def execute(self, input_data):
+        value = input_data.get('value')
+        self.calls.append(value)
+        if value in self.failing:
+            raise RuntimeError(f'{value} 中断')
+        return {'success': True, 'data': value}
+
+
+def _make_engine(journal_dir, capability):
+    engine = WorkflowEngine(max_workers=1, journal=WorkflowJournal(journal_dir))
+    engine.register_capability('echo', capability)
+    return engine
+
+
+def _make_workflow():
+    return WorkflowDefinition.from_dict({
+        'name': 'resumable',
+        'steps': [
+            {'capability': 'echo', 'action': 'execute', 'input': {'value': 'a'}, 'output': 'A'},
+            {'capability': 'echo', 'action': 'execute', 'input': {'value': 'b'}, 'output': 'B'},
+            {'capability': 'echo', 'action': 'execute', 'input': {'value': '{{A}}+{{B}}'}, 'output': 'C'}
+        ]
+    })
+
+
+def test_resume_skips_completed_steps(tmp_path):
+    capability = _RecordingCapability()
+    capability.failing.add('b')
+    first = _make_engine(tmp_path, capability).execute(_make_workflow())
+    
+    assert not first['success']
+    run_id = first['run_id']
+    state = WorkflowJournal(tmp_path).load_run(run_id)
+    assert sorted(state['completed']) == [0, 2]
+    assert not state['finished']
+    
+    # 崩溃时写了一半的最后一行应被忽略
+    with open(tmp_path / f'{run_id}.jsonl', 'a', encoding='utf-8') as f:
+        f.write('{"event": "step_comp')
+    
+    resumed_capability = _RecordingCapability()
+    resumed = _make_engine(tmp_path, resumed_capability).resume(run_id)
+    
+    assert resumed['success'], resumed
+    assert resumed['run_id'] == run_id
+    # A 不再执行；C 上次用了不完整的输入，随 B 一起重新执行
+    assert resumed_capability.calls == ['b', 'a+b']
+    assert resumed['context']['variables'] == {'A': 'a', 'B': 'b', 'C': 'a+b'}
+    state = WorkflowJournal(tmp_path).load_run(run_id)
+    assert sorted(state['completed']) == [0, 1, 2]
+    assert state['finished']
+
+
+def test_resume_unknown_run(tmp_path):
+    result = _make_engine(tmp_path, _RecordingCapability()).resume('missing')
+    
+    assert not result['success']
+    assert 'missing' in result['error']
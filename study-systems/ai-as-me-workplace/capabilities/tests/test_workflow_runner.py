@@ -0,0 +1,103 @@
+# -*- coding: utf-8 -*-
+"""
+多工作流并发运行器与能力并发限额测试
+"""
+
+import threading
+import time
+
+import pytest
+
+from capabilities.orchestration.capability_limiter import CapabilityLimiter
+from capabilities.orchestration.workflow_definition import WorkflowDefinition
+from capabilities.orchestration.workflow_runner import WorkflowRunner
+
+
+class _ConcurrencyProbe:
+    """记录最大并发调用数的能力，fail 为真时抛异常"""
+    
+    def __init__(self, delay=0.05):
+        self.delay = delay
+        self.active = 0
+        self.max_active = 0
+        self._lock = threading.Lock()
+    
+    def execute(self, input_data):
+        with self._lock:
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+        try:
+            time.sleep(self.delay)
+            if input_data.get('fail'):
+                raise RuntimeError('调用失败')
+            return {'success': True, 'data': input_data.get('value')}
+        finally:
+            with self._lock:
+                self.active -= 1
+
+
+def _workflow(name, capability, count, **step_input):
+    return WorkflowDefinition.from_dict({
+        'name': name,
+        'steps': [
+            {
+                'capability': capability, 'action': 'execute',
+                'input': dict(step_input, value=i), 'output': f'out{i}'
+            }
+            for i in range(count)
+        ]
+    })
+
+
+def test_runner_never_exceeds_capability_and_workflow_limits():
+    limited = _ConcurrencyProbe()
+    runs = _ConcurrencyProbe()
+    with WorkflowRunner(
+        max_concurrent_workflows=3,
+        max_workers_per_workflow=4,
+        capability_limits={'limited': 2}
+    ) as runner:
+        runner.register_capability('limited', limited)
+        runner.register_capability('run', runs)
+        results = runner.run_all(
+            [_workflow(f'limited{i}', 'limited', 4) for i in range(4)]
+            + [_workflow(f'run{i}', 'run', 1) for i in range(6)]
+        )
+        statistics = runner.get_statistics()
+    
+    assert all(result['success'] for result in results)
+    assert limited.max_active == 2
+    assert 1 < runs.max_active <= 3
+    assert statistics['completed_runs'] == 10
+    assert statistics['capability_usage']['limited'] == {'in_use': 0, 'limit': 2}
+
+
+def test_leases_released_when_steps_fail():
+    probe = _ConcurrencyProbe(delay=0.01)
+    with WorkflowRunner(max_concurrent_workflows=2, capability_limits={'probe': 1}) as runner:
+        runner.register_capability('probe', probe)
+        failed = runner.run_all([_workflow(f'fail{i}', 'probe', 3, fail=True) for i in range(3)])
+        succeeded = runner.submit(_workflow('after', 'probe', 2)).result(timeout=5)
+        statistics = runner.get_statistics()
+    
+    assert not any(result['success'] for result in failed)
+    assert succeeded['success']
+    assert statistics['failed_runs'] == 3
+    assert statistics['capability_usage']['probe']['in_use'] == 0
+
+
+def test_lease_release_is_idempotent():
+    limiter = CapabilityLimiter({'probe': 1})
+    
+    with pytest.raises(RuntimeError):
+        with limiter.acquire('probe') as lease:
+            lease.release()
+            lease.release()
+            assert limiter.get_usage()['probe']['in_use'] == 0
+            raise RuntimeError('失败')
+    
+    with limiter.acquire('probe') as lease:
+        assert limiter.get_usage()['probe']['in_use'] == 1
+    assert limiter.get_usage()['probe']['in_use'] == 0
+    with limiter.acquire('unlimited') as lease:
+        assert lease is None
@@ -0,0 +1,101 @@
+# -*- coding: utf-8 -*-
+"""
+工作流追踪测试
+"""
+
+import json
+import time
+
+from capabilities.orchestration.workflow_definition import WorkflowDefinition
+from capabilities.orchestration.workflow_engine import WorkflowEngine
+from capabilities.orchestration.workflow_tracer import WorkflowTracer
+
+
+class _FlakyCapability:
+    """按输入延迟后返回 value，fail_once 为真的输入第一次调用失败"""
+    
+    def __init__(self):
+        self.failed = set()
+    
+    def execute(self, input_data):
+        time.sleep(input_data.get('delay', 0))
+        value = input_data.get('value')
+        if input_data.get('fail_once') and value not in self.failed:
+            self.failed.add(value)
+            return {'success': False, 'error': '首次失败'}
+        return {'success': True, 'data': value}
+
+
+def _run_traced(tracer, run_id=None):
+    engine = WorkflowEngine(max_workers=2, tracer=tracer)
+    engine.register_capability('flaky', _FlakyCapability())
+    workflow = WorkflowDefinition.from_dict({
+        'name': 'traced',
+        'steps': [
+            {'capability': 'flaky', 'action': 'execute', 'input': {'value': 'a', 'delay': 0.05}, 'output': 'A'},
+            {'capability': 'flaky', 'action': 'execute', 'input': {'value': 'b', 'delay': 0.05}, 'output': 'B'},
+            {
+                'capability': 'flaky', 'action': 'execute',
+                'input': {'value': '{{A}}{{B}}', 'fail_once': True},
+                'output': 'C', 'retry': 1, 'retry_delay': 0.01
+            }
+        ]
+    })
+    return engine.execute(workflow, run_id)
+
+
+def test_chrome_trace_nests_steps_inside_workflow():
+    tracer = WorkflowTracer()
+    result = _run_traced(tracer)
+    
+    assert result['success']
+    events = tracer.build_trace_events()
+    metadata = [event for event in events if event['ph'] == 'M']
+    complete = [event for event in events if event['ph'] == 'X']
+    
+    assert metadata == [{'name': 'process_name', 'ph': 'M', 'pid': 1, 'tid': 0, 'args': {'name': 'traced'}}]
+    run_event = next(event for event in complete if event['cat'] == 'workflow')
+    assert (run_event['name'], run_event['tid']) == ('traced', 0)
+    assert run_event['args'] == {'run_id': None, 'success': True, 'steps': 4}
+    
+    steps = [event for event in complete if event['cat'] == 'flaky']
+    assert sorted((event['name'], event['args']['attempt']) for event in steps) == [
+        ('A', 1), ('B', 1), ('C', 1), ('C', 2)
+    ]
+    for event in complete:
+        assert isinstance(event['ts'], int) and isinstance(event['dur'], int)
+        assert event['dur'] >= 0
+    for event in steps:
+        assert event['pid'] == 1 and event['tid'] >= 1
+        assert run_event['ts'] <= event['ts']
+        assert event['ts'] + event['dur'] <= run_event['ts'] + run_event['dur']
+    
+    by_name = {}
+    for event in steps:
+        by_name.setdefault(event['name'], []).append(event)
+    a, b = by_name['A'][0], by_name['B'][0]
+    assert a['dur'] >= 50000 and b['dur'] >= 50000
+    # A、B 并行执行，C 依赖两者，第二次尝试在第一次失败之后
+    assert a['ts'] < b['ts'] + b['dur'] and b['ts'] < a['ts'] + a['dur']
+    first_c, second_c = sorted(by_name['C'], key=lambda event: event['args']['attempt'])
+    assert first_c['ts'] >= max(a['ts'] + a['dur'], b['ts'] + b['dur'])
+    assert first_c['args']['success'] is False
+    assert second_c['ts'] >= first_c['ts'] + first_c['dur']
+
+
+def test_each_run_is_a_process_and_export_writes_json(tmp_path):
+    tracer = WorkflowTracer()
+    _run_traced(tracer, run_id='r1')
+    _run_traced(tracer, run_id='r2')
+    
+    output_file = tracer.export_chrome_trace(tmp_path / 'trace.json')
+    trace = json.loads(output_file.read_text(encoding='utf-8'))
+    
+    assert trace['displayTimeUnit'] == 'ms'
+    names = {
+        event['pid']: event['args']['name']
+        for event in trace['traceEvents'] if event['ph'] == 'M'
+    }
+    assert names == {1: 'traced (r1)', 2: 'traced (r2)'}
+    summary = tracer.get_step_summary()['C']
+    assert (summary['count'], summary['failures']) == (4, 2)
@@ -3,27 +3,412 @@
 能力使用模式分析
 
 分析能力使用情况，识别使用模式
+
+使用记录按块转换为列式存储（时间戳只解析一次，能力/场景/组合按字典编码为整数），
+可从 JSONL 使用日志流式读入，原始记录不常驻内存；
+各项统计按块聚合，安装 NumPy 时向量化计算，否则退化为逐条循环
 """
 
+import calendar
+import json
 import logging
-from typing import Dict, Any, List, Optional
-from collections import defaultdict, Counter
+from array import array
+from pathlib import Path
+from typing import Dict, Any, Iterable, List, Optional, Tuple, Union
 from datetime import datetime, timedelta
 
+try:
+    import numpy as np
+    HAS_NUMPY = True
+except ImportError:
+    HAS_NUMPY = False
+
 logger = logging.getLogger(__name__)
 
+# 默认每块记录数
+DEFAULT_CHUNK_SIZE = 50000
+
+# 时间戳统一换算为本地挂钟时间的秒数（以 1970-01-01 为零点），便于向量化取小时/星期
+_EPOCH = datetime(1970, 1, 1)
+# 1970-01-01 是星期四（星期一为 0）
+_EPOCH_WEEKDAY = 3
+
+
+def _to_wall_seconds(timestamp: Any) -> float:
+    """时间戳（ISO 字符串 / datetime）-> 挂钟秒数，无法解析时为 NaN"""
+    if not timestamp:
+        return float('nan')
+    try:
+        if isinstance(timestamp, str):
+            timestamp = datetime.fromisoformat(timestamp)
+        if isinstance(timestamp, datetime):
+            return (timestamp.replace(tzinfo=None) - _EPOCH).total_seconds()
+    except Exception:
+        pass
+    return float('nan')
+
+
+class _UsageChunk:
+    """一块列式使用记录"""
+    
+    def __init__(
+        self,
+        timestamps: List[float],
+        success: List[bool],
+        scenarios: List[int],
+        combinations: List[int],
+        cap_offsets: List[int],
+        cap_codes: List[int]
+    ):
+        """
+        初始化数据块
+        
+        Args:
+            timestamps: 每条记录的挂钟秒数（NaN 表示无时间）
+            success: 每条记录是否成功
+            scenarios: 每条记录的场景编码
+            combinations: 每条记录的能力组合编码（少于 2 个能力时为 -1）
+            cap_offsets: 每条记录的能力在 cap_codes 中的起始位置（长度为记录数 + 1）
+            cap_codes: 所有记录的能力编码（按记录顺序拼接）
+        """
+        self.size = len(timestamps)
+        if HAS_NUMPY:
+            self.timestamps = np.array(timestamps, dtype=np.float64)
+            self.success = np.array(success, dtype=bool)
+            self.scenarios = np.array(scenarios, dtype=np.int64)
+            self.combinations = np.array(combinations, dtype=np.int64)
+            self.cap_codes = np.array(cap_codes, dtype=np.int64)
+            # 每个能力编码所属的记录下标
+            self.cap_records = np.repeat(
+                np.arange(self.size, dtype=np.int64),
+                np.diff(np.array(cap_offsets, dtype=np.int64))
+            )
+        else:
+            self.timestamps = array('d', timestamps)
+            self.success = array('b', success)
+            self.scenarios = array('q', scenarios)
+            self.combinations = array('q', combinations)
+            self.cap_offsets = array('q', cap_offsets)
+            self.cap_codes = array('q', cap_codes)
+
+
+class UsageColumnStore:
+    """
+    列式使用记录存储
+    
+    只保留分析需要的字段：时间戳、是否成功、场景、能力列表（及其组合）
+    """
+    
+    def __init__(self, chunk_size: int = DEFAULT_CHUNK_SIZE):
+        """
+        初始化存储
+        
+        Args:
+            chunk_size: 每块记录数（流式读入时的内存上限由此决定）
+        """
+        self.chunk_size = chunk_size
+        self._chunks: List[_UsageChunk] = []
+        self._record_count = 0
+        
+        # 字典编码：值 -> 编码，编码 -> 值（编码按首次出现顺序分配）
+        self._capability_codes: Dict[str, int] = {}
+        self.capabilities: List[str] = []
+        self._scenario_codes: Dict[Any, int] = {}
+        self.scenarios: List[Any] = []
+        self._combination_codes: Dict[Tuple[str, ...], int] = {}
+        self.combinations: List[Tuple[str, ...]] = []
+    
+    def __len__(self) -> int:
+        return self._record_count
+    
+    @staticmethod
+    def _encode(value: Any, codes: Dict[Any, int], values: List[Any]) -> int:
+        """字典编码"""
+        code = codes.get(value)
+        if code is None:
+            code = len(values)
+            codes[value] = code
+            values.append(value)
+        return code
+    
+    def ingest(self, records: Iterable[Dict[str, Any]]) -> int:
+        """
+        按块读入使用记录
+        
+        Args:
+            records: 使用记录（可以是生成器）
+        
+        Returns:
+            读入的记录数
+        """
+        count = 0
+        buffer: List[Dict[str, Any]] = []
+        for record in records:
+            buffer.append(record)
+            if len(buffer) >= self.chunk_size:
+                self._append_chunk(buffer)
+                count += len(buffer)
+                buffer = []
+        if buffer:
+            self._append_chunk(buffer)
+            count += len(buffer)
+        return count
+    
+    def ingest_jsonl(self, path: Union[str, Path]) -> int:
+        """
+        流式读入 JSONL 使用日志（每行一条记录，无法解析的行记录警告后跳过）
+        
+        Args:
+            path: JSONL 文件路径
+        
+        Returns:
+            读入的记录数
+        """
+        def read_records():
+            with open(path, 'r', encoding='utf-8') as f:
+                for line_no, line in enumerate(f, 1):
+                    line = line.strip()
+                    if not line:
+                        continue
+                    try:
+                        yield json.loads(line)
+                    except json.JSONDecodeError as e:
+                        logger.warning(f"跳过无法解析的使用记录 {path}:{line_no}: {e}")
+        
+        return self.ingest(read_records())
+    
+    def _append_chunk(self, records: List[Dict[str, Any]]):
+        """将一批记录转换为列式数据块"""
+        timestamps: List[float] = []
+        success: List[bool] = []
+        scenarios: List[int] = []
+        combinations: List[int] = []
+        cap_offsets = [0]
+        cap_codes: List[int] = []
+        
+        for record in records:
+            capabilities = record.get('capabilities', []) or []
+            timestamps.append(_to_wall_seconds(record.get('timestamp')))
+            success.append(bool(record.get('success', False)))
+            scenarios.append(self._encode(record.get('scenario', 'unknown'), self._scenario_codes, self.scenarios))
+            if len(capabilities) >= 2:
+                combinations.append(self._encode(tuple(sorted(capabilities)), self._combination_codes, self.combinations))
+            else:
+                combinations.append(-1)
+            for cap_id in capabilities:
+                cap_codes.append(self._encode(cap_id, self._capability_codes, self.capabilities))
+            cap_offsets.append(len(cap_codes))
+        
+        self._chunks.append(_UsageChunk(timestamps, success, scenarios, combinations, cap_offsets, cap_codes))
+        self._record_count += len(records)
+    
+    def _record_mask(self, chunk: _UsageChunk, since: Optional[float], until: Optional[float], success_only: bool):
+        """NumPy：按时间范围/是否成功筛选记录（无筛选条件时为 None）"""
+        mask = None
+        if since is not None:
+            mask = chunk.timestamps >= since
+        if until is not None:
+            upper = chunk.timestamps < until
+            mask = upper if mask is None else mask & upper
+        if success_only:
+            mask = chunk.success if mask is None else mask & chunk.success
+        return mask
+    
+    def _record_matches(
+        self,
+        chunk: _UsageChunk,
+        index: int,
+        since: Optional[float],
+        until: Optional[float],
+        success_only: bool
+    ) -> bool:
+        """纯 Python：单条记录是否满足筛选条件（NaN 时间与任何比较均不满足）"""
+        timestamp = chunk.timestamps[index]
+        if since is not None and not timestamp >= since:
+            return False
+        if until is not None and not timestamp < until:
+            return False
+        return not success_only or bool(chunk.success[index])
+    
+    def count_records(self, since: Optional[float] = None, until: Optional[float] = None) -> int:
+        """
+        统计记录数
+        
+        Args:
+            since: 起始挂钟秒数（含，可选）
+            until: 截止挂钟秒数（不含，可选）
+        
+        Returns:
+            记录数（指定时间范围时不含无时间的记录）
+        """
+        if since is None and until is None:
+            return self._record_count
+        
+        total = 0
+        for chunk in self._chunks:
+            if HAS_NUMPY:
+                total += int(np.count_nonzero(self._record_mask(chunk, since, until, False)))
+            else:
+                total += sum(
+                    1 for i in range(chunk.size)
+                    if self._record_matches(chunk, i, since, until, False)
+                )
+        return total
+    
+    def capability_counts(
+        self,
+        since: Optional[float] = None,
+        until: Optional[float] = None,
+        success_only: bool = False
+    ) -> List[int]:
+        """
+        统计各能力的使用次数
+        
+        Args:
+            since: 起始挂钟秒数（含，可选）
+            until: 截止挂钟秒数（不含，可选）
+            success_only: 是否只统计成功的记录
+        
+        Returns:
+            按能力编码排列的使用次数
+        """
+        size = len(self.capabilities)
+        if HAS_NUMPY:
+            counts = np.zeros(size, dtype=np.int64)
+            for chunk in self._chunks:
+                mask = self._record_mask(chunk, since, until, success_only)
+                codes = chunk.cap_codes if mask is None else chunk.cap_codes[mask[chunk.cap_records]]
+                counts += np.bincount(codes, minlength=size)
+            return counts.tolist()
+        
+        counts = [0] * size
+        filtered = since is not None or until is not None or success_only
+        for chunk in self._chunks:
+            offsets, codes = chunk.cap_offsets, chunk.cap_codes
+            for i in range(chunk.size):
+                if filtered and not self._record_matches(chunk, i, since, until, success_only):
+                    continue
+                for code in codes[offsets[i]:offsets[i + 1]]:
+                    counts[code] += 1
+        return counts
+    
+    def time_distribution(self) -> Tuple[List[int], List[int]]:
+        """
+        统计使用时间分布
+        
+        Returns:
+            (按小时 0-23 的记录数, 按星期 0-6（星期一为 0）的记录数)
+        """
+        hour_counts = [0] * 24
+        weekday_counts = [0] * 7
+        
+        for chunk in self._chunks:
+            if HAS_NUMPY:
+                timestamps = chunk.timestamps[~np.isnan(chunk.timestamps)]
+                hours = (timestamps // 3600 % 24).astype(np.int64)
+                weekdays = ((timestamps // 86400 + _EPOCH_WEEKDAY) % 7).astype(np.int64)
+                for i, count in enumerate(np.bincount(hours, minlength=24).tolist()):
+                    hour_counts[i] += count
+                for i, count in enumerate(np.bincount(weekdays, minlength=7).tolist()):
+                    weekday_counts[i] += count
+            else:
+                for timestamp in chunk.timestamps:
+                    if timestamp != timestamp:
+                        continue
+                    hour_counts[int(timestamp // 3600 % 24)] += 1
+                    weekday_counts[int((timestamp // 86400 + _EPOCH_WEEKDAY) % 7)] += 1
+        
+        return hour_counts, weekday_counts
+    
+    def _code_counts(self, column: str, size: int) -> List[int]:
+        """统计按记录编码的列（场景/组合）中各编码的出现次数（忽略负编码）"""
+        if HAS_NUMPY:
+            counts = np.zeros(size, dtype=np.int64)
+            for chunk in self._chunks:
+                codes = getattr(chunk, column)
+                counts += np.bincount(codes[codes >= 0], minlength=size)
+            return counts.tolist()
+        
+        counts = [0] * size
+        for chunk in self._chunks:
+            for code in getattr(chunk, column):
+                if code >= 0:
+                    counts[code] += 1
+        return counts
+    
+    def scenario_counts(self) -> List[int]:
+        """
+        统计各场景的记录数
+        
+        Returns:
+            按场景编码排列的记录数
+        """
+        return self._code_counts('scenarios', len(self.scenarios))
+    
+    def combination_counts(self) -> List[int]:
+        """
+        统计各能力组合的记录数
+        
+        Returns:
+            按组合编码排列的记录数
+        """
+        return self._code_counts('combinations', len(self.combinations))
+
+
+def _most_common(values: List[Any], counts: List[int], limit: Optional[int] = None) -> List[Tuple[Any, int]]:
+    """按次数降序排列（次数相同时保持首次出现顺序，与 Counter.most_common 一致）"""
+    items = [(value, count) for value, count in zip(values, counts) if count > 0]
+    items.sort(key=lambda x: x[1], reverse=True)
+    return items[:limit] if limit is not None else items
+
 
 class PatternAnalyzer:
     """模式分析器"""
     
-    def __init__(self, usage_history: List[Dict[str, Any]]):
+    def __init__(
+        self,
+        usage_history: Optional[List[Dict[str, Any]]] = None,
+        store: Optional[UsageColumnStore] = None,
+        keep_history: bool = False
+    ):
         """
         初始化模式分析器
         
+        usage_history 读入列式存储后默认不再保留引用，原始记录可随调用方释放
+        
         Args:
             usage_history: 使用历史记录列表
+            store: 已读入的列式存储（可选，与 usage_history 同时提供时追加 usage_history）
+            keep_history: 是否保留 usage_history 引用（需要访问原始记录的调用方使用）
         """
-        self.usage_history = usage_history
+        self.store = store or UsageColumnStore()
+        if usage_history:
+            self.store.ingest(usage_history)
+        self.usage_history: Optional[List[Dict[str, Any]]] = usage_history if keep_history else None
+    
+    @classmethod
+    def from_jsonl(
+        cls,
+        paths: Union[str, Path, Iterable[Union[str, Path]]],
+        chunk_size: int = DEFAULT_CHUNK_SIZE
+    ) -> 'PatternAnalyzer':
+        """
+        从 JSONL 使用日志流式创建分析器（原始记录不保留在内存中）
+        
+        Args:
+            paths: JSONL 文件路径（一个或多个）
+            chunk_size: 每块记录数
+        
+        Returns:
+            模式分析器
+        """
+        if isinstance(paths, (str, Path)):
+            paths = [paths]
+        
+        store = UsageColumnStore(chunk_size)
+        for path in paths:
+            store.ingest_jsonl(path)
+        return cls(store=store)
     
     def analyze_usage_frequency(self) -> Dict[str, Any]:
         """
@@ -32,17 +417,12 @@ class PatternAnalyzer:
         Returns:
             使用频率统计
         """
-        capability_counts = Counter()
-        total_usage = len(self.usage_history)
-        
-        for record in self.usage_history:
-            capabilities = record.get('capabilities', [])
-            for cap_id in capabilities:
-                capability_counts[cap_id] += 1
+        total_usage = len(self.store)
+        capability_counts = _most_common(self.store.capabilities, self.store.capability_counts())
         
         # 计算频率
         frequencies = {}
-        for cap_id, count in capability_counts.items():
+        for cap_id, count in capability_counts:
             frequencies[cap_id] = {
                 'count': count,
                 'frequency': count / total_usage if total_usage > 0 else 0,
@@ -52,7 +432,7 @@ class PatternAnalyzer:
         return {
             'total_usage': total_usage,
             'capability_frequencies': frequencies,
-            'most_used': capability_counts.most_common(10)
+            'most_used': capability_counts[:10]
         }
     
     def analyze_usage_patterns(self) -> Dict[str, Any]:
@@ -79,71 +459,39 @@ class PatternAnalyzer:
     
     def _analyze_time_patterns(self) -> Dict[str, Any]:
         """分析时间模式"""
-        hour_counts = defaultdict(int)
-        day_counts = defaultdict(int)
-        
-        for record in self.usage_history:
-            timestamp = record.get('timestamp')
-            if not timestamp:
-                continue
-            
-            try:
-                if isinstance(timestamp, str):
-                    dt = datetime.fromisoformat(timestamp)
-                else:
-                    dt = timestamp
-                
-                hour_counts[dt.hour] += 1
-                day_counts[dt.strftime('%A')] += 1
-            except Exception:
-                continue
+        hour_totals, weekday_totals = self.store.time_distribution()
+        hour_counts = {hour: count for hour, count in enumerate(hour_totals) if count}
+        day_counts = {
+            calendar.day_name[weekday]: count
+            for weekday, count in enumerate(weekday_totals) if count
+        }
         
         return {
-            'hourly_distribution': dict(hour_counts),
-            'daily_distribution': dict(day_counts),
+            'hourly_distribution': hour_counts,
+            'daily_distribution': day_counts,
             'peak_hour': max(hour_counts.items(), key=lambda x: x[1])[0] if hour_counts else None,
             'peak_day': max(day_counts.items(), key=lambda x: x[1])[0] if day_counts else None
         }
     
     def _analyze_combination_patterns(self) -> Dict[str, Any]:
         """分析组合模式"""
-        combinations = defaultdict(int)
-        
-        for record in self.usage_history:
-            capabilities = record.get('capabilities', [])
-            if len(capabilities) < 2:
-                continue
-            
-            # 记录能力组合
-            combo_key = tuple(sorted(capabilities))
-            combinations[combo_key] += 1
-        
-        # 找出最常见的组合
-        most_common_combos = sorted(
-            combinations.items(),
-            key=lambda x: x[1],
-            reverse=True
-        )[:10]
+        combinations = _most_common(self.store.combinations, self.store.combination_counts())
         
         return {
             'total_combinations': len(combinations),
             'most_common_combinations': [
                 {'capabilities': list(combo), 'count': count}
-                for combo, count in most_common_combos
+                for combo, count in combinations[:10]
             ]
         }
     
     def _analyze_scenario_patterns(self) -> Dict[str, Any]:
         """分析场景模式"""
-        scenario_counts = Counter()
-        
-        for record in self.usage_history:
-            scenario = record.get('scenario', 'unknown')
-            scenario_counts[scenario] += 1
+        scenario_counts = _most_common(self.store.scenarios, self.store.scenario_counts())
         
         return {
             'scenario_distribution': dict(scenario_counts),
-            'most_common_scenario': scenario_counts.most_common(1)[0] if scenario_counts else None
+            'most_common_scenario': scenario_counts[0] if scenario_counts else None
         }
     
     def analyze_effectiveness(self) -> Dict[str, Any]:
@@ -153,32 +501,25 @@ class PatternAnalyzer:
         Returns:
             效果分析结果
         """
-        success_counts = defaultdict(int)
-        total_counts = defaultdict(int)
-        
-        for record in self.usage_history:
-            capabilities = record.get('capabilities', [])
-            success = record.get('success', False)
-            
-            for cap_id in capabilities:
-                total_counts[cap_id] += 1
-                if success:
-                    success_counts[cap_id] += 1
+        total_counts = self.store.capability_counts()
+        success_counts = self.store.capability_counts(success_only=True)
         
         # 计算成功率
         success_rates = {}
-        for cap_id, total in total_counts.items():
-            success_count = success_counts.get(cap_id, 0)
+        for cap_id, total, success_count in zip(self.store.capabilities, total_counts, success_counts):
+            if total == 0:
+                continue
             success_rates[cap_id] = {
                 'total': total,
                 'success': success_count,
                 'failure': total - success_count,
-                'success_rate': success_count / total if total > 0 else 0
+                'success_rate': success_count / total
             }
         
+        all_total = sum(total_counts)
         return {
             'capability_effectiveness': success_rates,
-            'overall_success_rate': sum(success_counts.values()) / sum(total_counts.values()) if total_counts else 0
+            'overall_success_rate': sum(success_counts) / all_total if all_total else 0
         }
     
     def identify_trends(self, days: int = 30) -> Dict[str, Any]:
@@ -187,43 +528,23 @@ class PatternAnalyzer:
         
         Args:
             days: 分析天数
-            
+        
         Returns:
             趋势分析结果
         """
-        cutoff_date = datetime.now() - timedelta(days=days)
+        cutoff = _to_wall_seconds(datetime.now() - timedelta(days=days))
         
-        recent_records = [
-            r for r in self.usage_history
-            if self._parse_timestamp(r.get('timestamp')) and
-            self._parse_timestamp(r.get('timestamp')) >= cutoff_date
-        ]
-        
-        old_records = [
-            r for r in self.usage_history
-            if self._parse_timestamp(r.get('timestamp')) and
-            self._parse_timestamp(r.get('timestamp')) < cutoff_date
-        ]
-        
-        # 比较近期和早期的使用情况
-        recent_capabilities = Counter()
-        old_capabilities = Counter()
-        
-        for record in recent_records:
-            for cap_id in record.get('capabilities', []):
-                recent_capabilities[cap_id] += 1
-        
-        for record in old_records:
-            for cap_id in record.get('capabilities', []):
-                old_capabilities[cap_id] += 1
+        # 比较近期和早期的使用情况（无时间的记录不计入）
+        recent_capabilities = self.store.capability_counts(since=cutoff)
+        old_capabilities = self.store.capability_counts(until=cutoff)
         
         # 计算趋势
         trends = {}
-        all_capabilities = set(recent_capabilities.keys()) | set(old_capabilities.keys())
-        
-        for cap_id in all_capabilities:
-            recent_count = recent_capabilities.get(cap_id, 0)
-            old_count = old_capabilities.get(cap_id, 0)
+        for cap_id, recent_count, old_count in zip(
+            self.store.capabilities, recent_capabilities, old_capabilities
+        ):
+            if recent_count == 0 and old_count == 0:
+                continue
             
             if old_count == 0:
                 trend = 'new'
@@ -243,22 +564,7 @@ class PatternAnalyzer:
         
         return {
             'period_days': days,
-            'recent_total': len(recent_records),
-            'old_total': len(old_records),
+            'recent_total': self.store.count_records(since=cutoff),
+            'old_total': self.store.count_records(until=cutoff),
             'trends': trends
         }
-    
-    def _parse_timestamp(self, timestamp: Any) -> Optional[datetime]:
-        """解析时间戳"""
-        if not timestamp:
-            return None
-        
-        try:
-            if isinstance(timestamp, str):
-                return datetime.fromisoformat(timestamp)
-            elif isinstance(timestamp, datetime):
-                return timestamp
-        except Exception:
-            pass
-        
-        return None